@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+生成与验证性能基准测试
+按天数和用户数扫描，测量数据生成、JSON写出和格式验证各阶段的耗时、吞吐量和峰值内存，
+结果保存为JSON，可与之前的结果对比并标记性能退化
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Any, Callable
+
+from fleet_generation import make_user_profile
+from generate_demo_data_final import FitnessDataGenerator, np
+from validate_data_format import validate_flutter_import_format, validate_flutter_import_format_streaming
+
+# 各阶段按执行顺序排列：
+#   generate        - FitnessDataGenerator.generate_demo_data()
+#   write_json      - main()中的json.dump(indent=2)
+#   stream_write    - FitnessDataGenerator.write_demo_data()流式写出
+#   validate        - validate_flutter_import_format()
+#   validate_stream - validate_flutter_import_format_streaming()
+PHASES = ['generate', 'write_json', 'stream_write', 'validate', 'validate_stream']
+
+DEFAULT_DAYS = [90, 365, 3650, 36500]
+DEFAULT_USERS = [1]
+DEFAULT_OUTPUT = 'benchmark_results.json'
+# 基准测试使用固定的种子和开始日期，保证每次生成的数据完全相同
+BENCHMARK_SEED = 42
+BENCHMARK_START_DATE = datetime.datetime(2020, 1, 1)
+# 默认的退化阈值(相对基准结果增加20%)，以及忽略的最小耗时差(秒)
+DEFAULT_THRESHOLD = 0.2
+MIN_SECONDS_DELTA = 0.01
+
+
+def _parse_int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(',') if value.strip()]
+
+
+def _count_records(export_data: Dict[str, Any]) -> int:
+    """导出数据中的记录数(体重、体脂、训练项目和营养记录)"""
+    data = export_data['data']
+    return (len(data['weights']) + len(data['bodyFat']) + len(data['nutrition'])
+            + sum(len(daily) for daily in data['workouts'].values()))
+
+
+def _measure(func: Callable[[], Any], trace_memory: bool) -> tuple:
+    """
+    执行一次阶段函数
+
+    Returns:
+        (返回值, 耗时秒数, 阶段内新增的峰值内存字节数；未跟踪内存时为None)
+    """
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - baseline if trace_memory else None
+    return result, seconds, peak
+
+
+def _run_user(days: int, user_index: int, backend: str, workdir: str,
+              trace_memory: bool) -> Dict[str, Dict[str, Any]]:
+    """依次执行一个用户的各阶段，返回 阶段名 -> {seconds, peakMemoryBytes}"""
+    profile = make_user_profile(BENCHMARK_SEED, user_index)
+    generator = FitnessDataGenerator(
+        days=days,
+        start_date=BENCHMARK_START_DATE,
+        initial_weight=profile["initial_weight"],
+        initial_body_fat=profile["initial_body_fat"],
+        backend=backend,
+        seed=BENCHMARK_SEED,
+        user_id=user_index,
+        user_settings=profile["user_settings"]
+    )
+    json_path = os.path.join(workdir, f'user_{user_index}.json')
+    stream_path = os.path.join(workdir, f'user_{user_index}_stream.json')
+    phases = {}
+
+    def run(phase, func):
+        result, seconds, peak = _measure(func, trace_memory)
+        phases[phase] = {"seconds": seconds, "peakMemoryBytes": peak}
+        return result
+
+    export_data = run('generate', generator.generate_demo_data)
+    records = _count_records(export_data)
+
+    def write_json():
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
+    run('write_json', write_json)
+    del export_data
+
+    def stream_write():
+        with open(stream_path, 'w', encoding='utf-8') as f:
+            generator.write_demo_data(f)
+    run('stream_write', stream_write)
+
+    # 验证函数逐项输出结果，基准测试中丢弃这些输出
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        valid = run('validate', lambda: validate_flutter_import_format(json_path))
+        valid_stream = run('validate_stream', lambda: validate_flutter_import_format_streaming(json_path))
+    if not (valid and valid_stream):
+        raise RuntimeError(f"生成的数据未通过验证: {days}天, 用户{user_index}")
+
+    size = os.path.getsize(json_path)
+    for phase in phases.values():
+        phase["records"] = records
+        phase["bytes"] = size
+    os.remove(json_path)
+    os.remove(stream_path)
+    return phases
+
+
+def run_case(days: int, users: int, backend: str = 'auto', repeat: int = 1,
+             trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    测量一组(天数, 用户数)
+
+    用户依次生成，各阶段的耗时和记录数为所有用户之和，峰值内存为单个用户的最大值；
+    耗时取repeat次中最快的一次。跟踪内存会显著拖慢执行，因此峰值内存单独运行一次测量。
+    bytes为输出JSON文件的大小，各阶段的bytesPerSecond都以它为基准。
+    """
+    with tempfile.TemporaryDirectory(prefix='fitness_benchmark_') as workdir:
+        best: Dict[str, Dict[str, Any]] = {}
+        for _ in range(repeat):
+            totals = {phase: {"seconds": 0.0, "records": 0, "bytes": 0} for phase in PHASES}
+            for user_index in range(users):
+                for phase, result in _run_user(days, user_index, backend, workdir, False).items():
+                    for key in totals[phase]:
+                        totals[phase][key] += result[key]
+            for phase, total in totals.items():
+                if phase not in best or total["seconds"] < best[phase]["seconds"]:
+                    best[phase] = total
+
+        peaks = {phase: None for phase in PHASES}
+        if trace_memory:
+            tracemalloc.start()
+            try:
+                for user_index in range(users):
+                    for phase, result in _run_user(days, user_index, backend, workdir, True).items():
+                        peaks[phase] = max(peaks[phase] or 0, result["peakMemoryBytes"])
+            finally:
+                tracemalloc.stop()
+
+    phases = {}
+    for phase in PHASES:
+        total = best[phase]
+        seconds = max(total["seconds"], 1e-9)
+        phases[phase] = {
+            "seconds": round(total["seconds"], 4),
+            "records": total["records"],
+            "bytes": total["bytes"],
+            "recordsPerSecond": round(total["records"] / seconds, 1),
+            "bytesPerSecond": round(total["bytes"] / seconds, 1),
+            "peakMemoryBytes": peaks[phase]
+        }
+    return {"days": days, "users": users, "phases": phases}
+
+
+def _environment(backend: str) -> Dict[str, Any]:
+    generator = FitnessDataGenerator(days=1, backend=backend, seed=BENCHMARK_SEED)
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "backend": 'numpy' if generator.use_numpy else 'python',
+        "numpy": np.__version__ if np is not None else None
+    }
+
+
+def run_benchmarks(days_list: List[int], users_list: List[int], backend: str = 'auto',
+                   repeat: int = 1, trace_memory: bool = True) -> Dict[str, Any]:
+    """扫描所有(天数, 用户数)组合，返回完整的基准测试结果"""
+    cases = []
+    for users in users_list:
+        for days in days_list:
+            print(f"正在测试 {days} 天 × {users} 个用户...")
+            case = run_case(days, users, backend, repeat, trace_memory)
+            _print_case(case)
+            cases.append(case)
+    return {
+        "createdAt": datetime.datetime.now().isoformat(timespec='seconds'),
+        "environment": _environment(backend),
+        "config": {"seed": BENCHMARK_SEED, "repeat": repeat, "traceMemory": trace_memory},
+        "cases": cases
+    }
+
+
+def _print_case(case: Dict[str, Any]) -> None:
+    for phase, result in case["phases"].items():
+        peak = result["peakMemoryBytes"]
+        memory = f", 峰值内存 {peak / 1e6:.1f} MB" if peak is not None else ""
+        print(f"  {phase:<16} {result['seconds']:>9.3f} 秒, {result['recordsPerSecond']:>12,.0f} 条/秒, "
+              f"{result['bytesPerSecond'] / 1e6:>8.1f} MB/秒{memory}")
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    与基准结果对比，返回性能退化列表
+
+    同一(天数, 用户数, 阶段)的耗时或峰值内存比基准结果增加超过threshold(相对值)即视为退化；
+    耗时差小于MIN_SECONDS_DELTA的不计，只在一方存在的组合会被忽略。
+    """
+    baseline_cases = {(case["days"], case["users"]): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current["cases"]:
+        base_case = baseline_cases.get((case["days"], case["users"]))
+        if base_case is None:
+            continue
+        for phase, result in case["phases"].items():
+            base = base_case["phases"].get(phase)
+            if base is None:
+                continue
+            checks = [("seconds", result["seconds"], base["seconds"])]
+            if result["peakMemoryBytes"] is not None and base.get("peakMemoryBytes"):
+                checks.append(("peakMemoryBytes", result["peakMemoryBytes"], base["peakMemoryBytes"]))
+            for metric, value, base_value in checks:
+                if metric == "seconds" and value - base_value < MIN_SECONDS_DELTA:
+                    continue
+                if base_value and value > base_value * (1 + threshold):
+                    regressions.append({
+                        "days": case["days"],
+                        "users": case["users"],
+                        "phase": phase,
+                        "metric": metric,
+                        "baseline": base_value,
+                        "current": value,
+                        "change": round(value / base_value - 1, 4)
+                    })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量演示数据生成、JSON写出和格式验证的性能')
+    parser.add_argument('--days', type=_parse_int_list, default=DEFAULT_DAYS,
+                        help='逗号分隔的天数列表 (默认: 90,365,3650,36500)')
+    parser.add_argument('--users', type=_parse_int_list, default=DEFAULT_USERS,
+                        help='逗号分隔的用户数列表 (默认: 1)')
+    parser.add_argument('--backend', choices=['auto', 'numpy', 'python'], default='auto',
+                        help='随机游走计算后端 (默认: auto)')
+    parser.add_argument('--repeat', type=int, default=1, help='每组重复次数，耗时取最快一次 (默认: 1)')
+    parser.add_argument('--no-memory', action='store_true', help='不使用tracemalloc测量峰值内存')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT,
+                        help=f'结果文件 (默认: {DEFAULT_OUTPUT})')
+    parser.add_argument('--compare', type=str, default=None, help='与之前保存的结果文件对比')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='判定为性能退化的相对增幅 (默认: 0.2，即20%%)')
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.days, args.users, args.backend, args.repeat, not args.no_memory)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        results["comparison"] = {
+            "baseline": args.compare,
+            "threshold": args.threshold,
+            "regressions": regressions
+        }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ 基准测试结果已保存到 {args.output}")
+
+    if args.compare:
+        if not regressions:
+            print(f"✓ 与 {args.compare} 相比没有超过 {args.threshold:.0%} 的性能退化")
+            return 0
+        print(f"✗ 与 {args.compare} 相比发现 {len(regressions)} 项性能退化:")
+        for item in regressions:
+            print(f"  - {item['days']}天 × {item['users']}用户 {item['phase']} {item['metric']}: "
+                  f"{item['baseline']} → {item['current']} (+{item['change']:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
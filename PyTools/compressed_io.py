@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+压缩文件读写
+按扩展名写出gzip/xz/bz2压缩的导出文件，按文件开头的魔数透明读取。
+写出时把数据切成独立压缩的块，在线程池中并行压缩；块依次拼接，结果仍是标准的多成员(多流)压缩文件，
+gzip、xz和bzip2命令都可以直接解压。读取时能定位块边界的文件在线程池中并行解压
+"""
+
+import bz2
+import collections
+import gzip
+import io
+import lzma
+import mmap
+import os
+import re
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, BinaryIO, Optional, Tuple
+
+COMPRESSIONS = ('gzip', 'xz', 'bz2')
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'xz': '.xz',
+    'bz2': '.bz2'
+}
+
+_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bz2')
+)
+
+# 默认压缩级别(xz为preset)
+DEFAULT_LEVELS = {
+    'gzip': 6,
+    'xz': 6,
+    'bz2': 9
+}
+
+# 每个独立压缩块的解压后大小；小于一个块的输出就是普通的单成员压缩文件
+DEFAULT_BLOCK_BYTES = 1 << 22
+
+# gzip成员头部的附加字段(FEXTRA)中记录整个成员的字节数，读取时不解压即可找到下一个成员
+_GZIP_SUBFIELD = b'FB'
+_GZIP_HEADER = struct.Struct('<4sIBBH2sHI')
+_GZIP_TRAILER = struct.Struct('<II')
+
+# bzip2流头("BZh"+块大小)之后紧跟第一个块的魔数(π的BCD码)
+_BZ2_STREAM_START = re.compile(rb'BZh[1-9]1AY&SY')
+
+_XZ_MAGIC = b'\xfd7zXZ\x00'
+_XZ_FOOTER_MAGIC = b'YZ'
+
+
+def compression_from_path(path: str) -> Optional[str]:
+    """按扩展名判断写出时使用的压缩格式，没有压缩扩展名时为None"""
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def strip_compression_extension(path: str) -> str:
+    """去掉压缩扩展名(a.json.gz -> a.json)"""
+    compression = compression_from_path(path)
+    return path[:-len(COMPRESSION_EXTENSIONS[compression])] if compression else path
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """按文件开头的魔数判断压缩格式，未压缩的文件和目录为None"""
+    if os.path.isdir(path):
+        return None
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+# === 压缩 ===
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    deflate = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = deflate.compress(data) + deflate.flush()
+    size = _GZIP_HEADER.size + len(body) + _GZIP_TRAILER.size
+    # FLG=FEXTRA，MTIME=0，OS=255(未知)，附加字段为一个子字段 FB + 4字节的成员大小
+    header = _GZIP_HEADER.pack(b'\x1f\x8b\x08\x04', 0, 0, 255, 8, _GZIP_SUBFIELD, 4, size)
+    return header + body + _GZIP_TRAILER.pack(zlib.crc32(data), len(data) & 0xffffffff)
+
+
+def compress_block(data: bytes, compression: str, level: Optional[int] = None) -> bytes:
+    """把一块数据压缩为一个独立的gzip成员、xz流或bzip2流"""
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    if compression == 'gzip':
+        return _gzip_member(data, level)
+    if compression == 'xz':
+        return lzma.compress(data, preset=level)
+    if compression == 'bz2':
+        return bz2.compress(data, level)
+    raise ValueError(f"不支持的压缩格式: {compression}")
+
+
+class BlockCompressedWriter(io.BufferedIOBase):
+    """
+    分块并行压缩的二进制写入器
+
+    写入的数据每满block_bytes字节提交到线程池压缩(zlib、lzma和bz2压缩时都会释放GIL)，
+    压缩结果按提交顺序写入文件；同时等待写出的块不超过线程数的两倍，内存占用有上限。
+    """
+
+    def __init__(self, raw: BinaryIO, compression: str, level: Optional[int] = None,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES, threads: Optional[int] = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        self.raw = raw
+        self.compression = compression
+        self.level = level
+        self.block_bytes = block_bytes
+        self.threads = threads or os.cpu_count() or 1
+        self.blocks = 0
+        self.bytes_in = 0
+        self._buffer = bytearray()
+        self._pending = collections.deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.threads) if self.threads > 1 else None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError("写入已关闭的文件")
+        self._buffer += data
+        while len(self._buffer) >= self.block_bytes:
+            self._submit(bytes(self._buffer[:self.block_bytes]))
+            del self._buffer[:self.block_bytes]
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self.blocks += 1
+        self.bytes_in += len(block)
+        if self._executor is None:
+            self.raw.write(compress_block(block, self.compression, self.level))
+            return
+        self._pending.append(self._executor.submit(compress_block, block, self.compression, self.level))
+        while len(self._pending) > self.threads * 2:
+            self.raw.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            # 空输出也写出一个块，保证结果是合法的压缩文件
+            if self._buffer or not self.blocks:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self.raw.write(self._pending.popleft().result())
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self.raw.close()
+            super().close()
+
+
+def open_output(path: str, mode: str = 'w', compression: Optional[str] = None,
+                level: Optional[int] = None, threads: Optional[int] = None,
+                block_bytes: int = DEFAULT_BLOCK_BYTES):
+    """
+    打开输出文件，文件名带.gz/.xz/.bz2扩展名(或指定compression)时分块并行压缩
+
+    Args:
+        mode: 'w'为UTF-8文本，'wb'为二进制
+        threads: 压缩线程数(默认为CPU核心数)
+    """
+    compression = compression or compression_from_path(path)
+    if compression is None:
+        return open(path, mode, encoding='utf-8') if mode == 'w' else open(path, mode)
+    writer = BlockCompressedWriter(open(path, 'wb'), compression, level, block_bytes, threads)
+    return io.TextIOWrapper(writer, encoding='utf-8') if mode == 'w' else writer
+
+
+# === 解压 ===
+
+def _read_varint(buf: Any, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _gzip_spans(buf: Any) -> Optional[List[Tuple[int, int]]]:
+    """按成员头部附加字段中的大小定位各gzip成员；有成员没有记录大小时(如gzip命令生成的文件)返回None"""
+    spans = []
+    pos, size = 0, len(buf)
+    while pos < size:
+        if buf[pos:pos + 3] != b'\x1f\x8b\x08' or not buf[pos + 3] & 0x04:
+            return None
+        xlen, = struct.unpack_from('<H', buf, pos + 10)
+        extra = buf[pos + 12:pos + 12 + xlen]
+        member_size = None
+        i = 0
+        while i + 4 <= len(extra):
+            length, = struct.unpack_from('<H', extra, i + 2)
+            if extra[i:i + 2] == _GZIP_SUBFIELD and length == 4:
+                member_size, = struct.unpack_from('<I', extra, i + 4)
+            i += 4 + length
+        if member_size is None or pos + member_size > size:
+            return None
+        spans.append((pos, pos + member_size))
+        pos += member_size
+    return spans
+
+
+def _xz_spans(buf: Any) -> Optional[List[Tuple[int, int]]]:
+    """从文件末尾向前，按流尾部和索引中记录的大小定位各xz流"""
+    spans = []
+    end = len(buf)
+    while end > 0:
+        # 流之间允许有4字节倍数的零填充
+        while end >= 4 and buf[end - 4:end] == b'\0\0\0\0':
+            end -= 4
+        if end < 24 or buf[end - 2:end] != _XZ_FOOTER_MAGIC:
+            return None
+        backward_size, = struct.unpack_from('<I', buf, end - 8)
+        index_start = end - 12 - (backward_size + 1) * 4
+        if index_start < 12 or buf[index_start] != 0:
+            return None
+        # 索引: 0x00, 块数, 每块的(未填充大小, 解压后大小)
+        count, pos = _read_varint(buf, index_start + 1)
+        blocks_size = 0
+        for _ in range(count):
+            unpadded, pos = _read_varint(buf, pos)
+            _, pos = _read_varint(buf, pos)
+            blocks_size += (unpadded + 3) & ~3
+        start = index_start - blocks_size - 12
+        if start < 0 or buf[start:start + 6] != _XZ_MAGIC:
+            return None
+        spans.append((start, end))
+        end = start
+    spans.reverse()
+    return spans
+
+
+def _bz2_spans(buf: Any) -> Optional[List[Tuple[int, int]]]:
+    """
+    按流头定位各bzip2流
+
+    bzip2流的结尾不按字节对齐，只能查找流头和第一个块的魔数(共10字节)；
+    压缩数据中出现同样字节序列的概率可以忽略，解压时仍会检查每一段都是完整的流。
+    """
+    starts = [match.start() for match in _BZ2_STREAM_START.finditer(buf)]
+    if not starts or starts[0] != 0:
+        return None
+    return list(zip(starts, starts[1:] + [len(buf)]))
+
+
+def block_spans(path: str, compression: Optional[str] = None) -> Optional[List[Tuple[int, int]]]:
+    """压缩文件中各独立压缩块的字节范围[start, end)，无法定位时返回None"""
+    compression = compression or detect_compression(path)
+    locate = {'gzip': _gzip_spans, 'xz': _xz_spans, 'bz2': _bz2_spans}.get(compression)
+    if locate is None or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            return locate(mm)
+        except (IndexError, struct.error):
+            return None
+
+
+def decompress_block(data: bytes, compression: str) -> bytes:
+    """解压一个完整的gzip成员、xz流或bzip2流"""
+    if compression == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif compression == 'xz':
+        decompressor = lzma.LZMADecompressor(lzma.FORMAT_XZ)
+    else:
+        decompressor = bz2.BZ2Decompressor()
+    result = decompressor.decompress(data)
+    if not decompressor.eof or decompressor.unused_data:
+        raise ValueError(f"压缩块不完整或块边界错误 ({compression})")
+    return result
+
+
+class ParallelBlockReader(io.RawIOBase):
+    """按顺序读出各压缩块解压后的内容，后续的块在线程池中提前解压"""
+
+    def __init__(self, path: str, compression: str, spans: List[Tuple[int, int]], threads: int):
+        self.f = open(path, 'rb')
+        self.compression = compression
+        self.threads = threads
+        self._spans = collections.deque(spans)
+        self._pending = collections.deque()
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._chunk = b''
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _schedule(self) -> None:
+        while self._spans and len(self._pending) < self.threads * 2:
+            start, end = self._spans.popleft()
+            self.f.seek(start)
+            self._pending.append(self._executor.submit(decompress_block, self.f.read(end - start),
+                                                       self.compression))
+
+    def readinto(self, b: Any) -> int:
+        while self._offset >= len(self._chunk):
+            self._schedule()
+            if not self._pending:
+                return 0
+            self._chunk = self._pending.popleft().result()
+            self._offset = 0
+        n = min(len(b), len(self._chunk) - self._offset)
+        b[:n] = self._chunk[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown()
+        self.f.close()
+        super().close()
+
+
+def open_input(path: str, mode: str = 'rb', threads: Optional[int] = None):
+    """
+    打开输入文件，按魔数透明解压gzip/xz/bz2
+
+    由open_output写出的多块文件在threads(默认为CPU核心数)个线程中并行解压；
+    其他压缩文件(如gzip命令生成的单成员文件)按顺序解压。
+
+    Args:
+        mode: 'rb'为二进制，'r'为UTF-8文本
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        return open(path, mode, encoding='utf-8') if mode == 'r' else open(path, mode)
+    threads = threads or os.cpu_count() or 1
+    spans = block_spans(path, compression) if threads > 1 else None
+    if spans is not None and len(spans) > 1:
+        f = io.BufferedReader(ParallelBlockReader(path, compression, spans, threads), buffer_size=1 << 16)
+    else:
+        f = {'gzip': gzip.open, 'xz': lzma.open, 'bz2': bz2.open}[compression](path, 'rb')
+    return io.TextIOWrapper(f, encoding='utf-8') if mode == 'r' else f
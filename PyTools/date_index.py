@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+导出文件的日期索引
+扫描一次JSON导出文件，把weights、bodyFat、workouts(按日期键)和nutrition中每条记录的日期和字节范围
+保存为旁路索引文件；之后按日期范围截取时只根据索引定位并复制这些字节，不再解析整个文件。
+文件修改后索引自动失效并重新生成
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from compressed_io import detect_compression, open_output
+from export_writer import SECTIONS, StreamingExportWriter
+from json_stream import detect_indent, iter_export
+
+# 索引文件与导出文件放在一起，扩展名不是.json，批量验证时不会被当作导出文件
+INDEX_SUFFIX = '.dateidx'
+# 索引内容的格式版本，结构变化时递增
+INDEX_FORMAT_VERSION = 1
+# 计算文件指纹时读取的开头和结尾字节数
+FINGERPRINT_BYTES = 1 << 16
+
+
+def index_path_for(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def _file_signature(path: str) -> Dict[str, Any]:
+    """
+    文件的大小、修改时间和指纹(开头和结尾各FINGERPRINT_BYTES字节的哈希)
+
+    修改时间精度不足或被还原时，指纹仍能发现同样大小的文件内容变化(追加、改写首尾的记录)。
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(stat.st_size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return {"size": stat.st_size, "mtimeNs": stat.st_mtime_ns, "fingerprint": digest.hexdigest()}
+
+
+def build_index(path: str) -> Dict[str, Any]:
+    """
+    扫描导出文件，返回日期索引(不写入索引文件)
+
+    索引中每个部分为按文件顺序排列的[日期, 起始字节, 结束字节]；workouts的范围只包含值，不含日期键。
+    sorted表示该部分的日期是否单调不减，此时按日期范围查找可以二分。
+    """
+    if detect_compression(path) is not None:
+        raise ValueError("压缩文件无法按字节定位记录，请先解压后再建立索引")
+    signature = _file_signature(path)
+    sections = {section: [] for section in SECTIONS}
+    fields = {}
+    user_settings = None
+
+    with open(path, 'rb') as f:
+        indent = detect_indent(f.read(256))
+        f.seek(0)
+        for event in iter_export(f):
+            if event.kind == 'item' and event.section in sections:
+                if event.section == 'workouts':
+                    date = event.key
+                elif isinstance(event.value, dict) and isinstance(event.value.get('date'), str):
+                    date = event.value['date']
+                else:
+                    raise ValueError(f"{event.section}中第{event.key + 1}条记录没有date字段，无法建立索引")
+                sections[event.section].append([date[:10], event.start, event.end])
+            elif event.kind == 'field':
+                fields[event.key] = event.value
+            elif event.kind == 'section_value' and event.section == 'userSettings':
+                user_settings = event.value
+
+    return {
+        "version": INDEX_FORMAT_VERSION,
+        "file": signature,
+        "indent": indent,
+        "fields": {"version": fields.get("version", "1.0"), "exportDate": fields.get("exportDate")},
+        "userSettings": user_settings if user_settings is not None else {},
+        "sections": {
+            section: {
+                "sorted": all(entries[i][0] <= entries[i + 1][0] for i in range(len(entries) - 1)),
+                "entries": entries
+            }
+            for section, entries in sections.items()
+        }
+    }
+
+
+def _index_is_current(index: Dict[str, Any], path: str) -> bool:
+    if index.get("version") != INDEX_FORMAT_VERSION:
+        return False
+    stat = os.stat(path)
+    recorded = index["file"]
+    if recorded["size"] != stat.st_size or recorded["mtimeNs"] != stat.st_mtime_ns:
+        return False
+    return _file_signature(path)["fingerprint"] == recorded["fingerprint"]
+
+
+def write_index(path: str, index: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """建立(或使用给定的)索引并写入索引文件"""
+    index = index or build_index(path)
+    with open(index_path_for(path), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    return index
+
+
+def load_index(path: str, rebuild: bool = True) -> Tuple[Dict[str, Any], str]:
+    """
+    读取导出文件的索引
+
+    索引文件不存在、格式版本不同，或导出文件的大小、修改时间和指纹与索引记录的不一致时，视为失效：
+    rebuild=True时重新建立并保存，否则抛出ValueError。
+
+    Returns:
+        (索引, 状态: "current"(索引有效)、"built"(新建)或"rebuilt"(失效后重建))
+    """
+    index_path = index_path_for(path)
+    status = "built"
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if _index_is_current(index, path):
+                return index, "current"
+        except (ValueError, KeyError):
+            pass
+        status = "rebuilt"
+    if not rebuild:
+        raise ValueError(f"{path} 的日期索引不存在或已失效")
+    return write_index(path), status
+
+
+def _select(entries: List[List[Any]], is_sorted: bool, start_date: str, end_date: str) -> List[List[Any]]:
+    """选出日期在[start_date, end_date]内的条目(保持文件中的顺序)"""
+    if is_sorted:
+        dates = [entry[0] for entry in entries]
+        return entries[bisect.bisect_left(dates, start_date):bisect.bisect_right(dates, end_date)]
+    return [entry for entry in entries if start_date <= entry[0] <= end_date]
+
+
+def slice_export(path: str, start_date: str, end_date: str, output: str,
+                 index: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    截取导出文件中日期在[start_date, end_date]之间的记录，写出为合法的导出文件
+
+    记录按索引中的字节范围直接复制，不重新解析和序列化；输出的缩进与原文件一致，
+    原文件由json.dump(indent=2)或流式写出时，结果与对截取后的数据调用json.dump逐字节一致。
+    version、exportDate和userSettings保持不变。
+
+    Returns:
+        各部分截取的记录数和输出文件中的日期范围
+    """
+    if index is None:
+        index = load_index(path)[0]
+    start_date, end_date = start_date[:10], end_date[:10]
+    if start_date > end_date:
+        raise ValueError(f"开始日期 {start_date} 晚于结束日期 {end_date}")
+
+    counts = {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            open_output(output, 'w') as out:
+        fields = index["fields"]
+        writer = StreamingExportWriter(out, indent=index["indent"], version=fields["version"],
+                                       export_date=fields["exportDate"])
+        fmt = writer.formatter
+        for section in SECTIONS:
+            entries = _select(index["sections"][section]["entries"], index["sections"][section]["sorted"],
+                              start_date, end_date)
+            for date, start, end in entries:
+                item = mm[start:end].decode('utf-8')
+                if section == 'workouts':
+                    item = fmt.key(date) + item
+                writer.add_formatted(section, item, date)
+            counts[section] = len(entries)
+        stats = writer.close(index["userSettings"])
+
+    return {"counts": counts, "firstDate": stats["firstDate"], "lastDate": stats["lastDate"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='为JSON导出文件建立日期索引，并按日期范围截取')
+    parser.add_argument('input', help='JSON导出文件')
+    parser.add_argument('--start', type=str, default=None, help='截取的开始日期 YYYY-MM-DD (含)')
+    parser.add_argument('--end', type=str, default=None, help='截取的结束日期 YYYY-MM-DD (含)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='截取结果的输出文件 (默认: 输入文件名加日期范围)')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有索引，重新建立')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    try:
+        if args.rebuild:
+            index, status = write_index(args.input), "rebuilt"
+        else:
+            index, status = load_index(args.input)
+    except (OSError, ValueError) as e:
+        print(f"✗ 建立索引失败: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+    if status == "current":
+        print(f"✓ 使用已有索引 {index_path_for(args.input)}")
+    else:
+        action = "重新建立" if status == "rebuilt" else "建立"
+        print(f"✓ 已{action}索引 {index_path_for(args.input)} ({elapsed:.2f} 秒)")
+    print("- 记录数: " + ", ".join(f"{section} {len(entry['entries'])}"
+                                   for section, entry in index["sections"].items()))
+
+    if args.start is None and args.end is None:
+        return 0
+
+    start_date = args.start or '0000-00-00'
+    end_date = args.end or '9999-99-99'
+    output = args.output
+    if output is None:
+        base, extension = os.path.splitext(args.input)
+        output = f"{base}_{args.start or 'begin'}_{args.end or 'end'}{extension}"
+    start_time = time.perf_counter()
+    try:
+        result = slice_export(args.input, start_date, end_date, output, index)
+    except (OSError, ValueError) as e:
+        print(f"✗ 截取失败: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    counts = result["counts"]
+    print(f"✓ 已将 {start_date if args.start else '开头'} 到 {end_date if args.end else '结尾'} 的数据截取到 "
+          f"{output} ({os.path.getsize(output)} 字节, {elapsed:.3f} 秒)")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
+    if result["firstDate"]:
+        print(f"- 数据日期范围: {result['firstDate']} 到 {result['lastDate']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+按列存储的日数据表
+生成器把一段连续日期的数据填入DayTable，各种输出方式再从这里序列化；
+只有在需要时才把记录物化为字典
+"""
+
+import datetime
+from array import array
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+
+
+class DayTable:
+    """
+    一段连续日期的列式数据
+
+    日期轴只计算一次；体重和体脂以0.1为单位的整数存储；
+    训练项目和餐食是按天偏移索引的子表：第k天的训练项目为
+    workout_offsets[k]到workout_offsets[k+1]之间的行，餐食同理。
+    """
+
+    def __init__(self, start_date: datetime.datetime, first_day: int, count: int,
+                 workout_templates: Sequence[Dict[str, Any]], meal_templates: Sequence[Dict[str, Any]]):
+        self.first_day = first_day
+        self.count = count
+        self.workout_templates = workout_templates
+        self.meal_templates = meal_templates
+
+        # 日期轴：start_date + i天保持相同的时刻，训练记录的时间戳只需拼接同一个时间后缀
+        first = start_date + datetime.timedelta(days=first_day)
+        ordinal = first.toordinal()
+        self.dates = [datetime.date.fromordinal(ordinal + k).isoformat() for k in range(count)]
+        self.time_suffix = first.isoformat()[10:]
+
+        # 体重/体脂(0.1为单位)及是否有记录
+        self.weight = array('i', bytes(4 * count))
+        self.has_weight = bytearray(count)
+        self.body_fat = array('i', bytes(4 * count))
+        self.has_body_fat = bytearray(count)
+
+        # 每日营养汇总
+        self.has_nutrition = bytearray(count)
+        self.calorie_intake = array('i', bytes(4 * count))
+        self.calories_burned = array('i', bytes(4 * count))
+        self.calorie_goal = array('i', bytes(4 * count))
+
+        # 训练子表
+        self.workout_offsets = array('l', [0])
+        self.workout_template = array('B')
+        self.workout_completed = bytearray()
+
+        # 餐食子表：每行对应一个食物(Flutter中的一个MealEntry)
+        self.meal_offsets = array('l', [0])
+        self.meal_template = array('B')
+        self.meal_food = array('B')
+        self.meal_calories = array('i')
+
+    # === 填充 ===
+
+    def set_walks(self, weight: Optional[Sequence[int]] = None, has_weight: Optional[Sequence[bool]] = None,
+                  body_fat: Optional[Sequence[int]] = None, has_body_fat: Optional[Sequence[bool]] = None) -> None:
+        """整列写入体重/体脂游走结果(0.1为单位)和是否有记录"""
+        if weight is not None:
+            self.weight = array('i', weight)
+            self.has_weight = bytearray(has_weight)
+        if body_fat is not None:
+            self.body_fat = array('i', body_fat)
+            self.has_body_fat = bytearray(has_body_fat)
+
+    def append_workouts(self, templates: Sequence[int], completed: Sequence[bool]) -> None:
+        """按日期顺序追加下一天的训练项目(模板序号和完成状态)"""
+        self.workout_template.extend(templates)
+        self.workout_completed.extend(completed)
+        self.workout_offsets.append(len(self.workout_template))
+
+    def append_nutrition(self, k: int, meals: Sequence[Tuple[int, int, int]],
+                         calories_burned: int, calorie_goal: int) -> None:
+        """按日期顺序追加第k天的营养记录，meals为(餐食模板序号, 食物序号, 热量)"""
+        intake = 0
+        for template_index, food_index, calories in meals:
+            self.meal_template.append(template_index)
+            self.meal_food.append(food_index)
+            self.meal_calories.append(calories)
+            intake += calories
+        self.meal_offsets.append(len(self.meal_template))
+        self.has_nutrition[k] = 1
+        self.calorie_intake[k] = intake
+        self.calories_burned[k] = calories_burned
+        self.calorie_goal[k] = calorie_goal
+
+    def skip_nutrition(self) -> None:
+        """按日期顺序跳过没有营养记录的一天"""
+        self.meal_offsets.append(len(self.meal_template))
+
+    # === 物化为字典 ===
+
+    def weight_record(self, k: int) -> Optional[Dict[str, Any]]:
+        if not self.has_weight[k]:
+            return None
+        return {"date": self.dates[k], "weight": self.weight[k] / 10}
+
+    def body_fat_record(self, k: int) -> Optional[Dict[str, Any]]:
+        if not self.has_body_fat[k]:
+            return None
+        return {"date": self.dates[k], "bodyFatPercentage": self.body_fat[k] / 10}
+
+    def workout_records(self, k: int) -> List[Dict[str, Any]]:
+        date_time = self.dates[k] + self.time_suffix
+        records = []
+        for row in range(self.workout_offsets[k], self.workout_offsets[k + 1]):
+            workout = self.workout_templates[self.workout_template[row]]
+            records.append({
+                "date": date_time,
+                "name": workout["name"],
+                "sets": workout["sets"],
+                "isCompleted": bool(self.workout_completed[row])
+            })
+        return records
+
+    def nutrition_record(self, k: int) -> Optional[Dict[str, Any]]:
+        if not self.has_nutrition[k]:
+            return None
+        meals = []
+        for row in range(self.meal_offsets[k], self.meal_offsets[k + 1]):
+            meal = self.meal_templates[self.meal_template[row]]
+            meals.append({
+                "name": meal["name"],
+                "foods": [meal["foods"][self.meal_food[row]]],
+                "calories": self.meal_calories[row]
+            })
+        return {
+            "date": self.dates[k],
+            "calorieIntake": self.calorie_intake[k],
+            "caloriesBurned": self.calories_burned[k],
+            "calorieGoal": self.calorie_goal[k],
+            "meals": meals
+        }
+
+    def weight_records(self) -> List[Dict[str, Any]]:
+        return [self.weight_record(k) for k in range(self.count) if self.has_weight[k]]
+
+    def body_fat_records(self) -> List[Dict[str, Any]]:
+        return [self.body_fat_record(k) for k in range(self.count) if self.has_body_fat[k]]
+
+    def workout_map(self) -> Dict[str, List[Dict[str, Any]]]:
+        """训练数据(日期 -> 当天训练项目)，没有训练的日期不出现"""
+        return {self.dates[k]: self.workout_records(k) for k in range(self.count)
+                if self.workout_offsets[k + 1] > self.workout_offsets[k]}
+
+    def nutrition_records(self) -> List[Dict[str, Any]]:
+        return [self.nutrition_record(k) for k in range(self.count) if self.has_nutrition[k]]
+
+    def iter_days(self) -> Iterator[Dict[str, Any]]:
+        """按天产出记录，格式与FitnessDataGenerator.iter_days()一致"""
+        for k in range(self.count):
+            yield {
+                "date": self.dates[k],
+                "weight": self.weight_record(k),
+                "bodyFat": self.body_fat_record(k),
+                "workouts": self.workout_records(k),
+                "nutrition": self.nutrition_record(k)
+            }
+
+    # === 直接序列化 ===
+
+    def format_items(self, formatter) -> Iterator[Tuple[str, str, str, int]]:
+        """
+        不经过字典，直接从列数据序列化各条记录
+
+        产出与RecordFormatter.format_day()相同的(部分名, 序列化后的元素, 日期, 子项目数)，
+        且序列化结果与对物化后的字典调用formatter.dumps()逐字节一致。
+        """
+        fmt = formatter
+        obj, arr = fmt.format_object, fmt.format_array
+        dumps_str = fmt.dumps_str
+        workout_names = [dumps_str(t["name"]) for t in self.workout_templates]
+        workout_sets = [str(t["sets"]) for t in self.workout_templates]
+        meal_names = [dumps_str(t["name"]) for t in self.meal_templates]
+        meal_foods = [[arr([dumps_str(food)], 6) for food in t["foods"]] for t in self.meal_templates]
+
+        for k in range(self.count):
+            date = self.dates[k]
+            date_json = '"' + date + '"'
+            if self.has_weight[k]:
+                yield ('weights', obj([('date', date_json), ('weight', repr(self.weight[k] / 10))], 3), date, 0)
+            if self.has_body_fat[k]:
+                yield ('bodyFat', obj([('date', date_json),
+                                       ('bodyFatPercentage', repr(self.body_fat[k] / 10))], 3), date, 0)
+
+            start, end = self.workout_offsets[k], self.workout_offsets[k + 1]
+            if end > start:
+                date_time_json = '"' + date + self.time_suffix + '"'
+                workouts = []
+                for row in range(start, end):
+                    t = self.workout_template[row]
+                    workouts.append(obj([
+                        ('date', date_time_json),
+                        ('name', workout_names[t]),
+                        ('sets', workout_sets[t]),
+                        ('isCompleted', 'true' if self.workout_completed[row] else 'false')
+                    ], 4))
+                yield ('workouts', fmt.key(date) + arr(workouts, 3), date, end - start)
+
+            if self.has_nutrition[k]:
+                start, end = self.meal_offsets[k], self.meal_offsets[k + 1]
+                meals = []
+                for row in range(start, end):
+                    t = self.meal_template[row]
+                    meals.append(obj([
+                        ('name', meal_names[t]),
+                        ('foods', meal_foods[t][self.meal_food[row]]),
+                        ('calories', str(self.meal_calories[row]))
+                    ], 5))
+                yield ('nutrition', obj([
+                    ('date', date_json),
+                    ('calorieIntake', str(self.calorie_intake[k])),
+                    ('caloriesBurned', str(self.calories_burned[k])),
+                    ('calorieGoal', str(self.calorie_goal[k])),
+                    ('meals', arr(meals, 4))
+                ], 3), date, end - start)
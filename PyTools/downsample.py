@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+体重和体脂率曲线的降采样
+用LTTB(Largest-Triangle-Three-Buckets)把weights和bodyFat序列降采样到每个缩放级别的目标点数，
+保留曲线的峰谷形状。结果保存为紧凑的旁路JSON文件，图表直接使用，不必绘制多年的全部记录。
+批量处理时同一批的全部用户序列一起计算：每个桶只做一次向量化运算，而不是逐用户循环
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from compressed_io import open_input, open_output, strip_compression_extension
+from export_formats import iter_records
+from rollups import RollupColumns, columns_from_file, columns_from_generator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时逐序列计算
+    np = None
+
+# 默认的缩放级别(每个级别的目标点数)
+DEFAULT_LEVELS = (100, 400, 1600)
+# 降采样文件的扩展名；批量验证时跳过这类文件
+DOWNSAMPLE_SUFFIX = '.lttb.json'
+DOWNSAMPLE_FORMAT_VERSION = "1.0"
+# 一批中的最多用户数(一批的全部序列一起计算)
+DEFAULT_BATCH_USERS = 4096
+
+# 降采样文件中的序列名 -> RollupColumns中的(日期序数列, 数值列)
+SERIES = {'weight': ('weight_day', 'weight'), 'bodyFat': ('body_fat_day', 'body_fat')}
+
+# 计算前数值按千分之一取整为整数，桶内求和精确，两种实现选出的点完全相同
+_SCALE = 1000
+
+
+class _Series:
+    """按日期排序的一条序列：相对第一天的天数、取整后的数值和原始数值(纯Python实现使用)"""
+    __slots__ = ('start', 'days', 'scaled', 'values')
+
+    def __init__(self, days: Sequence[int], values: Sequence[float]):
+        order = sorted(range(len(days)), key=days.__getitem__)
+        self.start = days[order[0]] if order else None
+        self.days = [days[i] - self.start for i in order]
+        self.values = [values[i] for i in order]
+        self.scaled = [round(value * _SCALE) for value in self.values]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def _bucket_edges(n: int, threshold: int) -> List[int]:
+    """
+    LTTB的桶边界
+
+    第一个和最后一个点单独成桶；中间的点分为threshold-2个桶，第i个桶为[edges[i], edges[i+1])。
+    末尾追加n，第i个桶的下一个桶为[edges[i+1], edges[i+2])(最后一个桶的下一个桶只有最后一个点)。
+    用整数运算，避免浮点误差使两种实现的边界不同。
+    """
+    return [(j * (n - 2)) // (threshold - 2) + 1 for j in range(threshold - 1)] + [n]
+
+
+def lttb_indices(days: Sequence[int], values: Sequence[int], threshold: int) -> List[int]:
+    """对一条按日期排序的序列做LTTB，返回选出的点的序号；不超过threshold个点时保留全部点"""
+    n = len(days)
+    if threshold < 3:
+        raise ValueError("目标点数至少为3")
+    if threshold >= n:
+        return list(range(n))
+    edges = _bucket_edges(n, threshold)
+    selected = [0]
+    ax, ay = days[0], values[0]
+    for i in range(threshold - 2):
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        count = next_end - next_start
+        cx = sum(days[next_start:next_end]) / count
+        cy = sum(values[next_start:next_end]) / count
+        best, best_area = edges[i], -1.0
+        for j in range(edges[i], edges[i + 1]):
+            # 三角形面积的两倍(不影响比较)
+            area = abs((ax - cx) * (values[j] - ay) - (ax - days[j]) * (cy - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        ax, ay = days[best], values[best]
+    selected.append(n - 1)
+    return selected
+
+
+def _payload(start: Optional[int], points: int, levels: Dict[int, Tuple[List[int], List[float]]]) -> Dict[str, Any]:
+    """一条序列的各级别结果：day为相对start的天数"""
+    return {
+        "start": datetime.date.fromordinal(start).isoformat() if start is not None else None,
+        "points": points,
+        "levels": {str(level): {"day": days, "value": values} for level, (days, values) in levels.items()}
+    }
+
+
+def _downsample_python(columns_list: List[RollupColumns], day_column: str, value_column: str,
+                       levels: Sequence[int]) -> List[Dict[str, Any]]:
+    """逐序列降采样"""
+    payloads = []
+    for columns in columns_list:
+        s = _Series(getattr(columns, day_column), getattr(columns, value_column))
+        selections = {}
+        for level in levels:
+            indices = lttb_indices(s.days, s.scaled, level)
+            selections[level] = ([s.days[i] for i in indices], [s.values[i] for i in indices])
+        payloads.append(_payload(s.start, len(s), selections))
+    return payloads
+
+
+def _lttb_numpy(x: "np.ndarray", y: "np.ndarray", cumulative_x: "np.ndarray", cumulative_y: "np.ndarray",
+                bases: "np.ndarray", lengths: "np.ndarray", threshold: int) -> "np.ndarray":
+    """
+    一批序列一起做LTTB(长度都大于threshold)
+
+    所有序列首尾相接为一维数组，bases和lengths为各序列的起点和长度。第i个桶对全部序列同时计算面积，
+    再用reduceat求每条序列在桶内的第一个最大值，循环次数只与目标点数有关，与序列数无关。
+
+    Returns:
+        (序列数, threshold)的数组，为选出的点在拼接后数组中的位置
+    """
+    # edges[s, j]为第s条序列的桶边界(在拼接后数组中的位置)
+    j = np.arange(threshold - 1, dtype=np.int64)
+    edges = (j[None, :] * (lengths[:, None] - 2)) // (threshold - 2) + 1
+    edges = np.concatenate((edges, lengths[:, None]), axis=1) + bases[:, None]
+
+    selected = np.empty((len(bases), threshold), dtype=np.int64)
+    selected[:, 0] = bases
+    selected[:, -1] = bases + lengths - 1
+    ax, ay = x[bases], y[bases]
+    for i in range(threshold - 2):
+        next_start, next_end = edges[:, i + 1], edges[:, i + 2]
+        size = next_end - next_start
+        cx = (cumulative_x[next_end] - cumulative_x[next_start]) / size
+        cy = (cumulative_y[next_end] - cumulative_y[next_start]) / size
+
+        width = edges[:, i + 1] - edges[:, i]
+        offsets = np.concatenate(([0], np.cumsum(width)[:-1]))
+        candidates = np.arange(offsets[-1] + width[-1]) + np.repeat(edges[:, i] - offsets, width)
+        ax_r, ay_r = np.repeat(ax, width), np.repeat(ay, width)
+        area = np.abs((ax_r - np.repeat(cx, width)) * (y[candidates] - ay_r)
+                      - (ax_r - x[candidates]) * (np.repeat(cy, width) - ay_r))
+        # 每条序列在桶内的第一个最大值(与逐条比较时取先出现者一致)
+        is_max = area == np.repeat(np.maximum.reduceat(area, offsets), width)
+        positions = np.where(is_max, np.arange(len(area)), len(area))
+        best = candidates[np.minimum.reduceat(positions, offsets)]
+        selected[:, i + 1] = best
+        ax, ay = x[best], y[best]
+    return selected
+
+
+def _downsample_numpy(columns_list: List[RollupColumns], day_column: str, value_column: str,
+                      levels: Sequence[int]) -> List[Dict[str, Any]]:
+    """全部用户的序列首尾相接为一维数组，排序、取整、降采样和取出结果都整批完成"""
+    count = len(columns_list)
+    lengths = np.array([len(getattr(columns, day_column)) for columns in columns_list], dtype=np.int64)
+    bases = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    days = np.concatenate([np.asarray(getattr(columns, day_column), dtype=np.int64)
+                           for columns in columns_list] + [np.zeros(0, dtype=np.int64)])
+    values = np.concatenate([np.asarray(getattr(columns, value_column), dtype=np.float64)
+                             for columns in columns_list] + [np.zeros(0)])
+    # 每个用户内按日期稳定排序
+    order = np.lexsort((days, np.repeat(np.arange(count), lengths)))
+    days, values = days[order], values[order]
+    nonempty = lengths > 0
+    starts = np.zeros(count, dtype=np.int64)
+    starts[nonempty] = days[bases[nonempty]]
+    days = days - np.repeat(starts, lengths)
+    scaled = np.rint(values * _SCALE).astype(np.int64)
+    cumulative_x = np.concatenate(([0], np.cumsum(days)))
+    cumulative_y = np.concatenate(([0], np.cumsum(scaled)))
+    x, y = days.astype(np.float64), scaled.astype(np.float64)
+
+    selections: List[Dict[int, Tuple[List[int], List[float]]]] = [{} for _ in range(count)]
+    for level in levels:
+        long_series = np.flatnonzero(lengths > level)
+        chosen = (_lttb_numpy(x, y, cumulative_x, cumulative_y, bases[long_series], lengths[long_series], level)
+                  if len(long_series) else [])
+        # 较短的序列保留全部点；各序列选出的位置按用户顺序拼接后一次取出
+        picked = [None] * count
+        for k, row in zip(long_series.tolist(), chosen):
+            picked[k] = row
+        positions = np.concatenate([row if row is not None else np.arange(bases[k], bases[k] + lengths[k])
+                                    for k, row in enumerate(picked)] + [np.zeros(0, dtype=np.int64)])
+        picked_days, picked_values = days[positions].tolist(), values[positions].tolist()
+        offset = 0
+        for k, row in enumerate(picked):
+            size = level if row is not None else int(lengths[k])
+            selections[k][level] = (picked_days[offset:offset + size], picked_values[offset:offset + size])
+            offset += size
+    return [_payload(int(starts[k]) if lengths[k] else None, int(lengths[k]), selections[k])
+            for k in range(count)]
+
+
+def downsample_columns(columns_list: List[RollupColumns], levels: Sequence[int] = DEFAULT_LEVELS,
+                       use_numpy: bool = True) -> List[Dict[str, Any]]:
+    """
+    对一批用户的体重和体脂率序列降采样；有NumPy时整批计算，两种实现的结果完全相同
+
+    Returns:
+        每个用户的 {"weight": 序列结果, "bodyFat": 序列结果}，序列结果为
+        {"start": 第一天, "points": 原始点数, "levels": {目标点数: {"day": [...], "value": [...]}}}，
+        不超过目标点数的序列在该级别保留全部点
+    """
+    if any(level < 3 for level in levels):
+        raise ValueError("目标点数至少为3")
+    downsample = _downsample_numpy if use_numpy and np is not None and columns_list else _downsample_python
+    results: List[Dict[str, Any]] = [{} for _ in columns_list]
+    for name, (day_column, value_column) in SERIES.items():
+        for result, payload in zip(results, downsample(columns_list, day_column, value_column, levels)):
+            result[name] = payload
+    return results
+
+
+# === 批量处理文件 ===
+
+def _is_shard(path: str) -> bool:
+    return strip_compression_extension(path).endswith('.jsonl')
+
+
+def _read_users(path: str) -> List[Tuple[Optional[int], RollupColumns]]:
+    """读取一个文件中的用户：.jsonl分片每行一个用户(带行号)，其他文件为一个用户"""
+    if not _is_shard(path):
+        return [(None, columns_from_file(path))]
+    users = []
+    with open_input(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                columns = RollupColumns()
+                for record in iter_records(json.loads(line)):
+                    columns.add_record(*record)
+                users.append((line_number, columns))
+    return users
+
+
+def default_output_path(input_path: str) -> str:
+    base = strip_compression_extension(input_path)
+    if os.path.isdir(base):
+        return base.rstrip(os.sep) + DOWNSAMPLE_SUFFIX
+    return os.path.splitext(base)[0] + DOWNSAMPLE_SUFFIX
+
+
+def _sidecar(source: str, levels: Sequence[int], users: List[Tuple[Optional[int], Dict[str, Any]]],
+             shard: bool) -> Dict[str, Any]:
+    sidecar = {
+        "version": DOWNSAMPLE_FORMAT_VERSION,
+        "createdAt": datetime.datetime.now().isoformat(timespec='seconds'),
+        "source": source,
+        "levels": list(levels)
+    }
+    if shard:
+        sidecar["users"] = [{"line": line, "series": series} for line, series in users]
+    else:
+        sidecar["series"] = users[0][1]
+    return sidecar
+
+
+def write_sidecar(sidecar: Dict[str, Any], path: str) -> None:
+    """以紧凑格式写出(.gz/.xz/.bz2扩展名时压缩)"""
+    with open_output(path, 'w') as f:
+        json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def downsample_files(paths: List[str], levels: Sequence[int] = DEFAULT_LEVELS,
+                     batch_users: int = DEFAULT_BATCH_USERS, use_numpy: bool = True) -> List[Dict[str, Any]]:
+    """
+    为每个导出文件写出降采样文件(输入文件名加DOWNSAMPLE_SUFFIX)
+
+    文件依次读入，累计到batch_users个用户后整批计算并写出这些文件的结果；一个分片中的用户属于同一批。
+
+    Returns:
+        每个文件的 {"file", "output", "users", "points"(原始点数), "bytes"}
+    """
+    reports = []
+    pending: List[Tuple[str, List[Tuple[Optional[int], RollupColumns]]]] = []
+
+    def flush():
+        columns_list = [columns for _, users in pending for _, columns in users]
+        results = iter(downsample_columns(columns_list, levels, use_numpy))
+        for path, users in pending:
+            output = default_output_path(path)
+            sidecar = _sidecar(path, levels, [(line, next(results)) for line, _ in users], _is_shard(path))
+            write_sidecar(sidecar, output)
+            reports.append({
+                "file": path,
+                "output": output,
+                "users": len(users),
+                "points": sum(len(getattr(columns, column)) for _, columns in users
+                              for column, _ in SERIES.values()),
+                "bytes": os.path.getsize(output)
+            })
+        pending.clear()
+
+    queued = 0
+    for path in paths:
+        users = _read_users(path)
+        pending.append((path, users))
+        queued += len(users)
+        if queued >= batch_users:
+            flush()
+            queued = 0
+    if pending:
+        flush()
+    return reports
+
+
+def _parse_levels(text: str) -> List[int]:
+    levels = sorted({int(level) for level in text.split(',') if level.strip()})
+    if not levels or levels[0] < 3:
+        raise ValueError("目标点数至少为3")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用LTTB把体重和体脂率曲线降采样为各缩放级别的图表数据')
+    parser.add_argument('inputs', nargs='*',
+                        help='导出文件、目录或通配符(任意格式，可压缩；.jsonl分片中每行一个用户)；'
+                             '省略时按--days等参数直接生成数据')
+    parser.add_argument('--levels', type=str, default=','.join(map(str, DEFAULT_LEVELS)),
+                        help=f'逗号分隔的各缩放级别目标点数 (默认: {",".join(map(str, DEFAULT_LEVELS))})')
+    parser.add_argument('--batch-users', type=int, default=DEFAULT_BATCH_USERS,
+                        help=f'一批一起计算的最多用户数 (默认: {DEFAULT_BATCH_USERS})')
+    parser.add_argument('--backend', choices=['auto', 'numpy', 'python'], default='auto',
+                        help='计算后端 (默认: auto，有NumPy时整批向量化计算)')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'直接生成时的输出文件 (默认: fitness_demo_data{DOWNSAMPLE_SUFFIX})')
+    parser.add_argument('--days', type=int, default=3650, help='直接生成时的天数 (默认: 3650)')
+    parser.add_argument('--seed', type=int, default=None, help='直接生成时的随机种子')
+    parser.add_argument('--start-date', type=str, default=None, help='直接生成时的开始日期 YYYY-MM-DD')
+    args = parser.parse_args()
+
+    try:
+        levels = _parse_levels(args.levels)
+    except ValueError as e:
+        print(f"✗ 无效的缩放级别: {e}")
+        return 1
+    use_numpy = args.backend != 'python'
+    if args.backend == 'numpy' and np is None:
+        print("✗ 未安装NumPy，无法使用numpy后端")
+        return 1
+    backend = 'numpy' if use_numpy and np is not None else 'python'
+
+    start_time = time.perf_counter()
+    if not args.inputs:
+        from generate_demo_data_final import FitnessDataGenerator
+        start_date = datetime.datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+        generator = FitnessDataGenerator(days=args.days, start_date=start_date, seed=args.seed)
+        series = downsample_columns([columns_from_generator(generator)], levels, use_numpy)[0]
+        output = args.output or 'fitness_demo_data' + DOWNSAMPLE_SUFFIX
+        write_sidecar(_sidecar("generator", levels, [(None, series)], False), output)
+        print(f"✓ 降采样结果已保存到 {output} ({os.path.getsize(output)} 字节, "
+              f"{time.perf_counter() - start_time:.2f} 秒, 后端: {backend})")
+        for name, result in series.items():
+            print(f"- {name}: {result['points']} 点 -> " + ", ".join(
+                f"{level}: {len(values['day'])}" for level, values in result["levels"].items()))
+        return 0
+
+    from validate_data_format import expand_paths
+    paths = expand_paths(args.inputs)
+    if not paths:
+        print("✗ 没有找到导出文件")
+        return 1
+    try:
+        reports = downsample_files(paths, levels, max(args.batch_users, 1), use_numpy)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"✗ 降采样失败: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    for report in reports:
+        print(f"✓ {report['output']} ({report['users']} 个用户, {report['points']} 点, {report['bytes']} 字节)")
+    users = sum(report["users"] for report in reports)
+    points = sum(report["points"] for report in reports)
+    print(f"- 共 {len(reports)} 个文件, {users} 个用户, {points} 点, 缩放级别: {', '.join(map(str, levels))}")
+    print(f"- 耗时: {elapsed:.2f} 秒 (后端: {backend})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
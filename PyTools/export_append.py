@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+向已有导出文件追加新的日期
+只读取文件末尾的状态(最后日期、最后的体重和体脂率)并从那里接续随机游走，
+新记录直接写入文件，已有记录不会被重新解析或重新生成
+"""
+
+import datetime
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
+
+from compressed_io import detect_compression
+from export_formats import NdjsonExportWriter, detect_format
+from export_writer import SECTIONS, RecordFormatter
+from generate_demo_data_final import FitnessDataGenerator
+from json_stream import JsonStreamError, locate_sections
+from run_metrics import RunMetrics, timed
+
+# 支持追加的格式；二进制和列式格式的字符串字典或列需要整体重写，不支持追加
+APPEND_FORMATS = ('json', 'ndjson')
+# 拼接JSON文件时每次复制的字节数
+COPY_CHUNK_BYTES = 1 << 20
+# NDJSON从文件末尾向前读取的初始字节数，找不到最后的体重和体脂记录时加倍
+TAIL_BLOCK_BYTES = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+def _empty_state() -> Dict[str, Any]:
+    # weight和bodyFat为0.1为单位的游走状态，timeSuffix为训练记录时间戳中日期之后的部分
+    return {"lastDate": None, "weight": None, "bodyFat": None, "timeSuffix": None}
+
+
+def _update_state(state: Dict[str, Any], section: str, value: Any) -> None:
+    """用一条记录更新末尾状态(记录按从后往前的顺序传入，只保留最后出现的值)"""
+    if section == 'workouts':
+        (date, daily), = value.items()
+        if daily and state["timeSuffix"] is None:
+            state["timeSuffix"] = daily[-1]['date'][10:]
+    else:
+        date = value['date']
+    if state["lastDate"] is None or date[:10] > state["lastDate"]:
+        state["lastDate"] = date[:10]
+    if section == 'weights' and state["weight"] is None:
+        state["weight"] = int(round(value['weight'] * 10))
+    elif section == 'bodyFat' and state["bodyFat"] is None:
+        state["bodyFat"] = int(round(value['bodyFatPercentage'] * 10))
+
+
+# === JSON ===
+
+def _json_layout(mm: mmap.mmap) -> Tuple[RecordFormatter, Dict[str, Tuple[int, int]]]:
+    """
+    定位JSON导出文件中各部分的位置
+
+    Returns:
+        (与文件缩进一致的格式化器, 部分名 -> (左括号之后的位置, 右括号的位置))
+    """
+    try:
+        indent, _, spans = locate_sections(mm, SECTIONS + ['userSettings'])
+    except JsonStreamError as e:
+        raise ValueError(f"不是由本工具生成的JSON导出文件: {e}")
+    return RecordFormatter(indent), {section: (start + 1, end - 1) for section, (start, end) in spans.items()}
+
+
+def _last_value(mm: mmap.mmap, fmt: RecordFormatter, key: str, start: int, end: int) -> Any:
+    """某个范围内最后一个key字段的值(只解析这个值本身)"""
+    key_bytes = fmt.key(key).encode('utf-8')
+    pos = mm.rfind(key_bytes, start, end)
+    if pos < 0:
+        return None
+    pos += len(key_bytes)
+    return _decoder.raw_decode(mm[pos:min(pos + 256, end)].decode('utf-8', 'ignore'))[0]
+
+
+def _json_tail_state(mm: mmap.mmap, fmt: RecordFormatter, bounds: Dict[str, Tuple[int, int]]) -> Dict[str, Any]:
+    state = _empty_state()
+    # 每个部分只查找最后一条记录中的字段，这些字段都在各部分末尾附近
+    for section, field in (('weights', 'weight'), ('bodyFat', 'bodyFatPercentage')):
+        value = _last_value(mm, fmt, field, *bounds[section])
+        date = _last_value(mm, fmt, 'date', *bounds[section])
+        if value is not None:
+            _update_state(state, section, {'date': date, field: value})
+    date = _last_value(mm, fmt, 'date', *bounds['workouts'])
+    if date is not None:
+        _update_state(state, 'workouts', {date[:10]: [{'date': date}]})
+    date = _last_value(mm, fmt, 'date', *bounds['nutrition'])
+    if date is not None:
+        _update_state(state, 'nutrition', {'date': date})
+    return state
+
+
+def _copy_range(mm: mmap.mmap, out, start: int, end: int) -> None:
+    for offset in range(start, end, COPY_CHUNK_BYTES):
+        out.write(mm[offset:min(offset + COPY_CHUNK_BYTES, end)])
+
+
+def _append_json(path: str, days: int, generator_options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把新的日期拼接到JSON导出文件的各部分末尾
+
+    JSON中的各部分依次排列，新记录必须插入到每个部分的末尾，因此插入点之后的字节会被原样复制到
+    新文件(不解析)，完成后替换原文件。
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        fmt, bounds = _json_layout(mm)
+        state = _json_tail_state(mm, fmt, bounds)
+        generator = _continuation_generator(state, days, generator_options)
+
+        metrics = generator.metrics
+        items: Dict[str, List[str]] = {section: [] for section in SECTIONS}
+        for table in generator.iter_tables(walk_states=(state["weight"], state["bodyFat"])):
+            with timed(metrics, 'serialization'):
+                for section, item, _, _ in table.format_items(fmt):
+                    items[section].append(item)
+
+        inserts = []
+        inner, outer = fmt.newline(3), fmt.newline(2)
+        for section in SECTIONS:
+            start, close = bounds[section]
+            if not items[section]:
+                continue
+            if close > start:
+                # 已有记录时插入在最后一条记录之后、右括号前的换行之前
+                text = ''.join(',' + inner + item for item in items[section])
+                inserts.append((close - len(outer.encode('utf-8')), text))
+            else:
+                inserts.append((close, inner + (',' + inner).join(items[section]) + outer))
+
+        fd, temp_path = tempfile.mkstemp(prefix='.append_', dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with timed(metrics, 'write'), os.fdopen(fd, 'wb') as out:
+                position = 0
+                for offset, text in inserts:
+                    _copy_range(mm, out, position, offset)
+                    out.write(text.encode('utf-8'))
+                    position = offset
+                _copy_range(mm, out, position, len(mm))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    shutil.copymode(path, temp_path)
+    os.replace(temp_path, path)
+    return _append_stats(generator, state, {section: len(records) for section, records in items.items()})
+
+
+# === NDJSON ===
+
+def _ndjson_tail(f) -> Tuple[Dict[str, Any], Optional[int], Optional[bytes]]:
+    """
+    从文件末尾向前读取，直到找到最后的体重和体脂记录
+
+    Returns:
+        (末尾状态, 末行userSettings的起始位置, userSettings行)；末行不是userSettings时后两者为None
+    """
+    size = f.seek(0, os.SEEK_END)
+    block = TAIL_BLOCK_BYTES
+    while True:
+        start = max(size - block, 0)
+        f.seek(start)
+        data = f.read(size - start)
+        lines = []
+        offset = start
+        for line in data.split(b'\n'):
+            lines.append((offset, line))
+            offset += len(line) + 1
+        # 第一行可能不完整(从文件开头读取时为文件头)
+        lines = lines[1:]
+
+        state = _empty_state()
+        settings_offset = settings_line = None
+        seen_record = False
+        for offset, line in reversed(lines):
+            if not line.strip():
+                continue
+            (section, value), = json.loads(line).items()
+            if section == 'userSettings':
+                if not seen_record and settings_offset is None:
+                    settings_offset, settings_line = offset, line
+                continue
+            seen_record = True
+            _update_state(state, section, value)
+            if state["weight"] is not None and state["bodyFat"] is not None:
+                return state, settings_offset, settings_line
+        if start == 0:
+            return state, settings_offset, settings_line
+        block *= 2
+
+
+def _append_ndjson(path: str, days: int, generator_options: Dict[str, Any]) -> Dict[str, Any]:
+    """在NDJSON导出文件末尾追加新的记录行，耗时只与追加的天数有关"""
+    with open(path, 'r+b') as f:
+        state, settings_offset, settings_line = _ndjson_tail(f)
+        generator = _continuation_generator(state, days, generator_options)
+        if settings_offset is not None:
+            # 用户设置放回文件末尾
+            f.truncate(settings_offset)
+        elif f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    with open(path, 'a', encoding='utf-8') as f:
+        writer = NdjsonExportWriter(f, header=False, metrics=generator.metrics)
+        for table in generator.iter_tables(walk_states=(state["weight"], state["bodyFat"])):
+            for day in table.iter_days():
+                writer.add_day(day)
+        counts = dict(writer.counts)
+        if settings_line is not None:
+            f.write(settings_line.decode('utf-8') + '\n')
+    return _append_stats(generator, state, counts)
+
+
+# === 公共接口 ===
+
+def _continuation_generator(state: Dict[str, Any], days: int, options: Dict[str, Any]) -> FitnessDataGenerator:
+    """从最后日期的下一天开始、接续末尾游走状态的生成器"""
+    if state["lastDate"] is None:
+        raise ValueError("导出文件中没有任何记录，无法确定追加的开始日期")
+    next_date = datetime.date.fromisoformat(state["lastDate"]) + datetime.timedelta(days=1)
+    # 保持训练记录时间戳中的时刻与已有记录一致
+    start_date = datetime.datetime.fromisoformat(next_date.isoformat() + (state["timeSuffix"] or 'T00:00:00'))
+    return FitnessDataGenerator(days=days, start_date=start_date, **options)
+
+
+def _append_stats(generator: FitnessDataGenerator, state: Dict[str, Any], counts: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "days": generator.days,
+        "previousLastDate": state["lastDate"],
+        "firstDate": generator.start_date.date().isoformat(),
+        "lastDate": (generator.start_date + datetime.timedelta(days=generator.days - 1)).date().isoformat(),
+        "counts": counts
+    }
+
+
+def read_tail_state(path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取导出文件末尾的状态
+
+    Returns:
+        {"lastDate": 最后日期, "weight": 最后体重(0.1kg为单位), "bodyFat": 最后体脂率(0.1%为单位),
+         "timeSuffix": 训练记录时间戳中日期之后的部分}
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == 'ndjson':
+        with open(path, 'rb') as f:
+            return _ndjson_tail(f)[0]
+    if fmt != 'json':
+        raise ValueError(f"不支持读取{fmt}格式的末尾状态，只支持: {', '.join(APPEND_FORMATS)}")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _json_tail_state(mm, *_json_layout(mm))
+
+
+def append_days(path: str, days: int, fmt: Optional[str] = None, seed: Optional[int] = None,
+                english_names: bool = False, backend: str = 'auto',
+                initial_weight: float = 70.0, initial_body_fat: float = 18.0,
+                metrics: Optional[RunMetrics] = None) -> Dict[str, Any]:
+    """
+    向已有导出文件追加days天的数据
+
+    新数据从文件最后日期的下一天开始，体重和体脂率从最后一条记录接续随机游走。
+    随机数只由种子和日期决定：用生成原文件时的种子和开始日期追加，结果与一次生成全部天数时完全一致。
+    initial_weight和initial_body_fat只在文件中没有体重或体脂记录时使用。
+    传入metrics时记录各部分的生成耗时。
+
+    Returns:
+        追加的统计信息(天数、日期范围和各部分新增的记录数)
+    """
+    if days <= 0:
+        raise ValueError("追加的天数必须大于0")
+    compression = detect_compression(path)
+    if compression is not None:
+        raise ValueError(f"不支持向{compression}压缩文件追加数据，请先解压")
+    fmt = fmt or detect_format(path)
+    options = {
+        "seed": seed,
+        "english_names": english_names,
+        "backend": backend,
+        "initial_weight": initial_weight,
+        "initial_body_fat": initial_body_fat,
+        "metrics": metrics
+    }
+    if fmt == 'json':
+        return _append_json(path, days, options)
+    if fmt == 'ndjson':
+        return _append_ndjson(path, days, options)
+    raise ValueError(f"不支持向{fmt}格式追加数据，只支持: {', '.join(APPEND_FORMATS)}")
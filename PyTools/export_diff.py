@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+导出快照之间的增量补丁
+diff按日期同步遍历旧、新两个导出文件，逐部分输出新增、删除和修改的日期(营养记录精确到meals中的每一餐，
+训练记录精确到日期键下的每个项目)；apply由旧文件和补丁重建新文件。两者都流式处理，内存占用与文件大小无关
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from compressed_io import compression_from_path, open_input, open_output
+from export_formats import detect_format
+from export_merge import ExportStream
+from export_writer import SECTIONS, StreamingExportWriter
+from json_stream import detect_indent
+
+DELTA_FORMAT = "export-delta"
+DELTA_FORMAT_VERSION = "1.0"
+# 补丁文件的扩展名(NDJSON内容，不使用.jsonl/.ndjson，批量验证不会把它当作导出文件)
+DELTA_SUFFIX = '.delta'
+
+_MISSING = object()
+
+
+# === diff ===
+
+def _list_patch(old: List[Any], new: List[Any]) -> Dict[str, Any]:
+    """按位置比较两个列表：count为新列表的长度，set为[位置, 新元素]"""
+    return {"count": len(new), "set": [[i, item] for i, item in enumerate(new) if i >= len(old) or old[i] != item]}
+
+
+def _record_patch(section: str, old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """一条记录的字段级修改；营养记录的meals按位置比较"""
+    nested = section == 'nutrition' and isinstance(old.get('meals'), list) and isinstance(new.get('meals'), list)
+    patch: Dict[str, Any] = {}
+    changed = {key: value for key, value in new.items()
+               if not (nested and key == 'meals') and old.get(key, _MISSING) != value}
+    if changed:
+        patch["set"] = changed
+    removed = [key for key in old if key not in new]
+    if removed:
+        patch["unset"] = removed
+    if nested and old['meals'] != new['meals']:
+        patch["meals"] = _list_patch(old['meals'], new['meals'])
+    return patch
+
+
+def _diff_day(section: str, date: str, old: Optional[List[Any]], new: Optional[List[Any]]) -> Optional[Dict[str, Any]]:
+    """
+    比较同一部分同一天的记录，相同时返回None
+
+    old/new为当天的记录列表(workouts为日期键下的训练项目列表)，不存在时为None。
+    """
+    if old == new:
+        return None
+    op: Dict[str, Any] = {"section": section, "date": date}
+    if old is None:
+        op.update(op="add", records=new)
+    elif new is None:
+        op.update(op="remove")
+    elif section == 'workouts':
+        op.update(op="modify", **_list_patch(old, new))
+    elif len(old) == len(new) == 1 and isinstance(old[0], dict) and isinstance(new[0], dict):
+        op.update(op="modify", **_record_patch(section, old[0], new[0]))
+    else:
+        # 同一天有多条记录(如合并时保留了两份)时整体替换
+        op.update(op="replace", records=new)
+    return op
+
+
+def _day_groups(stream: ExportStream, section: str) -> Iterator[Tuple[str, List[Any]]]:
+    """按日期产出(日期, 当天的记录列表)；workouts为日期键下的训练项目列表"""
+    for date, entries in itertools.groupby(stream.items(section), key=lambda entry: entry[0]):
+        if section == 'workouts':
+            yield date, [workout for _, _, _, daily in entries for workout in daily]
+        else:
+            yield date, [value for _, _, _, value in entries]
+
+
+def _paired_days(old: ExportStream, new: ExportStream,
+                 section: str) -> Iterator[Tuple[str, Optional[List[Any]], Optional[List[Any]]]]:
+    """同步遍历两个文件的某个部分，按日期产出(日期, 旧记录, 新记录)"""
+    streams = heapq.merge(((date, 0, records) for date, records in _day_groups(old, section)),
+                          ((date, 1, records) for date, records in _day_groups(new, section)),
+                          key=lambda entry: entry[0])
+    for date, group in itertools.groupby(streams, key=lambda entry: entry[0]):
+        sides: List[Optional[List[Any]]] = [None, None]
+        for _, side, records in group:
+            sides[side] = records
+        yield date, sides[0], sides[1]
+
+
+def _header_fields(stream: ExportStream) -> Dict[str, Any]:
+    return {"version": stream.fields.get('version'), "exportDate": stream.fields.get('exportDate')}
+
+
+def _check_json(path: str) -> None:
+    fmt = detect_format(path)
+    if fmt != 'json':
+        raise ValueError(f"{path} 是{fmt}格式，只支持JSON导出文件")
+
+
+def _write_line(f, value: Dict[str, Any]) -> None:
+    f.write(json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+    f.write('\n')
+
+
+def _commit(temp_path: str, output: str, write) -> Any:
+    """写入临时文件，成功后替换为output，出错时不留下不完整的文件"""
+    try:
+        with open_output(temp_path, 'w', compression=compression_from_path(output)) as f:
+            result = write(f)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, output)
+    return result
+
+
+def diff_exports(old_path: str, new_path: str, output: str) -> Dict[str, Any]:
+    """
+    比较两个JSON导出文件(可以是压缩文件)，把补丁写入output(扩展名为.gz/.xz/.bz2时压缩)
+
+    补丁为NDJSON：第一行为文件头(新旧文件的version和exportDate、新文件的缩进)，之后按部分和日期顺序
+    每行一个操作：
+        add      新增的日期，records为当天的全部记录
+        remove   删除的日期
+        modify   修改的日期：weights/bodyFat/nutrition为字段级的set/unset，nutrition的meals和workouts的训练项目
+                 为按位置的{"count": 新长度, "set": [[位置, 新元素], ...]}
+        replace  同一天有多条记录时，records为当天的全部新记录
+    userSettings改变时有一行userSettings操作；最后一行为两个文件各部分的记录数，apply时用于校验。
+    两个文件中各部分的记录都须按日期排序。
+
+    Returns:
+        {"sections": 各部分{"added", "removed", "modified", "unchanged"}的日期数, "userSettings": 是否改变,
+         "operations": 操作数}
+    """
+    _check_json(old_path)
+    _check_json(new_path)
+    with open_input(new_path, 'rb') as f:
+        indent = detect_indent(f.read(256))
+
+    old, new = ExportStream(old_path, 0), ExportStream(new_path, 1)
+    try:
+        def write(f) -> Dict[str, Any]:
+            _write_line(f, {"format": DELTA_FORMAT, "version": DELTA_FORMAT_VERSION,
+                            "base": _header_fields(old), "target": dict(_header_fields(new), indent=indent)})
+            stats = {section: {"added": 0, "removed": 0, "modified": 0, "unchanged": 0} for section in SECTIONS}
+            counts = {"base": dict.fromkeys(SECTIONS, 0), "target": dict.fromkeys(SECTIONS, 0)}
+            operations = 0
+            for section in SECTIONS:
+                for date, old_records, new_records in _paired_days(old, new, section):
+                    # workouts的记录数为日期键数
+                    if old_records is not None:
+                        counts["base"][section] += 1 if section == 'workouts' else len(old_records)
+                    if new_records is not None:
+                        counts["target"][section] += 1 if section == 'workouts' else len(new_records)
+                    op = _diff_day(section, date, old_records, new_records)
+                    if op is None:
+                        stats[section]["unchanged"] += 1
+                        continue
+                    stats[section][{"add": "added", "remove": "removed"}.get(op["op"], "modified")] += 1
+                    _write_line(f, op)
+                    operations += 1
+            old.finish()
+            new.finish()
+            settings_changed = old.user_settings != new.user_settings
+            if settings_changed:
+                _write_line(f, {"op": "userSettings", "value": new.user_settings})
+                operations += 1
+            _write_line(f, {"op": "end", "counts": counts})
+            return {"sections": stats, "userSettings": settings_changed, "operations": operations}
+
+        return _commit(f"{output}.partial-{os.getpid()}", output, write)
+    finally:
+        old.close()
+        new.close()
+
+
+# === apply ===
+
+class _DeltaReader:
+    """按行读取补丁，可以查看下一个操作而不消费它"""
+
+    def __init__(self, f):
+        self._lines = (json.loads(line) for line in f if line.strip())
+        header = next(self._lines, None)
+        if not isinstance(header, dict) or header.get("format") != DELTA_FORMAT:
+            raise ValueError("不是导出补丁文件")
+        if header.get("version") != DELTA_FORMAT_VERSION:
+            raise ValueError(f"不支持的补丁格式版本: {header.get('version')}")
+        self.header = header
+        self._pending = None
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        if self._pending is None:
+            self._pending = next(self._lines, None)
+        return self._pending
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        op = self.peek()
+        self._pending = None
+        return op
+
+    def section_ops(self, section: str) -> Iterator[Dict[str, Any]]:
+        """某个部分的操作(补丁中各部分的操作连续排列)"""
+        while self.peek() is not None and self.peek().get("section") == section:
+            yield self.next()
+
+
+def _apply_list_patch(old: List[Any], patch: Dict[str, Any], what: str) -> List[Any]:
+    count = patch["count"]
+    result = old[:count] + [_MISSING] * (count - len(old))
+    for i, item in patch["set"]:
+        result[i] = item
+    if any(item is _MISSING for item in result):
+        raise ValueError(f"补丁与基础文件不匹配: {what}缺少元素")
+    return result
+
+
+def _apply_day(section: str, date: str, records: Optional[List[Any]], op: Dict[str, Any]) -> Optional[List[Any]]:
+    """对当天的旧记录应用一个操作，返回新记录(删除时为None)"""
+    kind = op["op"]
+    if kind == 'add':
+        if records is not None:
+            raise ValueError(f"补丁与基础文件不匹配: {section}中已有{date}的记录")
+        return op["records"]
+    if records is None:
+        raise ValueError(f"补丁与基础文件不匹配: {section}中没有{date}的记录")
+    if kind == 'remove':
+        return None
+    if kind == 'replace':
+        return op["records"]
+    if kind != 'modify':
+        raise ValueError(f"未知的补丁操作: {kind}")
+    if section == 'workouts':
+        return _apply_list_patch(records, op, f"{date}的训练项目")
+    if len(records) != 1:
+        raise ValueError(f"补丁与基础文件不匹配: {section}中{date}有{len(records)}条记录")
+    record = dict(records[0])
+    for key in op.get("unset", ()):
+        record.pop(key, None)
+    record.update(op.get("set", {}))
+    if "meals" in op:
+        record['meals'] = _apply_list_patch(record.get('meals') or [], op["meals"], f"{date}的meals")
+    return [record]
+
+
+def _patched_days(base: ExportStream, delta: _DeltaReader, section: str,
+                  counts: Dict[str, int]) -> Iterator[Tuple[str, List[Any]]]:
+    """同步遍历基础文件的某个部分和补丁中该部分的操作，按日期产出(日期, 新记录)"""
+    days = _day_groups(base, section)
+    ops = delta.section_ops(section)
+    day, op = next(days, None), next(ops, None)
+    while day is not None or op is not None:
+        if op is None or (day is not None and day[0] < op["date"]):
+            records = day[1]
+            counts[section] += 1 if section == 'workouts' else len(records)
+            yield day
+            day = next(days, None)
+            continue
+        records = None
+        if day is not None and day[0] == op["date"]:
+            records = day[1]
+            counts[section] += 1 if section == 'workouts' else len(records)
+            day = next(days, None)
+        new_records = _apply_day(section, op["date"], records, op)
+        if new_records is not None:
+            yield op["date"], new_records
+        previous, op = op["date"], next(ops, None)
+        if op is not None and op["date"] <= previous:
+            raise ValueError(f"补丁中{section}的操作未按日期排序: {op['date']} 在 {previous} 之后")
+
+
+def apply_delta(base_path: str, delta_path: str, output: str) -> Dict[str, Any]:
+    """
+    由基础文件和diff_exports生成的补丁重建新文件，写入output(扩展名为.gz/.xz/.bz2时压缩)
+
+    输出使用新文件的缩进和exportDate；新文件由本工具或json.dump(indent=2)写出时，结果与新文件逐字节一致。
+    基础文件的exportDate或各部分的记录数与补丁记录的不一致时报错，不写出输出文件。
+
+    Returns:
+        {"counts": 各部分写出的记录数, "operations": 应用的操作数}
+    """
+    _check_json(base_path)
+    base = ExportStream(base_path, 0)
+    try:
+        with open_input(delta_path, 'r') as f:
+            delta = _DeltaReader(f)
+            header = delta.header
+            if header["base"]["exportDate"] != base.fields.get('exportDate'):
+                raise ValueError(f"补丁不是基于该文件生成的: 补丁的基础文件exportDate为{header['base']['exportDate']}，"
+                                 f"该文件为{base.fields.get('exportDate')}")
+
+            def write(out) -> Dict[str, Any]:
+                target = header["target"]
+                writer = StreamingExportWriter(out, indent=target["indent"], version=target["version"],
+                                               export_date=target["exportDate"])
+                base_counts = dict.fromkeys(SECTIONS, 0)
+                for section in SECTIONS:
+                    for date, records in _patched_days(base, delta, section, base_counts):
+                        if section == 'workouts':
+                            writer.add_workouts(date, records)
+                        else:
+                            for record in records:
+                                writer.add_record(section, None, record)
+                base.finish()
+                user_settings = base.user_settings
+                operations = delta.next()
+                if operations is not None and operations.get("op") == "userSettings":
+                    user_settings = operations["value"]
+                    operations = delta.next()
+                if operations is None or operations.get("op") != "end":
+                    raise ValueError("补丁文件不完整或包含无法识别的操作")
+                expected = operations["counts"]
+                if base_counts != expected["base"]:
+                    raise ValueError("补丁与基础文件不匹配: 基础文件各部分的记录数与补丁记录的不一致")
+                stats = writer.close(user_settings if user_settings is not None else {})
+                if stats["counts"] != expected["target"]:
+                    raise ValueError("重建结果各部分的记录数与补丁记录的不一致")
+                return {"counts": stats["counts"]}
+
+            return _commit(f"{output}.partial-{os.getpid()}", output, write)
+    finally:
+        base.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较两个导出快照生成增量补丁，或由旧文件和补丁重建新文件')
+    parser.add_argument('old', help='旧的JSON导出文件(可以是.gz/.xz/.bz2压缩文件)')
+    parser.add_argument('new', nargs='?', default=None, help='新的JSON导出文件(生成补丁时必需)')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'补丁文件或重建的导出文件 (默认: 新文件名加{DELTA_SUFFIX}；使用--apply时必需)')
+    parser.add_argument('--apply', type=str, default=None, metavar='DELTA',
+                        help='把补丁应用到旧文件，重建新文件')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.apply is not None:
+        if args.new is not None or args.output is None:
+            print("✗ --apply 只接受一个基础文件，并且必须指定 --output")
+            return 1
+        try:
+            result = apply_delta(args.old, args.apply, args.output)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"✗ 应用补丁失败: {e}")
+            return 1
+        counts = result["counts"]
+        print(f"✓ 已由 {args.old} 和 {args.apply} 重建 {args.output} "
+              f"({os.path.getsize(args.output)} 字节, {time.perf_counter() - start_time:.2f} 秒)")
+        print("- 记录数: " + ", ".join(f"{section} {count}" for section, count in counts.items()))
+        return 0
+
+    if args.new is None:
+        print("✗ 生成补丁需要旧文件和新文件")
+        return 1
+    output = args.output or args.new + DELTA_SUFFIX
+    try:
+        result = diff_exports(args.old, args.new, output)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"✗ 生成补丁失败: {e}")
+        return 1
+    print(f"✓ 补丁已保存到 {output} ({os.path.getsize(output)} 字节, {result['operations']} 个操作, "
+          f"{time.perf_counter() - start_time:.2f} 秒)")
+    for section, stats in result["sections"].items():
+        print(f"- {section}: 新增 {stats['added']}, 删除 {stats['removed']}, 修改 {stats['modified']}, "
+              f"未变 {stats['unchanged']} 天")
+    print(f"- userSettings: {'已修改' if result['userSettings'] else '未变'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
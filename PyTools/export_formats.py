@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+紧凑导出格式
+除了缩进的JSON外，支持按行分隔的JSON(ndjson)、字典编码的二进制格式(binary)
+和每个部分一个文件的列式格式(columnar)；每种格式都有加载函数，
+可还原出与Flutter导入格式完全相同的数据结构。
+除列式格式外，文件名带.gz/.xz/.bz2扩展名时压缩写出，读取时按魔数自动解压
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import struct
+import sys
+from typing import Dict, List, Any, BinaryIO, Iterator, Optional, TextIO, Tuple
+
+from compressed_io import COMPRESSION_EXTENSIONS, compression_from_path, open_input, open_output
+from export_writer import SECTIONS
+from json_stream import iter_export
+from run_metrics import RunMetrics, timed
+
+FORMATS = ('json', 'ndjson', 'binary', 'columnar')
+
+# 各格式的默认扩展名(列式格式输出为目录)
+FORMAT_EXTENSIONS = {
+    'json': '.json',
+    'ndjson': '.ndjson',
+    'binary': '.fdb',
+    'columnar': '_columns'
+}
+
+BINARY_MAGIC = b'FDB1'
+COLUMNAR_META = 'meta.json'
+
+
+def iter_records(export_data: Dict[str, Any]) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """按(部分名, 字典键, 记录)逐条产出导出数据中的记录，列表部分的键为None"""
+    data = export_data['data']
+    for section in SECTIONS:
+        value = data[section]
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield section, key, item
+        else:
+            for item in value:
+                yield section, None, item
+
+
+def iter_file_records(path: str) -> Tuple[Iterator[Tuple[str, Optional[str], Any]], Dict[str, Any]]:
+    """
+    逐条读取导出文件(任意格式)中的记录
+
+    Returns:
+        (记录迭代器, 用户设置字典)；JSON文件流式扫描，用户设置在迭代结束后填入
+    """
+    user_settings: Dict[str, Any] = {}
+    if detect_format(path) != 'json':
+        export_data = load_export(path)
+        user_settings.update(export_data['data']['userSettings'])
+        return iter_records(export_data), user_settings
+
+    def records():
+        with open_input(path, 'rb') as f:
+            for event in iter_export(f):
+                if event.kind == 'item':
+                    yield event.section, event.key if event.section == 'workouts' else None, event.value
+                elif event.kind == 'section_value' and event.section == 'userSettings':
+                    user_settings.update(event.value)
+    return records(), user_settings
+
+
+def iter_day_records(day: Dict[str, Any]) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """把FitnessDataGenerator.iter_days()产出的一天数据拆分为记录"""
+    if day.get('weight') is not None:
+        yield 'weights', None, day['weight']
+    if day.get('bodyFat') is not None:
+        yield 'bodyFat', None, day['bodyFat']
+    if day.get('workouts'):
+        yield 'workouts', day['date'], day['workouts']
+    if day.get('nutrition') is not None:
+        yield 'nutrition', None, day['nutrition']
+
+
+class ExportAssembler:
+    """按记录重新组装Flutter导入格式的数据结构，供各加载函数共用"""
+
+    def __init__(self):
+        self.header: Dict[str, Any] = {}
+        self.sections: Dict[str, Any] = {'weights': [], 'bodyFat': [], 'workouts': {}, 'nutrition': []}
+        self.user_settings: Any = None
+
+    def add(self, section: str, key: Optional[str], value: Any) -> None:
+        if section == 'workouts':
+            self.sections['workouts'][key] = value
+        elif section in self.sections:
+            self.sections[section].append(value)
+        else:
+            raise ValueError(f"未知的数据部分: {section}")
+
+    def result(self) -> Dict[str, Any]:
+        export_data = dict(self.header)
+        data = dict(self.sections)
+        data['userSettings'] = self.user_settings
+        export_data['data'] = data
+        return export_data
+
+
+class _ExportFormatWriter:
+    """
+    各紧凑格式写入器的公共接口：逐条add()记录，最后close()写出用户设置
+
+    每条记录先编码(_encode_record)再写出(_write_encoded)；传入metrics时add_day()把一天的记录
+    分别计入serialization和write阶段。counts为各部分的记录数(workouts为天数)，
+    workout_items为训练项目数。
+    """
+
+    def __init__(self, version: str = "1.0", export_date: Optional[str] = None,
+                 metrics: Optional[RunMetrics] = None):
+        self.version = version
+        self.export_date = export_date or datetime.datetime.now().isoformat()
+        self.metrics = metrics
+        self.counts = {section: 0 for section in SECTIONS}
+        self.workout_items = 0
+
+    def add(self, section: str, key: Optional[str], value: Any) -> None:
+        self._write_encoded(self._encode_record(section, key, value))
+        self._count(section, value)
+
+    def add_day(self, day: Dict[str, Any]) -> None:
+        with timed(self.metrics, 'serialization'):
+            encoded = [(section, value, self._encode_record(section, key, value))
+                       for section, key, value in iter_day_records(day)]
+        with timed(self.metrics, 'write'):
+            for section, value, data in encoded:
+                self._write_encoded(data)
+                self._count(section, value)
+
+    def add_export(self, export_data: Dict[str, Any]) -> None:
+        for record in iter_records(export_data):
+            self.add(*record)
+
+    def _count(self, section: str, value: Any) -> None:
+        self.counts[section] += 1
+        if section == 'workouts' and isinstance(value, list):
+            self.workout_items += len(value)
+
+    def _encode_record(self, section: str, key: Optional[str], value: Any) -> Any:
+        raise NotImplementedError
+
+    def _write_encoded(self, data: Any) -> None:
+        raise NotImplementedError
+
+    def close(self, user_settings: Dict[str, Any]) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+# === NDJSON ===
+
+class NdjsonExportWriter(_ExportFormatWriter):
+    """
+    按行分隔的JSON：第一行为文件头，之后每行是一个只含一个键的对象
+    {"部分名": 记录}(训练记录为{"workouts": {"日期": [...]}})，最后一行为用户设置。
+    各部分的记录可以交错出现，便于按天追加。
+    """
+
+    def __init__(self, f: TextIO, version: str = "1.0", export_date: Optional[str] = None,
+                 header: bool = True, metrics: Optional[RunMetrics] = None):
+        super().__init__(version, export_date, metrics)
+        self.f = f
+        self._dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        # 向已有文件追加记录时不再写文件头
+        if header:
+            f.write(self._dumps({"format": "ndjson", "version": self.version, "exportDate": self.export_date}) + '\n')
+
+    def _encode_record(self, section: str, key: Optional[str], value: Any) -> str:
+        record = {key: value} if section == 'workouts' else value
+        return '{"' + section + '":' + self._dumps(record) + '}\n'
+
+    def _write_encoded(self, data: str) -> None:
+        self.f.write(data)
+
+    def close(self, user_settings: Dict[str, Any]) -> Dict[str, int]:
+        with timed(self.metrics, 'write'):
+            self.f.write(self._dumps({"userSettings": user_settings}) + '\n')
+        return dict(self.counts)
+
+
+def load_ndjson(f: TextIO) -> Dict[str, Any]:
+    """加载NDJSON格式的导出文件"""
+    assembler = ExportAssembler()
+    header = json.loads(f.readline())
+    if not isinstance(header, dict) or header.get('format') != 'ndjson':
+        raise ValueError("不是NDJSON格式的导出文件")
+    assembler.header = {"version": header['version'], "exportDate": header['exportDate']}
+
+    loads = json.loads
+    for line_number, line in enumerate(f, 2):
+        if not line.strip():
+            continue
+        record = loads(line)
+        if not isinstance(record, dict) or len(record) != 1:
+            raise ValueError(f"第{line_number}行不是单键对象")
+        (section, value), = record.items()
+        if section == 'userSettings':
+            assembler.user_settings = value
+        elif section == 'workouts':
+            (key, value), = value.items()
+            assembler.add(section, key, value)
+        else:
+            assembler.add(section, None, value)
+    return assembler.result()
+
+
+# === 字典编码的二进制格式 ===
+#
+# 文件以BINARY_MAGIC开头，之后是一串帧：一个字节的帧类型，加上编码后的值。
+# 值编码为一个字节的类型标记加上数据；整数使用ZigZag变长编码。字符串在第一次出现时
+# 写出全文并加入字典，之后只写字典序号，因此重复的键名、餐食和训练名称都只占1-2个字节。
+# 形如YYYY-MM-DD开头的日期写为日期序数(时间部分作为字符串进入字典)。
+
+_FRAME_HEADER, _FRAME_USER_SETTINGS, _FRAME_END = 0, 5, 0xFF
+_SECTION_FRAMES = {section: i + 1 for i, section in enumerate(SECTIONS)}
+_FRAME_SECTIONS = {i: section for section, i in _SECTION_FRAMES.items()}
+
+(_T_NULL, _T_FALSE, _T_TRUE, _T_INT, _T_FLOAT, _T_TENTHS, _T_STR, _T_STRREF,
+ _T_LIST, _T_DICT, _T_DATE, _T_DATETIME) = range(12)
+
+_DOUBLE = struct.Struct('<d')
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def _date_ordinal(s: str) -> Optional[int]:
+    """以YYYY-MM-DD开头且能原样还原的字符串返回日期序数，否则返回None"""
+    if len(s) < 10 or s[4] != '-' or s[7] != '-':
+        return None
+    try:
+        date = datetime.date.fromisoformat(s[:10])
+    except ValueError:
+        return None
+    return date.toordinal() if date.isoformat() == s[:10] else None
+
+
+class BinaryExportWriter(_ExportFormatWriter):
+    """字典编码的紧凑二进制格式，f需以二进制模式打开"""
+
+    def __init__(self, f: BinaryIO, version: str = "1.0", export_date: Optional[str] = None,
+                 metrics: Optional[RunMetrics] = None):
+        super().__init__(version, export_date, metrics)
+        self.f = f
+        self._strings: Dict[str, int] = {}
+        f.write(BINARY_MAGIC)
+        f.write(self._encode_frame(_FRAME_HEADER, {"version": self.version, "exportDate": self.export_date}))
+
+    def _encode_frame(self, frame: int, value: Any, key: Optional[str] = None) -> bytearray:
+        # 字符串字典在编码时更新，编码后的帧须按编码顺序写出
+        out = bytearray([frame])
+        if key is not None:
+            self._encode(out, key)
+        self._encode(out, value)
+        return out
+
+    def _encode_str(self, out: bytearray, s: str) -> None:
+        index = self._strings.get(s)
+        if index is not None:
+            out.append(_T_STRREF)
+            _write_varint(out, index)
+            return
+        self._strings[s] = len(self._strings)
+        data = s.encode('utf-8')
+        out.append(_T_STR)
+        _write_varint(out, len(data))
+        out += data
+
+    def _encode(self, out: bytearray, value: Any) -> None:
+        if value is None:
+            out.append(_T_NULL)
+        elif value is True:
+            out.append(_T_TRUE)
+        elif value is False:
+            out.append(_T_FALSE)
+        elif isinstance(value, int):
+            out.append(_T_INT)
+            _write_varint(out, _zigzag(value))
+        elif isinstance(value, float):
+            # 体重、体脂等一位小数的数值按整数个0.1编码，还原后逐位相同
+            if math.isfinite(value) and abs(value) < 1e15:
+                tenths = round(value * 10)
+                if tenths / 10 == value and (value or math.copysign(1.0, value) > 0):
+                    out.append(_T_TENTHS)
+                    _write_varint(out, _zigzag(tenths))
+                    return
+            out.append(_T_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif isinstance(value, str):
+            ordinal = _date_ordinal(value)
+            if ordinal is None or value in self._strings:
+                self._encode_str(out, value)
+            elif len(value) == 10:
+                out.append(_T_DATE)
+                _write_varint(out, ordinal)
+            else:
+                out.append(_T_DATETIME)
+                _write_varint(out, ordinal)
+                self._encode_str(out, value[10:])
+        elif isinstance(value, (list, tuple)):
+            out.append(_T_LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self._encode(out, item)
+        elif isinstance(value, dict):
+            out.append(_T_DICT)
+            _write_varint(out, len(value))
+            for key, item in value.items():
+                self._encode_str(out, key)
+                self._encode(out, item)
+        else:
+            raise TypeError(f"无法编码的类型: {type(value).__name__}")
+
+    def _encode_record(self, section: str, key: Optional[str], value: Any) -> bytearray:
+        return self._encode_frame(_SECTION_FRAMES[section], value, key if section == 'workouts' else None)
+
+    def _write_encoded(self, data: bytearray) -> None:
+        self.f.write(data)
+
+    def close(self, user_settings: Dict[str, Any]) -> Dict[str, int]:
+        with timed(self.metrics, 'serialization'):
+            frame = self._encode_frame(_FRAME_USER_SETTINGS, user_settings)
+        with timed(self.metrics, 'write'):
+            self.f.write(frame)
+            self.f.write(bytes([_FRAME_END]))
+        return dict(self.counts)
+
+
+class _BinaryReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = len(BINARY_MAGIC)
+        self.strings: List[str] = []
+
+    def varint(self) -> int:
+        data, pos = self.data, self.pos
+        byte = data[pos]
+        pos += 1
+        n, shift = byte & 0x7F, 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            n |= (byte & 0x7F) << shift
+            shift += 7
+        self.pos = pos
+        return n
+
+    def signed(self) -> int:
+        n = self.varint()
+        return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+    def value(self) -> Any:
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _T_STRREF:
+            return self.strings[self.varint()]
+        if tag == _T_DICT:
+            n = self.varint()
+            result = {}
+            for _ in range(n):
+                key = self.value()
+                result[key] = self.value()
+            return result
+        if tag == _T_TENTHS:
+            return self.signed() / 10
+        if tag == _T_INT:
+            return self.signed()
+        if tag == _T_LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == _T_DATE:
+            return datetime.date.fromordinal(self.varint()).isoformat()
+        if tag == _T_DATETIME:
+            date = datetime.date.fromordinal(self.varint()).isoformat()
+            return date + self.value()
+        if tag == _T_STR:
+            n = self.varint()
+            s = self.data[self.pos:self.pos + n].decode('utf-8')
+            self.pos += n
+            self.strings.append(s)
+            return s
+        if tag == _T_TRUE:
+            return True
+        if tag == _T_FALSE:
+            return False
+        if tag == _T_NULL:
+            return None
+        if tag == _T_FLOAT:
+            value, = _DOUBLE.unpack_from(self.data, self.pos)
+            self.pos += 8
+            return value
+        raise ValueError(f"偏移{self.pos - 1}处的类型标记无效: {tag}")
+
+
+def load_binary(f: BinaryIO) -> Dict[str, Any]:
+    """加载二进制格式的导出文件"""
+    data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError("不是二进制格式的导出文件")
+    reader = _BinaryReader(data)
+    assembler = ExportAssembler()
+    while True:
+        if reader.pos >= len(data):
+            raise ValueError("二进制文件不完整")
+        frame = data[reader.pos]
+        reader.pos += 1
+        if frame == _FRAME_END:
+            break
+        if frame == _FRAME_HEADER:
+            assembler.header = reader.value()
+        elif frame == _FRAME_USER_SETTINGS:
+            assembler.user_settings = reader.value()
+        elif frame in _FRAME_SECTIONS:
+            section = _FRAME_SECTIONS[frame]
+            key = reader.value() if section == 'workouts' else None
+            assembler.add(section, key, reader.value())
+        else:
+            raise ValueError(f"偏移{reader.pos - 1}处的帧类型无效: {frame}")
+    return assembler.result()
+
+
+# === 列式格式 ===
+#
+# 输出为一个目录：meta.json保存文件头和用户设置，每个部分一个JSON文件。
+# 记录按列存储，嵌套的列表(训练项目、餐食、食物)展开为子表并记录每行的元素个数；
+# 日期列存为起始序数和差值，重复较多的字符串列存为字典和编码。
+
+def _encode_column(values: List[Any]) -> Dict[str, Any]:
+    """编码一列值"""
+    if values and all(isinstance(v, list) for v in values):
+        items = [item for v in values for item in v]
+        return {"type": "list", "counts": [len(v) for v in values], "items": _encode_column(items)}
+    if values and all(isinstance(v, dict) for v in values):
+        keys = list(values[0])
+        # 字段不一致的字典无法按列存储，整体保存
+        if all(list(v) == keys for v in values):
+            return {"type": "table", **_encode_table(values)}
+    if values and all(isinstance(v, str) for v in values):
+        ordinals = [_date_ordinal(v) for v in values]
+        if None not in ordinals:
+            deltas = [b - a for a, b in zip(ordinals, ordinals[1:])]
+            column = {"type": "date", "start": ordinals[0], "deltas": deltas}
+            suffixes = [v[10:] for v in values]
+            if any(suffixes):
+                column["suffix"] = _encode_column(suffixes)
+            return column
+        distinct = list(dict.fromkeys(values))
+        if len(distinct) * 2 <= len(values):
+            codes = {v: i for i, v in enumerate(distinct)}
+            return {"type": "dict", "dict": distinct, "codes": [codes[v] for v in values]}
+    return {"type": "plain", "values": values}
+
+
+def _decode_column(column: Dict[str, Any]) -> List[Any]:
+    kind = column["type"]
+    if kind == "plain":
+        return column["values"]
+    if kind == "dict":
+        distinct = column["dict"]
+        return [distinct[code] for code in column["codes"]]
+    if kind == "date":
+        ordinal = column["start"]
+        ordinals = [ordinal]
+        for delta in column["deltas"]:
+            ordinal += delta
+            ordinals.append(ordinal)
+        dates = [datetime.date.fromordinal(o).isoformat() for o in ordinals]
+        if "suffix" in column:
+            dates = [d + s for d, s in zip(dates, _decode_column(column["suffix"]))]
+        return dates
+    if kind == "list":
+        items = _decode_column(column["items"])
+        result, pos = [], 0
+        for count in column["counts"]:
+            result.append(items[pos:pos + count])
+            pos += count
+        return result
+    if kind == "table":
+        return _decode_table(column)
+    raise ValueError(f"未知的列类型: {kind}")
+
+
+def _encode_table(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """编码一组字段相同(且顺序相同)的字典"""
+    keys = list(rows[0]) if rows else []
+    return {"rows": len(rows), "keys": keys,
+            "columns": [_encode_column([row[key] for row in rows]) for key in keys]}
+
+
+def _decode_table(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    keys = table["keys"]
+    if not keys:
+        return [{} for _ in range(table["rows"])]
+    columns = [_decode_column(column) for column in table["columns"]]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+class ColumnarExportWriter(_ExportFormatWriter):
+    """列式格式：记录在内存中按部分收集，close()时按列编码并写出目录"""
+
+    def __init__(self, directory: str, version: str = "1.0", export_date: Optional[str] = None,
+                 metrics: Optional[RunMetrics] = None):
+        super().__init__(version, export_date, metrics)
+        self.directory = directory
+        self._records: Dict[str, List[Any]] = {section: [] for section in SECTIONS}
+        self._workout_keys: List[str] = []
+
+    def _encode_record(self, section: str, key: Optional[str], value: Any) -> Tuple[str, Optional[str], Any]:
+        # 记录在close()时才按列编码
+        return section, key, value
+
+    def _write_encoded(self, data: Tuple[str, Optional[str], Any]) -> None:
+        section, key, value = data
+        if section == 'workouts':
+            self._workout_keys.append(key)
+        self._records[section].append(value)
+
+    def close(self, user_settings: Dict[str, Any]) -> Dict[str, int]:
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {"format": "columnar", "version": self.version, "exportDate": self.export_date,
+                "sections": SECTIONS, "userSettings": user_settings}
+        files = [(COLUMNAR_META, meta)]
+        for section in SECTIONS:
+            with timed(self.metrics, 'serialization'):
+                content = {"kind": "list", "values": _encode_column(self._records[section])}
+                if section == 'workouts':
+                    content["kind"] = "dict"
+                    content["keys"] = _encode_column(self._workout_keys)
+            files.append((section + '.json', content))
+        for name, content in files:
+            with timed(self.metrics, 'serialization'):
+                text = _compact_json(content)
+            with timed(self.metrics, 'write'):
+                with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+        return dict(self.counts)
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_columnar(directory: str) -> Dict[str, Any]:
+    """加载列式格式的导出目录"""
+    with open(os.path.join(directory, COLUMNAR_META), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format') != 'columnar':
+        raise ValueError("不是列式格式的导出目录")
+    data = {}
+    for section in meta['sections']:
+        with open(os.path.join(directory, section + '.json'), 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        values = _decode_column(content['values'])
+        if content['kind'] == 'dict':
+            data[section] = dict(zip(_decode_column(content['keys']), values))
+        else:
+            data[section] = values
+    data['userSettings'] = meta['userSettings']
+    return {"version": meta['version'], "exportDate": meta['exportDate'], "data": data}
+
+
+# === 统一入口 ===
+
+def detect_format(path: str) -> str:
+    """根据文件内容判断导出格式(压缩文件按解压后的内容判断)"""
+    if os.path.isdir(path):
+        return 'columnar'
+    with open_input(path, 'rb', threads=1) as f:
+        head = f.read(64)
+    if head.startswith(BINARY_MAGIC):
+        return 'binary'
+    if head.startswith(b'{"format":"ndjson"'):
+        return 'ndjson'
+    return 'json'
+
+
+def open_export_writer(path: str, fmt: str, version: str = "1.0", export_date: Optional[str] = None,
+                       compress_level: Optional[int] = None, compress_threads: Optional[int] = None,
+                       metrics: Optional[RunMetrics] = None) -> Tuple[_ExportFormatWriter, Any]:
+    """
+    创建紧凑格式的写入器(path带压缩扩展名时分块并行压缩)；传入metrics时分别统计编码和写出的耗时
+
+    Returns:
+        (写入器, 需要在close()后关闭的文件对象或None)
+    """
+    if fmt == 'ndjson':
+        f = open_output(path, 'w', level=compress_level, threads=compress_threads)
+        return NdjsonExportWriter(f, version, export_date, metrics=metrics), f
+    if fmt == 'binary':
+        f = open_output(path, 'wb', level=compress_level, threads=compress_threads)
+        return BinaryExportWriter(f, version, export_date, metrics), f
+    if fmt == 'columnar':
+        if compression_from_path(path):
+            raise ValueError(f"列式格式输出为目录，不支持压缩扩展名: "
+                             f"{', '.join(COMPRESSION_EXTENSIONS.values())}")
+        return ColumnarExportWriter(path, version, export_date, metrics), None
+    raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def write_export(export_data: Dict[str, Any], path: str, fmt: str) -> Dict[str, int]:
+    """把完整的导出数据写为指定格式"""
+    if fmt == 'json':
+        with open_output(path, 'w') as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        return {section: len(export_data['data'][section]) for section in SECTIONS}
+    writer, f = open_export_writer(path, fmt, export_data['version'], export_data['exportDate'])
+    try:
+        writer.add_export(export_data)
+        return writer.close(export_data['data']['userSettings'])
+    finally:
+        if f is not None:
+            f.close()
+
+
+def load_export(path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """加载任意格式的导出文件(默认自动识别格式和压缩)，返回Flutter导入格式的数据结构"""
+    fmt = fmt or detect_format(path)
+    if fmt == 'columnar':
+        return load_columnar(path)
+    if fmt == 'binary':
+        with open_input(path, 'rb') as f:
+            return load_binary(f)
+    with open_input(path, 'r') as f:
+        return load_ndjson(f) if fmt == 'ndjson' else json.load(f)
+
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在各导出格式之间转换')
+    parser.add_argument('input', help='输入文件(自动识别格式)')
+    parser.add_argument('output', help='输出文件(列式格式为目录)')
+    parser.add_argument('--format', choices=FORMATS, default='binary', help='输出格式 (默认: binary)')
+    args = parser.parse_args()
+
+    try:
+        export_data = load_export(args.input)
+        counts = write_export(export_data, args.output, args.format)
+    except (OSError, ValueError) as e:
+        print(f"✗ 转换失败: {e}")
+        return 1
+
+    print(f"✓ 已将 {args.input} ({detect_format(args.input)}, {_path_size(args.input)} 字节) "
+          f"转换为 {args.output} ({args.format}, {_path_size(args.output)} 字节)")
+    print(f"- 记录数: " + ", ".join(f"{section} {count}" for section, count in counts.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
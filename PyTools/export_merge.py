@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+合并同一用户的多个导出文件
+把各文件的weights、bodyFat、nutrition列表和workouts日期字典看作按日期排序的记录流，
+逐部分做k路归并，同一天的记录按冲突策略合并后写出一个合法的导出文件。
+每个输入只保留当前记录和当天的记录，内存占用与输入文件的大小无关
+"""
+
+import argparse
+import heapq
+import itertools
+import os
+import sys
+import time
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from compressed_io import compression_from_path, open_input, open_output
+from export_formats import detect_format
+from export_writer import SECTIONS, StreamingExportWriter
+from json_stream import iter_export
+
+# latest-wins: 同一天的记录不同时使用exportDate最新的文件(相同时取命令行中靠后的文件)中的记录
+# keep-both:   保留各文件中不同的记录(训练项目合并到同一个日期键下)
+# error:       同一天的记录不同时报错
+CONFLICT_POLICIES = ('latest-wins', 'keep-both', 'error')
+
+
+class MergeConflictError(ValueError):
+    """error策略下不同文件中同一天的记录不一致"""
+
+
+class ExportStream:
+    """
+    一个导出文件按部分的增量扫描(export_diff.py也使用)
+
+    各部分按导出格式的顺序(SECTIONS)依次读取，整个文件只扫描一次；
+    某个部分不在预期位置时(键顺序不同或缺少该部分)，另外扫描一遍文件读取该部分。
+    """
+
+    def __init__(self, path: str, order: int):
+        self.path = path
+        self.order = order
+        self.fields: Dict[str, Any] = {}
+        self.user_settings: Optional[Dict[str, Any]] = None
+        self._file = open_input(path, 'rb')
+        self._events = iter_export(self._file)
+        self._pending = None
+        # 读取data之前的顶级字段(version、exportDate)
+        self._peek()
+
+    def _peek(self):
+        """下一个部分事件(顶级字段和userSettings在经过时记录下来)，文件结束时为None"""
+        while self._pending is None:
+            event = next(self._events, None)
+            if event is None:
+                return None
+            if event.kind == 'field':
+                self.fields[event.key] = event.value
+            elif event.kind == 'section_value':
+                if event.section == 'userSettings':
+                    self.user_settings = event.value
+            else:
+                self._pending = event
+        return self._pending
+
+    @property
+    def rank(self) -> Tuple[str, int]:
+        """latest-wins策略下的优先级：exportDate，其次是命令行中的顺序"""
+        export_date = self.fields.get('exportDate')
+        return (export_date if isinstance(export_date, str) else '', self.order)
+
+    def items(self, section: str) -> Iterator[Tuple[str, int, Any, Any]]:
+        """按文件顺序产出某个部分的(日期, 文件序号, 键, 记录)，日期倒退时报错"""
+        event = self._peek()
+        if event is not None and event.kind == 'section_start' and event.section == section:
+            self._pending = None
+            records = self._section_items(self._events, section)
+        else:
+            records = self._rescan(section)
+        last_date = None
+        for key, value in records:
+            if section == 'workouts':
+                date = key
+            elif isinstance(value, dict) and isinstance(value.get('date'), str):
+                date = value['date']
+            else:
+                raise ValueError(f"{self.path} 的{section}中有记录缺少date字段")
+            date = date[:10]
+            if last_date is not None and date < last_date:
+                raise ValueError(f"{self.path} 的{section}未按日期排序: {date} 在 {last_date} 之后")
+            last_date = date
+            yield date, self.order, key, value
+
+    @staticmethod
+    def _section_items(events, section: str) -> Iterator[Tuple[Any, Any]]:
+        for event in events:
+            if event.kind == 'section_end':
+                return
+            yield event.key, event.value
+
+    def _rescan(self, section: str) -> Iterator[Tuple[Any, Any]]:
+        with open_input(self.path, 'rb') as f:
+            for event in iter_export(f):
+                if event.kind == 'item' and event.section == section:
+                    yield event.key, event.value
+
+    def finish(self) -> None:
+        """读完文件的剩余部分(取得userSettings)并关闭"""
+        while self._peek() is not None:
+            self._pending = None
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _dedupe(records: List[Any]) -> List[Any]:
+    """去掉重复的记录，保持顺序"""
+    unique = []
+    for record in records:
+        if record not in unique:
+            unique.append(record)
+    return unique
+
+
+def _resolve_day(section: str, date: str, group: List[Tuple[str, int, Any, Any]], inputs: List[ExportStream],
+                 policy: str, stats: Dict[str, int]) -> List[Any]:
+    """
+    合并同一部分同一天的记录
+
+    group为按文件序号排列的(日期, 文件序号, 键, 记录)。每个文件的记录作为一份整体比较，
+    内容相同的份只保留一份；不同时按策略处理。
+
+    Returns:
+        合并后的记录列表(workouts为当天的训练项目列表)
+    """
+    contributions: List[Tuple[int, List[Any]]] = []
+    for order, entries in itertools.groupby(group, key=lambda entry: entry[1]):
+        if section == 'workouts':
+            records = [workout for _, _, _, daily in entries for workout in daily]
+        else:
+            records = [value for _, _, _, value in entries]
+        if any(records == existing for _, existing in contributions):
+            stats["duplicates"] += 1
+            continue
+        contributions.append((order, records))
+    if len(contributions) == 1:
+        return contributions[0][1]
+
+    stats["conflicts"] += 1
+    if policy == 'error':
+        paths = ', '.join(inputs[order].path for order, _ in contributions)
+        raise MergeConflictError(f"{section}中{date}的记录在以下文件中不一致: {paths}")
+    if policy == 'latest-wins':
+        return max(contributions, key=lambda contribution: inputs[contribution[0]].rank)[1]
+    return _dedupe([record for _, records in contributions for record in records])
+
+
+def _merged_section(section: str, inputs: List[ExportStream], policy: str,
+                    stats: Dict[str, int]) -> Iterator[Tuple[str, List[Any]]]:
+    """k路归并一个部分，按日期产出(日期, 当天合并后的记录)"""
+    # heapq.merge是稳定的：同一天的记录按文件序号排列
+    streams = heapq.merge(*(stream.items(section) for stream in inputs), key=lambda entry: entry[0])
+    for date, group in itertools.groupby(streams, key=lambda entry: entry[0]):
+        yield date, _resolve_day(section, date, list(group), inputs, policy, stats)
+
+
+def _merged_user_settings(inputs: List[ExportStream], policy: str) -> Dict[str, Any]:
+    """用户设置取自exportDate最新的文件；error策略下各文件的设置不同时报错"""
+    settings = [stream for stream in inputs if stream.user_settings is not None]
+    if not settings:
+        return {}
+    if policy == 'error' and any(stream.user_settings != settings[0].user_settings for stream in settings):
+        raise MergeConflictError(
+            f"userSettings在以下文件中不一致: {', '.join(stream.path for stream in settings)}")
+    return max(settings, key=lambda stream: stream.rank).user_settings
+
+
+def merge_exports(paths: List[str], output: str, policy: str = 'latest-wins', indent: Optional[int] = 2,
+                  export_date: Optional[str] = None) -> Dict[str, Any]:
+    """
+    合并多个JSON导出文件(可以是gzip/xz/bz2压缩文件)，写出一个导出文件
+
+    每个文件中各部分的记录须按日期排序(本工具生成、追加或截取的文件都满足)；同一部分中的记录以日期为键合并，
+    各文件中内容相同的记录只保留一份。version取自exportDate最新的文件，exportDate默认为当前时间。
+    输出先写入临时文件，出错时不会留下不完整的文件。
+
+    Returns:
+        {"counts": 各部分写出的记录数, "duplicates": 去掉的重复记录(份)数, "conflicts": 内容不同的日期数,
+         "firstDate": 最早日期, "lastDate": 最晚日期}
+
+    Raises:
+        MergeConflictError: error策略下存在内容不同的记录
+        ValueError: 输入不是合法的导出文件或记录未按日期排序
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"未知的冲突策略: {policy}，可选: {', '.join(CONFLICT_POLICIES)}")
+    if not paths:
+        raise ValueError("至少需要一个输入文件")
+    for path in paths:
+        fmt = detect_format(path)
+        if fmt != 'json':
+            raise ValueError(f"{path} 是{fmt}格式，只支持合并JSON导出文件")
+
+    inputs = []
+    try:
+        for order, path in enumerate(paths):
+            inputs.append(ExportStream(path, order))
+        latest = max(inputs, key=lambda stream: stream.rank)
+        stats = {"duplicates": 0, "conflicts": 0}
+
+        temp_path = f"{output}.partial-{os.getpid()}"
+        try:
+            with open_output(temp_path, 'w', compression=compression_from_path(output)) as out:
+                writer = StreamingExportWriter(out, indent=indent, version=latest.fields.get('version', '1.0'),
+                                               export_date=export_date)
+                for section in SECTIONS:
+                    for date, records in _merged_section(section, inputs, policy, stats):
+                        if section == 'workouts':
+                            writer.add_workouts(date, records)
+                        else:
+                            for record in records:
+                                writer.add_record(section, None, record)
+                for stream in inputs:
+                    stream.finish()
+                result = writer.close(_merged_user_settings(inputs, policy))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        os.replace(temp_path, output)
+    finally:
+        for stream in inputs:
+            stream.close()
+
+    return {
+        "counts": result["counts"],
+        "duplicates": stats["duplicates"],
+        "conflicts": stats["conflicts"],
+        "firstDate": result["firstDate"],
+        "lastDate": result["lastDate"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按日期k路归并同一用户的多个导出文件')
+    parser.add_argument('inputs', nargs='+', help='JSON导出文件(可以是.gz/.xz/.bz2压缩文件)')
+    parser.add_argument('--output', type=str, required=True,
+                        help='合并结果的输出文件(扩展名为.gz/.xz/.bz2时压缩)')
+    parser.add_argument('--on-conflict', choices=CONFLICT_POLICIES, default='latest-wins',
+                        help='同一天的记录不同时的处理方式 (默认: latest-wins)')
+    parser.add_argument('--compact', action='store_true', help='输出紧凑JSON(无缩进和空白)')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    try:
+        result = merge_exports(args.inputs, args.output, args.on_conflict, indent=None if args.compact else 2)
+    except MergeConflictError as e:
+        print(f"✗ 合并失败(冲突): {e}")
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"✗ 合并失败: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    counts = result["counts"]
+    print(f"✓ 已将 {len(args.inputs)} 个文件合并到 {args.output} "
+          f"({os.path.getsize(args.output)} 字节, {elapsed:.2f} 秒)")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
+    print(f"- 去掉的重复记录: {result['duplicates']} 份")
+    print(f"- 内容不同的日期: {result['conflicts']} 个 (策略: {args.on_conflict})")
+    if result["firstDate"]:
+        print(f"- 数据日期范围: {result['firstDate']} 到 {result['lastDate']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+导出格式的声明式结构定义
+EXPORT_SCHEMA描述Flutter导入格式中每个部分及其记录的字段和类型，
+compile_schema()把它编译为专门的逐条记录检查函数，供生成器和验证脚本共用
+"""
+
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
+
+# 类型名 -> (isinstance使用的类型, 错误信息中的名称)
+_TYPES = {
+    'number': ((int, float), '数字'),
+    'int': (int, '整数'),
+    'bool': (bool, '布尔值'),
+    'str': (str, '字符串'),
+    'list': (list, '列表'),
+    'dict': (dict, '字典'),
+}
+
+# 生成代码中各嵌套层级的序号变量名；记录标签中可以用{i}、{j}引用
+_INDEX_NAMES = 'ijklmn'
+
+
+class Field:
+    """
+    字段定义
+
+    kind为'any'(只要求存在)或_TYPES中的类型名；items为列表元素的定义(Field或Record)，
+    length为列表必须包含的元素个数。message和length_message为类型错误和元素个数错误的信息模板
+    (默认由记录名生成)，length_message中可以用{count}引用实际个数。
+    """
+
+    def __init__(self, name: Optional[str], kind: str = 'any', items: Any = None,
+                 length: Optional[int] = None, label: Optional[str] = None,
+                 message: Optional[str] = None, length_message: Optional[str] = None):
+        if kind != 'any' and kind not in _TYPES:
+            raise ValueError(f"未知的字段类型: {kind}")
+        self.name = name
+        self.kind = kind
+        self.items = items
+        self.length = length
+        self.label = label
+        self.message = message
+        self.length_message = length_message
+
+
+class Record:
+    """
+    字典记录定义，label为错误信息中的记录名(可引用序号变量，如"体重记录{i}")
+
+    missing为缺少字段时的信息模板，默认为"<记录名>缺少必要字段: <字段列表>"。
+    """
+
+    def __init__(self, label: str, fields: Sequence[Field], missing: Optional[str] = None):
+        self.label = label
+        self.fields = list(fields)
+        self.missing = missing
+
+
+class Section:
+    """
+    data中的一个部分
+
+    kind为'list'或'dict'；item为每个元素(字典部分为每个值)的定义，None表示不检查元素；
+    count为统计子项目数的方式：None、'len'(元素本身的长度)或字段名(该字段的长度)。
+    """
+
+    def __init__(self, kind: str, item: Any = None, count: Optional[str] = None):
+        self.kind = kind
+        self.item = item
+        self.count = count
+
+
+TOP_LEVEL_FIELDS = ['version', 'exportDate', 'data']
+
+# 错误信息沿用最初的逐部分验证函数的措辞(CI可能按这些信息匹配)
+EXPORT_SCHEMA: Dict[str, Section] = {
+    'weights': Section('list', Record('体重记录{i}', [
+        Field('date'),
+        Field('weight', 'number', message='体重记录{i}的weight值不是数字'),
+    ], missing='体重记录{i}缺少必要字段')),
+    'bodyFat': Section('list', Record('体脂记录{i}', [
+        Field('date'),
+        Field('bodyFatPercentage', 'number', message='体脂记录{i}的bodyFatPercentage值不是数字'),
+    ], missing='体脂记录{i}缺少必要字段')),
+    # 日期 -> 当天的训练项目列表
+    'workouts': Section('dict', Field(None, 'list', label='{i}的训练记录', items=Record('{i}的训练记录{j}', [
+        Field('date'),
+        Field('name'),
+        Field('sets', 'int', message='sets值必须是整数'),
+        Field('isCompleted', 'bool', message='isCompleted值必须是布尔值'),
+    ], missing="训练记录缺少必要字段: ['date', 'name', 'sets', 'isCompleted']")), count='len'),
+    'nutrition': Section('list', Record('营养记录{i}', [
+        Field('date'),
+        Field('calorieIntake', 'number', message='营养记录{i}的calorieIntake值必须是数字'),
+        Field('caloriesBurned', 'number', message='营养记录{i}的caloriesBurned值必须是数字'),
+        Field('calorieGoal', 'number', message='营养记录{i}的calorieGoal值必须是数字'),
+        # Flutter导入时每个meal对应一个MealEntry，foods只能包含一个食物
+        Field('meals', 'list', items=Record('营养记录{i}的meal{j}', [
+            Field('name'),
+            Field('foods', 'list', length=1, message='meal{j}的foods必须是列表',
+                  length_message='meal{j}的foods必须只包含一个食物项目，实际包含{count}个'),
+            Field('calories', 'number', message='meal{j}的calories值必须是数字'),
+        ])),
+    ]), count='meals'),
+    'userSettings': Section('dict'),
+}
+
+_OK: List[str] = []
+
+
+class _CodeGenerator:
+    """把记录定义展开为Python源代码"""
+
+    def __init__(self, fail_fast: bool):
+        self.fail_fast = fail_fast
+        self.lines: List[str] = []
+
+    def emit(self, indent: int, text: str) -> None:
+        self.lines.append('    ' * indent + text)
+
+    def error(self, indent: int, message: str) -> None:
+        # message为f-string模板，可引用序号变量和当前值
+        expr = 'f' + repr('✗ ' + message)
+        self.emit(indent, f"return [{expr}]" if self.fail_fast else f"errors.append({expr})")
+
+    def node(self, spec: Any, var: str, label: str, indent: int, depth: int) -> None:
+        if isinstance(spec, Record):
+            self.record(spec, var, indent, depth)
+        else:
+            self.value(spec, var, label, indent, depth)
+
+    def record(self, spec: Record, var: str, indent: int, depth: int) -> None:
+        label = spec.label
+        self.emit(indent, f"if type({var}) is not dict:")
+        self.error(indent + 1, f"{label}必须是字典")
+        self.emit(indent, "else:")
+        indent += 1
+        names = [field.name for field in spec.fields]
+        self.emit(indent, "if " + " or ".join(f"{name!r} not in {var}" for name in names) + ":")
+        self.error(indent + 1, spec.missing or f"{label}缺少必要字段: {names}")
+        checked = [field for field in spec.fields if field.kind != 'any']
+        if not checked:
+            return
+        if not self.fail_fast:
+            # 收集全部错误时，缺失的字段不再检查类型
+            self.emit(indent, "else:")
+            indent += 1
+        value_var = f"v{depth}"
+        for field in checked:
+            self.emit(indent, f"{value_var} = {var}[{field.name!r}]")
+            self.value(field, value_var, f"{label}的{field.name}", indent, depth)
+
+    def value(self, spec: Field, var: str, label: str, indent: int, depth: int) -> None:
+        label = spec.label or label
+        if spec.kind == 'any':
+            return
+        types, type_name = _TYPES[spec.kind]
+        type_expr = '(' + ', '.join(t.__name__ for t in types) + ')' if isinstance(types, tuple) else types.__name__
+        self.emit(indent, f"if not isinstance({var}, {type_expr}):")
+        self.error(indent + 1, spec.message or f"{label}必须是{type_name}")
+        if spec.length is None and spec.items is None:
+            return
+        self.emit(indent, "else:")
+        indent += 1
+        if spec.length is not None:
+            self.emit(indent, f"if len({var}) != {spec.length}:")
+            message = spec.length_message or f"{label}必须只包含{spec.length}个项目，实际包含{{count}}个"
+            self.error(indent + 1, message.replace('{count}', f"{{len({var})}}"))
+        if spec.items is not None:
+            index, item_var = _INDEX_NAMES[depth + 1], f"r{depth + 1}"
+            self.emit(indent, f"for {index}, {item_var} in enumerate({var}):")
+            self.node(spec.items, item_var, label, indent + 1, depth + 1)
+
+    def compile(self, spec: Any, name: str) -> Callable[[Any, Any], List[str]]:
+        self.lines = [f"def {name}(i, r0):"]
+        if not self.fail_fast:
+            self.emit(1, "errors = []")
+        self.node(spec, 'r0', '{i}', 1, 0)
+        self.emit(1, "return _OK" if self.fail_fast else "return errors")
+        namespace = {'_OK': _OK}
+        exec(compile('\n'.join(self.lines), f"<export_schema:{name}>", 'exec'), namespace)
+        return namespace[name]
+
+
+class CompiledSchema:
+    """
+    编译后的验证器
+
+    fail_fast=True时每个检查函数在第一个错误处返回；否则收集全部错误。
+    检查函数返回错误信息列表(空列表表示通过)。
+    """
+
+    def __init__(self, schema: Dict[str, Section] = EXPORT_SCHEMA, fail_fast: bool = True):
+        self.schema = schema
+        self.fail_fast = fail_fast
+        generator = _CodeGenerator(fail_fast)
+        # 部分名 -> check(序号或字典键, 记录)
+        self.record_checks: Dict[str, Callable[[Any, Any], List[str]]] = {
+            section: generator.compile(spec.item, f"check_{section}")
+            for section, spec in schema.items() if spec.item is not None
+        }
+
+    def check_top_level(self, export_data: Any) -> List[str]:
+        """检查顶级字段和data中的各部分是否存在"""
+        if not isinstance(export_data, dict):
+            return ["✗ 导出数据必须是字典"]
+        errors = [f"✗ 缺少顶级字段: {field}" for field in TOP_LEVEL_FIELDS if field not in export_data]
+        if errors:
+            return errors[:1] if self.fail_fast else errors
+        data = export_data['data']
+        if not isinstance(data, dict):
+            return ["✗ data字段必须是字典"]
+        errors = [f"✗ 缺少数据字段: {section}" for section in self.schema if section not in data]
+        return errors[:1] if self.fail_fast else errors
+
+    def section_kind_error(self, section: str, kind: str) -> Optional[str]:
+        """部分的实际类型('list'或'dict')与定义不符时的错误信息"""
+        expected = self.schema[section].kind
+        if kind == expected:
+            return None
+        return f"✗ {section}必须是{'列表' if expected == 'list' else '字典'}"
+
+    def section_type_error(self, section: str, value: Any) -> Optional[str]:
+        """部分本身的类型错误"""
+        kind = 'list' if isinstance(value, list) else 'dict' if isinstance(value, dict) else type(value).__name__
+        return self.section_kind_error(section, kind)
+
+    def item_count(self, section: str, record: Any) -> int:
+        """一条(已通过检查的)记录包含的子项目数"""
+        count = self.schema[section].count
+        if count is None:
+            return 0
+        return len(record) if count == 'len' else len(record[count])
+
+    def check_record(self, section: str, key: Any, value: Any) -> List[str]:
+        """检查一条记录；key为列表部分中的序号或字典部分中的键"""
+        check = self.record_checks.get(section)
+        return check(key, value) if check is not None else _OK
+
+    def check_section(self, section: str, value: Any) -> Tuple[List[str], int, int]:
+        """
+        检查一个部分的全部记录
+
+        Returns:
+            (错误信息列表, 记录数, 通过检查的记录中的子项目数)
+        """
+        type_error = self.section_type_error(section, value)
+        if type_error:
+            return [type_error], 0, 0
+        spec = self.schema[section]
+        check = self.record_checks.get(section)
+        records = value.items() if spec.kind == 'dict' else enumerate(value)
+        errors: List[str] = []
+        items = 0
+        if check is None:
+            return errors, len(value), 0
+        count = spec.count
+        for key, record in records:
+            record_errors = check(key, record)
+            if record_errors:
+                if self.fail_fast:
+                    return record_errors, len(value), items
+                errors.extend(record_errors)
+            elif count is not None:
+                items += len(record) if count == 'len' else len(record[count])
+        return errors, len(value), items
+
+    def validate(self, export_data: Any) -> List[str]:
+        """检查完整的导出数据，返回错误信息列表"""
+        errors = self.check_top_level(export_data)
+        if errors:
+            return errors
+        data = export_data['data']
+        for section in self.schema:
+            section_errors = self.check_section(section, data[section])[0]
+            if section_errors:
+                if self.fail_fast:
+                    return section_errors
+                errors.extend(section_errors)
+        return errors
+
+
+_COMPILED: Dict[bool, CompiledSchema] = {}
+
+
+def compile_schema(fail_fast: bool = True) -> CompiledSchema:
+    """返回编译后的EXPORT_SCHEMA验证器(每种模式只编译一次)"""
+    compiled = _COMPILED.get(fail_fast)
+    if compiled is None:
+        compiled = _COMPILED[fail_fast] = CompiledSchema(EXPORT_SCHEMA, fail_fast)
+    return compiled
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+流式导出写入器
+按记录增量写出Flutter导入格式的JSON文件，内存占用与记录数量无关
+"""
+
+import datetime
+import json
+import shutil
+import tempfile
+from typing import Dict, List, Any, Optional, TextIO, Tuple
+
+# 导出文件data部分的列表/字典字段，按写出顺序排列
+SECTIONS = ['weights', 'bodyFat', 'workouts', 'nutrition']
+
+
+class RecordFormatter:
+    """按导出文件中的缩进层级序列化记录，可在进程池中独立使用"""
+
+    def __init__(self, indent: Optional[int] = 2):
+        self.indent = indent
+        self._key_sep = ': ' if indent is not None else ':'
+        self._keys: Dict[str, str] = {}
+
+    def newline(self, depth: int) -> str:
+        """换行并缩进到指定层级(紧凑格式下为空)"""
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * (self.indent * depth)
+
+    def key(self, key: str) -> str:
+        """序列化后的字典键(含分隔符)"""
+        text = self._keys.get(key)
+        if text is None:
+            text = self._keys[key] = json.dumps(key, ensure_ascii=False) + self._key_sep
+        return text
+
+    @staticmethod
+    def dumps_str(value: str) -> str:
+        return json.dumps(value, ensure_ascii=False)
+
+    def format_object(self, pairs: List[Tuple[str, str]], depth: int) -> str:
+        """由(键, 已序列化的值)组装位于depth层的字典，结果与dumps()一致"""
+        if not pairs:
+            return '{}'
+        inner = self.newline(depth + 1)
+        key = self.key
+        return '{' + inner + (',' + inner).join([key(k) + v for k, v in pairs]) + self.newline(depth) + '}'
+
+    def format_array(self, items: List[str], depth: int) -> str:
+        """由已序列化的元素组装位于depth层的列表，结果与dumps()一致"""
+        if not items:
+            return '[]'
+        inner = self.newline(depth + 1)
+        return '[' + inner + (',' + inner).join(items) + self.newline(depth) + ']'
+
+    def dumps(self, value: Any, depth: int) -> str:
+        """序列化一个值，使其嵌套内容按所在层级缩进"""
+        if self.indent is None:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        text = json.dumps(value, indent=self.indent, ensure_ascii=False)
+        # JSON字符串内部的换行都已转义，这里只会替换结构性换行
+        return text.replace('\n', self.newline(depth))
+
+    def format_day(self, day: Dict[str, Any]) -> List[Tuple[str, str, str, int]]:
+        """
+        序列化FitnessDataGenerator.iter_days()产出的一天数据
+
+        Returns:
+            [(部分名, 序列化后的元素, 日期, 子项目数), ...]，可直接传给StreamingExportWriter.add_formatted
+        """
+        items = []
+        if day.get('weight') is not None:
+            items.append(('weights', self.dumps(day['weight'], 3), day['date'], 0))
+        if day.get('bodyFat') is not None:
+            items.append(('bodyFat', self.dumps(day['bodyFat'], 3), day['date'], 0))
+        if day.get('workouts'):
+            items.append(('workouts', self.key(day['date']) + self.dumps(day['workouts'], 3),
+                          day['date'], len(day['workouts'])))
+        if day.get('nutrition') is not None:
+            items.append(('nutrition', self.dumps(day['nutrition'], 3), day['date'],
+                          len(day['nutrition']['meals'])))
+        return items
+
+
+class StreamingExportWriter:
+    """
+    增量写出导出数据
+
+    文件按"先全部体重、再全部体脂……"的顺序组织，而数据通常按天产生，
+    因此第一个部分(weights)直接写入目标文件，其余部分先写入临时文件，
+    在close()时依次拼接。indent=2时输出与
+    json.dump(export_data, f, indent=2, ensure_ascii=False) 逐字节一致；
+    indent=None时输出紧凑格式(无空白)。
+    """
+
+    def __init__(self, f: TextIO, indent: Optional[int] = 2, version: str = "1.0",
+                 export_date: Optional[str] = None):
+        self.f = f
+        self.formatter = RecordFormatter(indent)
+        self.counts = {section: 0 for section in SECTIONS}
+        self.workout_items = 0
+        self.meal_items = 0
+        self.first_date = None
+        self.last_date = None
+        self._spools = {section: tempfile.TemporaryFile('w+', encoding='utf-8')
+                        for section in SECTIONS[1:]}
+        self._closed = False
+
+        fmt = self.formatter
+        export_date = export_date or datetime.datetime.now().isoformat()
+        f.write('{')
+        f.write(fmt.newline(1) + fmt.key('version') + json.dumps(version, ensure_ascii=False) + ',')
+        f.write(fmt.newline(1) + fmt.key('exportDate') + json.dumps(export_date, ensure_ascii=False) + ',')
+        f.write(fmt.newline(1) + fmt.key('data') + '{')
+        f.write(fmt.newline(2) + fmt.key('weights') + '[')
+
+    def add_formatted(self, section: str, item: str, date: str, items: int = 0) -> None:
+        """
+        向某个部分追加一个已序列化的元素(字典部分需包含键)
+
+        items为该元素包含的子项目数(训练项目数或餐食数)，只用于统计。
+        """
+        target = self.f if section == 'weights' else self._spools[section]
+        if self.counts[section]:
+            target.write(',')
+        target.write(self.formatter.newline(3) + item)
+        self.counts[section] += 1
+        if section == 'workouts':
+            self.workout_items += items
+        elif section == 'nutrition':
+            self.meal_items += items
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+    def add_weight(self, record: Dict[str, Any]) -> None:
+        self.add_formatted('weights', self.formatter.dumps(record, 3), record['date'])
+
+    def add_body_fat(self, record: Dict[str, Any]) -> None:
+        self.add_formatted('bodyFat', self.formatter.dumps(record, 3), record['date'])
+
+    def add_workouts(self, date_key: str, daily_workouts: List[Dict[str, Any]]) -> None:
+        fmt = self.formatter
+        self.add_formatted('workouts', fmt.key(date_key) + fmt.dumps(daily_workouts, 3),
+                           date_key, len(daily_workouts))
+
+    def add_nutrition(self, entry: Dict[str, Any]) -> None:
+        self.add_formatted('nutrition', self.formatter.dumps(entry, 3), entry['date'],
+                           len(entry['meals']))
+
+    def add_record(self, section: str, key: Optional[str], value: Any) -> None:
+        """按部分追加一条记录(export_formats.iter_records的产出形式，key只用于workouts)"""
+        if section == 'weights':
+            self.add_weight(value)
+        elif section == 'bodyFat':
+            self.add_body_fat(value)
+        elif section == 'workouts':
+            self.add_workouts(key, value)
+        elif section == 'nutrition':
+            self.add_nutrition(value)
+        else:
+            raise ValueError(f"未知的数据部分: {section}")
+
+    def add_day(self, day: Dict[str, Any]) -> None:
+        """写入FitnessDataGenerator.iter_days()产出的一天数据"""
+        for item in self.formatter.format_day(day):
+            self.add_formatted(*item)
+
+    def add_table(self, table) -> None:
+        """直接从DayTable的列数据写入一段日期的记录"""
+        for item in table.format_items(self.formatter):
+            self.add_formatted(*item)
+
+    def _close_section(self, section: str, target: TextIO) -> None:
+        closing = ']' if section != 'workouts' else '}'
+        if self.counts[section]:
+            target.write(self.formatter.newline(2))
+        target.write(closing)
+
+    def close(self, user_settings: Dict[str, Any]) -> Dict[str, Any]:
+        """拼接各部分并写出userSettings，返回统计信息"""
+        if self._closed:
+            raise RuntimeError("写入器已关闭")
+        self._closed = True
+
+        f, fmt = self.f, self.formatter
+        self._close_section('weights', f)
+        for section in SECTIONS[1:]:
+            spool = self._spools[section]
+            f.write(',' + fmt.newline(2) + fmt.key(section) + ('{' if section == 'workouts' else '['))
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            spool.close()
+            self._close_section(section, f)
+        f.write(',' + fmt.newline(2) + fmt.key('userSettings') + fmt.dumps(user_settings, 2))
+        f.write(fmt.newline(1) + '}')
+        f.write(fmt.newline(0) + '}')
+
+        return {
+            "counts": dict(self.counts),
+            "workoutItems": self.workout_items,
+            "mealItems": self.meal_items,
+            "firstDate": self.first_date,
+            "lastDate": self.last_date
+        }
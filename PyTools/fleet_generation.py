@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+批量用户数据生成
+使用进程池为大量虚拟用户生成演示数据，按用户或按进程分片写出，并生成清单文件(manifest.json)
+"""
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from compressed_io import COMPRESSION_EXTENSIONS, open_output
+from generate_demo_data_final import FitnessDataGenerator
+from run_metrics import RunMetrics, timed
+
+MANIFEST_NAME = "manifest.json"
+
+
+def make_user_profile(seed: int, user_index: int, english_names: bool = False) -> Dict[str, Any]:
+    """根据种子和用户序号确定性地生成用户画像(初始体重、初始体脂率和用户设置)"""
+    rng = random.Random(f"{seed}:profile:{user_index}")
+    gender = rng.choice(["male", "female"])
+    if gender == "male":
+        height = rng.randint(160, 195)
+        initial_body_fat = round(rng.uniform(10.0, 28.0), 1)
+    else:
+        height = rng.randint(150, 182)
+        initial_body_fat = round(rng.uniform(16.0, 34.0), 1)
+    # 以BMI 19-30反推初始体重，并限制在生成器的合理范围内
+    bmi = rng.uniform(19.0, 30.0)
+    initial_weight = round(max(50.0, min(100.0, bmi * (height / 100) ** 2)), 1)
+
+    name = f"User {user_index:06d}" if english_names else f"用户{user_index:06d}"
+    return {
+        "initial_weight": initial_weight,
+        "initial_body_fat": initial_body_fat,
+        "user_settings": {
+            "name": name,
+            "age": rng.randint(18, 65),
+            "height": height,
+            "gender": gender,
+            "activityLevel": rng.choice(["sedentary", "light", "moderate", "active", "very_active"]),
+            "fitnessGoal": rng.choice(["lose_weight", "maintain", "gain_muscle"])
+        }
+    }
+
+
+def _build_generator(seed: int, user_index: int, days: int, start_date: datetime.datetime,
+                     english_names: bool, backend: str, metrics: Optional[RunMetrics] = None,
+                     stress_profile: Optional[str] = None) -> FitnessDataGenerator:
+    """为指定用户创建生成器"""
+    profile = make_user_profile(seed, user_index, english_names)
+    return FitnessDataGenerator(
+        days=days,
+        start_date=start_date,
+        initial_weight=profile["initial_weight"],
+        initial_body_fat=profile["initial_body_fat"],
+        english_names=english_names,
+        backend=backend,
+        seed=seed,
+        user_id=user_index,
+        user_settings=profile["user_settings"],
+        metrics=metrics,
+        stress_profile=stress_profile
+    )
+
+
+def _record_counts(demo_data: Dict[str, Any]) -> Dict[str, int]:
+    """统计单个用户导出数据中各部分的记录数"""
+    data = demo_data['data']
+    return {
+        "weights": len(data['weights']),
+        "bodyFat": len(data['bodyFat']),
+        "workouts": sum(len(daily) for daily in data['workouts'].values()),
+        "nutrition": len(data['nutrition'])
+    }
+
+
+def _generate_user_range(task: Dict[str, Any]) -> Dict[str, Any]:
+    """进程池任务：生成一段连续用户的数据并写出分片，返回分片信息和本进程的运行指标"""
+    output_dir = task["output_dir"]
+    metrics = RunMetrics() if task["metrics"] else None
+    shards = []
+
+    def validate(generator: FitnessDataGenerator, demo_data: Dict[str, Any]) -> bool:
+        # 批量模式下屏蔽逐用户的验证输出
+        with contextlib.redirect_stdout(io.StringIO()), timed(metrics, 'validation'):
+            return generator.validate_export_data(demo_data)
+
+    # 各进程已经并行，压缩不再使用多线程
+    extension = COMPRESSION_EXTENSIONS[task["compression"]] if task["compression"] else ''
+
+    def open_shard(file_name: str):
+        return open_output(os.path.join(output_dir, file_name), 'w', compression=task["compression"],
+                           level=task["compress_level"], threads=1)
+
+    if task["shard_by"] == "worker":
+        file_name = f"shard_{task['shard_index']:05d}.jsonl{extension}"
+        counts = {"weights": 0, "bodyFat": 0, "workouts": 0, "nutrition": 0}
+        invalid_users = []
+        with open_shard(file_name) as f:
+            for user_index in range(task["first_user"], task["last_user"]):
+                generator = _build_generator(task["seed"], user_index, task["days"], task["start_date"],
+                                             task["english_names"], task["backend"], metrics,
+                                             task["stress_profile"])
+                demo_data = generator.generate_demo_data()
+                if task["validate"] and not validate(generator, demo_data):
+                    invalid_users.append(user_index)
+                with timed(metrics, 'serialization'):
+                    line = json.dumps(demo_data, ensure_ascii=False, separators=(',', ':'))
+                with timed(metrics, 'write'):
+                    f.write(line)
+                    f.write('\n')
+                for section, count in _record_counts(demo_data).items():
+                    counts[section] += count
+        shards.append({
+            "file": file_name,
+            "users": [task["first_user"], task["last_user"]],
+            "records": counts,
+            "bytes": os.path.getsize(os.path.join(output_dir, file_name)),
+            "invalidUsers": invalid_users
+        })
+    else:
+        for user_index in range(task["first_user"], task["last_user"]):
+            generator = _build_generator(task["seed"], user_index, task["days"], task["start_date"],
+                                         task["english_names"], task["backend"], metrics,
+                                         task["stress_profile"])
+            demo_data = generator.generate_demo_data()
+            file_name = f"user_{user_index:06d}.json{extension}"
+            with timed(metrics, 'serialization'):
+                text = json.dumps(demo_data, indent=2, ensure_ascii=False)
+            with timed(metrics, 'write'):
+                with open_shard(file_name) as f:
+                    f.write(text)
+            shards.append({
+                "file": file_name,
+                "users": [user_index, user_index + 1],
+                "records": _record_counts(demo_data),
+                "bytes": os.path.getsize(os.path.join(output_dir, file_name)),
+                "invalidUsers": [user_index] if task["validate"] and not validate(generator, demo_data) else []
+            })
+
+    return {"shards": shards, "metrics": metrics.to_dict() if metrics is not None else None}
+
+
+def _split_users(users: int, parts: int) -> List[range]:
+    """将用户序号均匀切分为若干连续区间"""
+    base, extra = divmod(users, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        size = base + (1 if i < extra else 0)
+        if size:
+            ranges.append(range(start, start + size))
+        start += size
+    return ranges
+
+
+def generate_fleet(users: int, days: int, output_dir: str, workers: Optional[int] = None,
+                   seed: Optional[int] = None, start_date: Optional[datetime.datetime] = None,
+                   shard_by: str = 'worker', english_names: bool = False, backend: str = 'auto',
+                   validate: bool = False, metrics: Optional[RunMetrics] = None,
+                   stress_profile: Optional[str] = None, compression: Optional[str] = None,
+                   compress_level: Optional[int] = None) -> int:
+    """
+    使用进程池批量生成多个用户的数据
+
+    每个用户的数据只由(seed, 用户序号, 开始日期)决定，与进程数和调度顺序无关，
+    因此相同种子和开始日期下的输出是确定的。
+    传入metrics时各进程分别计时，合并后的阶段耗时为所有进程之和。
+    compression为gzip/xz/bz2时每个分片压缩写出，文件名带对应的扩展名。
+
+    Returns:
+        进程退出码(0表示成功)
+    """
+    workers = workers or os.cpu_count() or 1
+    if seed is None:
+        # 未指定种子时随机选取，并记录到清单中以便复现
+        seed = random.randrange(2 ** 32)
+    if start_date is None:
+        # 所有用户共用同一条日期轴，截止到今天
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        start_date = today - datetime.timedelta(days=days - 1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"正在为 {users} 个用户生成 {days} 天的健身演示数据...")
+    print(f"进程数: {workers}, 分片方式: {shard_by}, 随机种子: {seed}"
+          + (f", 压缩: {compression}" if compression else ""))
+
+    # 按进程分片时每个进程一个分片；按用户分片时切成更小的任务以均衡负载
+    parts = workers if shard_by == 'worker' else min(users, workers * 8)
+    tasks = [{
+        "shard_index": i,
+        "first_user": user_range.start,
+        "last_user": user_range.stop,
+        "seed": seed,
+        "days": days,
+        "start_date": start_date,
+        "output_dir": output_dir,
+        "shard_by": shard_by,
+        "english_names": english_names,
+        "backend": backend,
+        "validate": validate,
+        "metrics": metrics is not None,
+        "stress_profile": stress_profile,
+        "compression": compression,
+        "compress_level": compress_level
+    } for i, user_range in enumerate(_split_users(users, min(parts, users)))]
+
+    start_time = time.perf_counter()
+    shards = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_generate_user_range, tasks):
+            shards.extend(result["shards"])
+            if metrics is not None:
+                metrics.merge(result["metrics"])
+    elapsed = time.perf_counter() - start_time
+
+    totals = {"weights": 0, "bodyFat": 0, "workouts": 0, "nutrition": 0}
+    for shard in shards:
+        for section, count in shard["records"].items():
+            totals[section] += count
+    invalid_users = [user for shard in shards for user in shard["invalidUsers"]]
+    if metrics is not None:
+        metrics.records += sum(totals.values())
+        metrics.bytes_written += sum(shard["bytes"] for shard in shards)
+
+    manifest = {
+        "version": "1.0",
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "users": users,
+        "days": days,
+        "startDate": start_date.strftime("%Y-%m-%d"),
+        "workers": workers,
+        "shardBy": shard_by,
+        "format": "jsonl" if shard_by == 'worker' else "json",
+        "compression": compression,
+        "englishNames": english_names,
+        "stressProfile": stress_profile,
+        "elapsedSeconds": round(elapsed, 3),
+        "records": totals,
+        "bytes": sum(shard["bytes"] for shard in shards),
+        "shards": shards
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"✓ 已生成 {len(shards)} 个分片，清单已保存到 {os.path.join(output_dir, MANIFEST_NAME)}")
+    print(f"\n数据统计:")
+    print(f"- 体重记录: {totals['weights']} 条")
+    print(f"- 体脂记录: {totals['bodyFat']} 条")
+    print(f"- 训练项目: {totals['workouts']} 个")
+    print(f"- 营养记录: {totals['nutrition']} 天")
+    print(f"- 耗时: {elapsed:.2f} 秒 ({users / max(elapsed, 1e-9):.1f} 用户/秒)")
+
+    if validate:
+        if invalid_users:
+            print(f"✗ {len(invalid_users)} 个用户的数据格式验证失败: {invalid_users[:10]}")
+            return 1
+        print("✓ 所有用户的数据格式验证通过")
+
+    return 0
@@ -1,35 +1,109 @@
 #!/usr/bin/env python3
+import os
 import json
 import random
 import datetime
 import argparse
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Sequence, TextIO, Tuple
+
+from concurrent.futures import ProcessPoolExecutor
+
+from day_table import DayTable
+from export_schema import compile_schema
+from export_writer import SECTIONS, RecordFormatter, StreamingExportWriter
+from fitness_rng import CounterRNG
+from record_types import ExportRecords
+from semantic_checks import check_export_semantics
+from stress_profiles import STRESS_PROFILES, days_for_target, parse_size, resolve_profile
+from compressed_io import COMPRESSION_EXTENSIONS, COMPRESSIONS, compression_from_path, open_output
+from run_metrics import DEFAULT_PROFILE_TOP, RunMetrics, print_metrics, profile_call, timed
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时回退到纯Python实现
+    np = None
+
+def _clamped_cumsum(start: int, steps: "np.ndarray", low: int, high: int) -> "np.ndarray":
+    """计算限幅累加 x[k] = clip(x[k-1] + steps[k], low, high)，x[-1] = start
+    
+    单侧限幅有闭式解(累计最大值修正)，因此按"下界阶段/上界阶段"交替求解，
+    只有在游走从一侧边界穿越到另一侧边界时才需要切换，迭代次数极少。
+    """
+    out = np.empty(len(steps), dtype=np.int64)
+    pos, level, lower_phase = 0, start, True
+    while pos < len(steps):
+        path = level + np.cumsum(steps[pos:])
+        if lower_phase:
+            # 只考虑下界：被抬升的量等于(low - path)的累计最大值
+            clamped = path + np.maximum.accumulate(np.maximum(low - path, 0))
+            violations = np.flatnonzero(clamped > high)
+        else:
+            # 只考虑上界：被压低的量等于(path - high)的累计最大值
+            clamped = path - np.maximum.accumulate(np.maximum(path - high, 0))
+            violations = np.flatnonzero(clamped < low)
+        
+        if violations.size == 0:
+            out[pos:] = clamped
+            break
+        k = violations[0]
+        out[pos:pos + k] = clamped[:k]
+        level = high if lower_phase else low
+        out[pos + k] = level
+        pos += k + 1
+        lower_phase = not lower_phase
+    return out
+
+# iter_days中体重/体脂游走的分块天数
+DAY_BLOCK_SIZE = 4096
 
 # 健身数据生成器
 class FitnessDataGenerator:
     def __init__(self, days: int, start_date: datetime.datetime = None, 
                  initial_weight: float = 70.0, weight_fluctuation: float = 0.5,
                  initial_body_fat: float = 18.0, body_fat_fluctuation: float = 0.3,
-                 english_names: bool = False):
+                 english_names: bool = False, backend: str = 'auto',
+                 seed: Optional[int] = None, user_settings: Optional[Dict[str, Any]] = None,
+                 user_id: int = 0, metrics: Optional[RunMetrics] = None,
+                 stress_profile: Optional[Any] = None):
         """
         初始化生成器
         
         Args:
             days: 要生成的天数
-            start_date: 开始日期(默认为今天)
+            start_date: 开始日期(默认为days-1天前，使数据截止到今天)
             initial_weight: 初始体重(kg)
             weight_fluctuation: 体重波动范围(kg)
             initial_body_fat: 初始体脂率(%)
             body_fat_fluctuation: 体脂率波动范围(%)
             english_names: 是否使用英文名称(默认为False)
+            backend: 随机游走计算后端 - 'auto'(有NumPy时向量化)、'numpy' 或 'python'
+            seed: 随机种子(默认为None，即随机选取一个种子，每次运行结果不同)
+            user_settings: 自定义用户设置(默认为内置的演示用户)
+            user_id: 用户序号，与种子一起决定随机数(批量生成时区分不同用户)
+            metrics: 记录各部分生成耗时的RunMetrics(默认为None，不计时)
+            stress_profile: stress_profiles中的压力测试配置名称或配置字典(默认为None，即均匀数据)
         """
+        if backend not in ('auto', 'numpy', 'python'):
+            raise ValueError(f"未知的计算后端: {backend}")
+        if backend == 'numpy' and np is None:
+            raise ValueError("未安装NumPy，无法使用numpy后端")
+        
         self.days = days
-        self.start_date = start_date or datetime.datetime.now()
+        self.start_date = start_date or datetime.datetime.now() - datetime.timedelta(days=days-1)
         self.initial_weight = initial_weight
         self.weight_fluctuation = weight_fluctuation
         self.initial_body_fat = initial_body_fat
         self.body_fat_fluctuation = body_fat_fluctuation
         self.english_names = english_names
+        self._start_ordinal = self.start_date.toordinal()
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.user_id = user_id
+        self.user_settings = user_settings
+        self.metrics = metrics
+        self.stress_profile = resolve_profile(stress_profile)
+        # 每个随机数由(种子, 用户, 日期, 字段)直接计算，与生成顺序无关，也不干扰全局random
+        self.rng = CounterRNG(self.seed, user_id)
+        self.use_numpy = np is not None and backend != 'python'
         
         # 预设的训练项目（中文版）
         self.workout_templates_cn = [
@@ -85,255 +159,284 @@ class FitnessDataGenerator:
         self.workout_templates = self.workout_templates_en if english_names else self.workout_templates_cn
         self.meal_templates = self.meal_templates_en if english_names else self.meal_templates_cn
 
-    def _format_date(self, date: datetime.datetime) -> str:
-        """格式化日期为YYYY-MM-DD格式"""
-        return date.strftime("%Y-%m-%d")
+    def _day_key(self, i: int) -> int:
+        """第i天在随机数中的键(日期序数)，同一日期的随机数与开始日期无关"""
+        return self._start_ordinal + i
     
-    def _format_date_time(self, date: datetime.datetime) -> str:
-        """格式化日期时间为ISO格式"""
-        return date.isoformat()
+    def _walk_params(self, walk: str) -> tuple:
+        """随机游走参数: (初始值, 波动范围, 下降趋势, 上升趋势, 下限, 上限)"""
+        if walk == 'weight':
+            # 60%概率增重(+0.02)，40%概率减重(-0.05)，叠加随机波动
+            return self.initial_weight, self.weight_fluctuation, -0.05, 0.02, 50, 100
+        # 体脂率通常变化比体重更小
+        return self.initial_body_fat, self.body_fat_fluctuation, -0.03, 0.01, 5, 35
     
-    def generate_weight_data(self) -> List[Dict[str, Any]]:
-        """生成体重数据"""
-        weights = []
-        current_weight = self.initial_weight
+    def _random_walk(self, walk: str, first_day: int, count: int, state: Optional[int] = None) -> List[int]:
+        """
+        从第first_day天开始生成count步限幅随机游走，数值以0.1为单位的整数表示
         
-        for i in range(self.days):
-            # 从今天往前推算日期，i=0时是今天，i=days-1时是最早的日期
-            date = datetime.datetime.now() - datetime.timedelta(days=self.days-i-1)
+        state为前一天的值(0.1为单位)；从第0天开始时为None，此时以未舍入的初始值为基准。
+        逐步舍入等价于对舍入后的步长做整数累加，两个计算后端的结果逐位一致。
+        """
+        if self.use_numpy:
+            return self._random_walk_numpy(walk, first_day, count, state)
+        
+        initial, fluctuation, down_trend, up_trend, low, high = self._walk_params(walk)
+        low_t, high_t = int(round(low * 10)), int(round(high * 10))
+        values = []
+        for i in range(first_day, first_day + count):
+            day = self._day_key(i)
             # 添加一些随机波动，但保持总体趋势
-            trend_factor = -0.05 if random.random() > 0.6 else 0.02  # 60%概率减重，40%概率增重
-            current_weight += trend_factor + random.uniform(-self.weight_fluctuation, self.weight_fluctuation)
-            current_weight = round(max(50, min(100, current_weight)), 1)  # 确保体重在合理范围内
-            
-            # 并非每天都有记录
-            if random.random() > 0:  # 100%概率有记录
-                weights.append({
-                    "date": self._format_date(date),
-                    "weight": current_weight
-                })
+            trend_factor = down_trend if self.rng.random(day, f"{walk}.trend") > 0.6 else up_trend  # 40%概率下降，60%概率上升
+            step = (trend_factor + self.rng.uniform(day, f"{walk}.noise", -fluctuation, fluctuation)) * 10
+            if state is None:
+                state = round(min(max(initial * 10 + step, low_t), high_t))
+            else:
+                state = min(max(state + round(step), low_t), high_t)  # 确保数值在合理范围内
+            values.append(state)
+        return values
+    
+    def _random_walk_numpy(self, walk: str, first_day: int, count: int, state: Optional[int] = None) -> List[int]:
+        """_random_walk的向量化实现"""
+        if count <= 0:
+            return []
+        initial, fluctuation, down_trend, up_trend, low, high = self._walk_params(walk)
+        days = np.arange(self._day_key(first_day), self._day_key(first_day + count), dtype=np.int64)
+        trend = np.where(self.rng.random_array(days, f"{walk}.trend") > 0.6, down_trend, up_trend)
+        raw_steps = (trend + self.rng.uniform_array(days, f"{walk}.noise", -fluctuation, fluctuation)) * 10
         
-        return weights
+        low_t, high_t = int(round(low * 10)), int(round(high * 10))
+        tenths = np.empty(count, dtype=np.int64)
+        if state is None:
+            tenths[0] = int(np.rint(min(max(initial * 10 + raw_steps[0], low_t), high_t)))
+        else:
+            tenths[0] = min(max(state + int(np.rint(raw_steps[0])), low_t), high_t)
+        tenths[1:] = _clamped_cumsum(int(tenths[0]), np.rint(raw_steps[1:]).astype(np.int64), low_t, high_t)
+        return tenths.tolist()
     
-    def generate_body_fat_data(self) -> List[Dict[str, Any]]:
-        """生成体脂数据"""
-        body_fat_records = []
-        current_body_fat = self.initial_body_fat
+    def _walk_state_before(self, walk: str, i: int, block_size: int = DAY_BLOCK_SIZE) -> Optional[int]:
+        """第i天之前(第i-1天)的游走状态，只计算游走本身而不生成记录"""
+        state = None
+        for block_start in range(0, i, block_size):
+            state = self._random_walk(walk, block_start, min(block_size, i - block_start), state)[-1]
+        return state
+    
+    def build_day_table(self, start: int = 0, stop: Optional[int] = None,
+                        sections: Sequence[str] = SECTIONS,
+                        walk_states: Optional[Tuple[Optional[int], Optional[int]]] = None) -> DayTable:
+        """
+        生成第start到第stop-1天的列式数据表
         
-        for i in range(self.days):
-            # 从今天往前推算日期，i=0时是今天，i=days-1时是最早的日期
-            date = datetime.datetime.now() - datetime.timedelta(days=self.days-i-1)
-            # 添加随机波动，体脂率通常变化比体重更小
-            trend_factor = -0.03 if random.random() > 0.6 else 0.01  # 60%概率减脂，40%概率增脂
-            current_body_fat += trend_factor + random.uniform(-self.body_fat_fluctuation, self.body_fat_fluctuation)
-            current_body_fat = round(max(5, min(35, current_body_fat)), 1)  # 确保体脂率在合理范围内
-            
-            # 体脂率测量通常不是每天进行的
-            if random.random() > 0:  # 100%概率有记录
-                body_fat_records.append({
-                    "date": self._format_date(date),
-                    "bodyFatPercentage": current_body_fat
-                })
+        日期轴只计算一次，各项数值直接写入DayTable的列中，不构造字典。
+        sections为需要填充的部分，未列出的部分保持为空。
+        walk_states为第start天之前的(体重, 体脂)游走状态，默认从第0天开始计算。
+        """
+        stop = self.days if stop is None else min(stop, self.days)
+        count = max(stop - start, 0)
+        table = DayTable(self.start_date, start, count, self.workout_templates, self.meal_templates)
+        first_day = self._day_key(start)
+        days = range(first_day, first_day + count)
         
-        return body_fat_records
+        for section, walk, index in (('weights', 'weight', 0), ('bodyFat', 'bodyFat', 1)):
+            if section not in sections:
+                continue
+            with timed(self.metrics, section):
+                state = walk_states[index] if walk_states is not None else self._walk_state_before(walk, start)
+                series = self._random_walk(walk, start, count, state)
+                # 并非每天都有记录
+                threshold = 1 - self.stress_profile["presence"][section]  # 默认100%概率有记录
+                present = [self.rng.random(day, f"{section}.present") > threshold and self._is_active(day)
+                           for day in days]
+                if walk == 'weight':
+                    table.set_walks(weight=series, has_weight=present)
+                else:
+                    table.set_walks(body_fat=series, has_body_fat=present)
+        
+        # 训练和营养记录的随机数互不影响，分别按日期顺序填充
+        with timed(self.metrics, 'workouts'):
+            if 'workouts' in sections:
+                for day in days:
+                    self._fill_daily_workouts(table, day)
+            else:
+                for _ in days:
+                    table.append_workouts((), ())
+        with timed(self.metrics, 'nutrition'):
+            if 'nutrition' in sections:
+                threshold = 1 - self.stress_profile["presence"]["nutrition"]  # 默认每天都有营养记录
+                for k, day in enumerate(days):
+                    if self._is_active(day) and (threshold <= 0
+                                                 or self.rng.random(day, "nutrition.present") > threshold):
+                        self._fill_daily_nutrition(table, k, day)
+                    else:
+                        table.skip_nutrition()
+            else:
+                for _ in days:
+                    table.skip_nutrition()
+        return table
     
-    def generate_workout_data(self) -> Dict[str, List[Dict[str, Any]]]:
-        """生成训练数据"""
-        workout_data = {}
+    def _is_active(self, day: int) -> bool:
+        """压力测试配置中整周没有记录的日期返回False(day为日期序数，周从星期一开始)"""
+        rate = self.stress_profile["inactive_week_rate"]
+        return rate <= 0 or self.rng.random(day - (day - 1) % 7, "stress.inactiveWeek") >= rate
+    
+    def _fill_daily_workouts(self, table: DayTable, day: int) -> None:
+        """向数据表追加一天的训练项目(day为日期序数)"""
+        templates, completed = [], []
+        profile = self.stress_profile
+        presence = profile["presence"]["workouts"]
+        if profile["weekday_activity"] is not None:
+            presence *= profile["weekday_activity"][(day - 1) % 7]
+        
+        # 一周中某些天可能没有训练
+        if self.rng.random(day, "workouts.present") > 1 - presence and self._is_active(day):  # 默认100%概率有训练
+            # 每天1-4个训练项目
+            low, high = profile["workouts_per_day"]
+            workout_count = self.rng.randint(day, "workouts.count", low, min(high, len(self.workout_templates)))
+            templates = self.rng.sample(day, "workouts.pick", range(len(self.workout_templates)), workout_count)
+            # 完成状态只由日期和训练项目决定，同一天的同一练习具有相同的完成状态
+            completed = [self.rng.random(day, "workouts.completed", template_index) > 0.4  # 60%概率已完成
+                         for template_index in templates]
+        
+        table.append_workouts(templates, completed)
+    
+    def _fill_daily_nutrition(self, table: DayTable, k: int, day: int) -> None:
+        """向数据表追加第k行的营养记录 - 完全符合Flutter应用MealEntry导入要求的格式"""
+        # 决定每天记录的餐食数量（1-4，确保每天至少有一些数据）
+        profile = self.stress_profile
+        low, high = profile["meals_per_day"] or (1, len(self.meal_templates))
+        if profile["burst_rate"] > 0 and self.rng.random(day, "nutrition.burst") < profile["burst_rate"]:
+            low, high = profile["burst_meals"]
+        meal_count = self.rng.randint(day, "nutrition.mealCount", low, high)
         
-        for i in range(self.days):
-            # 从今天往前推算日期，i=0时是今天，i=days-1时是最早的日期
-            date = datetime.datetime.now() - datetime.timedelta(days=self.days-i-1)
-            date_key = self._format_date(date)
+        meals = []
+        # 选择餐食并添加一些随机性；餐数超过模板数时，其余各餐重复使用随机选取的模板
+        template_count = len(self.meal_templates)
+        selected = self.rng.sample(day, "nutrition.pick", range(template_count), min(meal_count, template_count))
+        selected = [(template_index, template_index) for template_index in selected]
+        selected += [(template_count + j, self.rng.randint(day, "nutrition.extra", 0, template_count - 1, j))
+                     for j in range(meal_count - template_count)]
+        for variation_index, template_index in selected:
+            meal = self.meal_templates[template_index]
+            # 为每餐添加一些随机变化（±20%）
+            calories_variation = self.rng.uniform(day, "nutrition.variation", 0.8, 1.2, variation_index)
+            actual_calories = int(meal["calories"] * calories_variation)
             
-            # 一周中某些天可能没有训练
-            if random.random() > 0:  # 100%概率有训练
-                # 每天1-4个训练项目
-                daily_workouts = []
-                workout_count = random.randint(1, 4)
-                selected_workouts = random.sample(self.workout_templates, workout_count)
-                
-                for workout in selected_workouts:
-                    # 根据日期和名称创建一个稳定的随机种子，以确保同一天的同一练习具有相同的完成状态
-                    random.seed(f"{date_key}_{workout['name']}")
-                    is_completed = random.random() > 0.4  # 60%概率已完成
-                    random.seed()  # 重置随机种子
-                    
-                    daily_workouts.append({
-                        "date": self._format_date_time(date),
-                        "name": workout["name"],
-                        "sets": workout["sets"],
-                        "isCompleted": is_completed
-                    })
-                
-                if daily_workouts:
-                    workout_data[date_key] = daily_workouts
+            # 为每个食物创建单独的meal条目，完全符合Flutter MealEntry格式
+            # Flutter导入时会为每个foods项目创建一个独立的MealEntry
+            food_count = len(meal["foods"])
+            for food_index in range(food_count):
+                # 为每个食物分配合理的热量比例
+                food_calories = actual_calories // food_count
+                # 如果是最后一个食物，加上剩余的热量
+                if food_index == food_count - 1:
+                    food_calories += actual_calories % food_count
+                meals.append((template_index, food_index, food_calories))
         
-        return workout_data
+        # 生成合理的卡路里消耗和目标
+        calorie_burned = self.rng.randint(day, "nutrition.burned", 300, 600)  # 更合理的消耗范围
+        calorie_goal = self.rng.randint(day, "nutrition.goal", 1800, 2200)
+        
+        table.append_nutrition(k, meals, calorie_burned, calorie_goal)
+    
+    def generate_weight_data(self) -> List[Dict[str, Any]]:
+        """生成体重数据"""
+        return self.build_day_table(sections=('weights',)).weight_records()
+    
+    def generate_body_fat_data(self) -> List[Dict[str, Any]]:
+        """生成体脂数据"""
+        return self.build_day_table(sections=('bodyFat',)).body_fat_records()
+    
+    def generate_workout_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """生成训练数据"""
+        return self.build_day_table(sections=('workouts',)).workout_map()
     
     def generate_nutrition_data(self) -> List[Dict[str, Any]]:
         """生成营养数据 - 完全符合Flutter应用MealEntry导入要求的格式"""
-        nutrition_data = []
+        return self.build_day_table(sections=('nutrition',)).nutrition_records()
+    
+    def iter_tables(self, start: int = 0, stop: Optional[int] = None,
+                    block_size: int = DAY_BLOCK_SIZE,
+                    walk_states: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Iterator[DayTable]:
+        """
+        按block_size天分块产出第start到第stop-1天的数据表，内存占用与总天数无关
         
-        for i in range(self.days):
-            # 从今天往前推算日期，i=0时是今天，i=days-1时是最早的日期
-            date = datetime.datetime.now() - datetime.timedelta(days=self.days-i-1)
-            
-            # 决定每天记录的餐食数量（1-4，确保每天至少有一些数据）
-            meal_count = random.randint(1, len(self.meal_templates))
-            
-            daily_meals = []
-            total_calories = 0
-            
-            # 选择餐食并添加一些随机性
-            selected_meals = random.sample(self.meal_templates, meal_count)
-            for meal in selected_meals:
-                # 为每餐添加一些随机变化（±20%）
-                calories_variation = random.uniform(0.8, 1.2)
-                actual_calories = int(meal["calories"] * calories_variation)
-                
-                # 为每个食物创建单独的meal条目，完全符合Flutter MealEntry格式
-                # Flutter导入时会为每个foods项目创建一个独立的MealEntry
-                for food in meal["foods"]:
-                    # 为每个食物分配合理的热量比例
-                    food_calories = actual_calories // len(meal["foods"])
-                    # 如果是最后一个食物，加上剩余的热量
-                    if food == meal["foods"][-1]:
-                        food_calories += actual_calories % len(meal["foods"])
-                    
-                    # 关键修改：每个food条目生成单独的meal记录
-                    # Flutter导入逻辑会为每个foods列表项创建一个MealEntry
-                    daily_meals.append({
-                        "name": meal["name"],  # 餐食类型（早餐、午餐等） -> mealType
-                        "foods": [food],       # 单个食物数组 -> name (取第一个)
-                        "calories": food_calories  # 该食物的热量 -> calories
-                        # amount 和 timestamp 将由导入逻辑自动填充
-                    })
-                    total_calories += food_calories
-            
-            # 生成合理的卡路里消耗和目标
-            calorie_burned = random.randint(300, 600)  # 更合理的消耗范围
-            calorie_goal = random.randint(1800, 2200)
-            
-            nutrition_entry = {
-                "date": self._format_date(date),
-                "calorieIntake": total_calories,
-                "caloriesBurned": calorie_burned,
-                "calorieGoal": calorie_goal,
-                "meals": daily_meals
-            }
-            
-            nutrition_data.append(nutrition_entry)
+        从中间某天开始时，先只计算之前的游走状态；训练和营养记录与其他日期无关。
+        任意区间的结果与完整生成时对应日期的结果完全一致。
+        walk_states为第start天之前的(体重, 体脂)游走状态(0.1为单位)，用于接续已有数据。
+        """
+        stop = self.days if stop is None else min(stop, self.days)
+        if walk_states is None:
+            walk_states = (self._walk_state_before('weight', start, block_size),
+                           self._walk_state_before('bodyFat', start, block_size))
         
-        return nutrition_data
+        for block_start in range(start, stop, block_size):
+            table = self.build_day_table(block_start, min(block_start + block_size, stop), walk_states=walk_states)
+            walk_states = (table.weight[-1], table.body_fat[-1])
+            yield table
+    
+    def iter_days(self, start: int = 0, stop: Optional[int] = None,
+                  block_size: int = DAY_BLOCK_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        按天惰性生成第start到第stop-1天的数据，每次产出一天的全部记录
+        
+        Yields:
+            {"date": 日期, "weight": 体重记录或None, "bodyFat": 体脂记录或None,
+             "workouts": 当天训练项目列表, "nutrition": 营养记录或None}
+        """
+        for table in self.iter_tables(start, stop, block_size):
+            yield from table.iter_days()
+    
+    def generate_day(self, i: int) -> Dict[str, Any]:
+        """直接生成第i天的数据，无需生成之前各天的记录"""
+        if not 0 <= i < self.days:
+            raise IndexError(f"天数序号超出范围: {i}")
+        return next(self.iter_days(i, i + 1))
+    
+    def write_demo_data(self, f: TextIO, indent: Optional[int] = 2, workers: Optional[int] = None,
+                        chunk_days: int = DAY_BLOCK_SIZE) -> Dict[str, Any]:
+        """
+        以流式方式把完整演示数据写入文件，内存占用与天数无关
+        
+        记录直接从DayTable的列数据序列化，不构造中间字典。
+        indent=2 时输出格式与 json.dump(generate_demo_data(), f, indent=2, ensure_ascii=False) 逐字节一致。
+        workers大于1时按chunk_days天的日期区间在进程池中并行生成和序列化，输出与串行时完全一致。
+        
+        Returns:
+            写出的统计信息(各部分记录数和日期范围)
+        """
+        writer = StreamingExportWriter(f, indent=indent)
+        if workers and workers > 1 and self.days > chunk_days:
+            ranges = [(self, start, min(start + chunk_days, self.days), indent)
+                      for start in range(0, self.days, chunk_days)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for items in executor.map(_format_day_range, ranges):
+                    for item in items:
+                        writer.add_formatted(*item)
+        elif self.metrics is not None:
+            # 分别统计序列化和写出的耗时
+            for table in self.iter_tables(block_size=chunk_days):
+                with self.metrics.phase('serialization'):
+                    items = list(table.format_items(writer.formatter))
+                with self.metrics.phase('write'):
+                    for item in items:
+                        writer.add_formatted(*item)
+        else:
+            for table in self.iter_tables(block_size=chunk_days):
+                writer.add_table(table)
+        with timed(self.metrics, 'write'):
+            return writer.close(self._build_user_settings())
     
     def validate_export_data(self, export_data: Dict[str, Any]) -> bool:
-        """验证导出数据的格式是否正确"""
+        """
+        验证导出数据的格式是否正确(使用export_schema中编译好的检查函数)
+        
+        格式正确时再做语义检查(semantic_checks)：日期唯一且递增、热量之和、训练日期与取值范围。
+        """
         try:
-            # 检查必要的顶级字段
-            if not all(key in export_data for key in ['version', 'exportDate', 'data']):
-                print("错误: 缺少必要的顶级字段")
-                return False
-            
-            data = export_data['data']
-            if not isinstance(data, dict):
-                print("错误: data字段必须是字典")
-                return False
-            
-            # 检查数据部分的必要字段
-            required_fields = ['weights', 'bodyFat', 'workouts', 'nutrition', 'userSettings']
-            if not all(field in data for field in required_fields):
-                print(f"错误: data部分缺少必要字段: {required_fields}")
-                return False
-            
-            # 验证体重数据
-            weights = data['weights']
-            if not isinstance(weights, list):
-                print("错误: weights必须是列表")
-                return False
-            
-            for weight in weights:
-                if not all(key in weight for key in ['date', 'weight']):
-                    print("错误: weight记录缺少必要字段")
-                    return False
-                if not isinstance(weight['weight'], (int, float)):
-                    print("错误: weight值必须是数字")
-                    return False
-            
-            # 验证体脂数据
-            body_fat = data['bodyFat']
-            if not isinstance(body_fat, list):
-                print("错误: bodyFat必须是列表")
-                return False
-            
-            for bf in body_fat:
-                if not all(key in bf for key in ['date', 'bodyFatPercentage']):
-                    print("错误: bodyFat记录缺少必要字段")
-                    return False
-                if not isinstance(bf['bodyFatPercentage'], (int, float)):
-                    print("错误: bodyFatPercentage值必须是数字")
-                    return False
-            
-            # 验证训练数据
-            workouts = data['workouts']
-            if not isinstance(workouts, dict):
-                print("错误: workouts必须是字典")
-                return False
-            
-            for date_key, daily_workouts in workouts.items():
-                if not isinstance(daily_workouts, list):
-                    print(f"错误: {date_key}的训练记录必须是列表")
-                    return False
-                
-                for workout in daily_workouts:
-                    required_workout_fields = ['date', 'name', 'sets', 'isCompleted']
-                    if not all(key in workout for key in required_workout_fields):
-                        print(f"错误: 训练记录缺少必要字段: {required_workout_fields}")
-                        return False
-                    if not isinstance(workout['sets'], int):
-                        print("错误: sets值必须是整数")
-                        return False
-                    if not isinstance(workout['isCompleted'], bool):
-                        print("错误: isCompleted值必须是布尔值")
-                        return False
-            
-            # 验证营养数据
-            nutrition = data['nutrition']
-            if not isinstance(nutrition, list):
-                print("错误: nutrition必须是列表")
-                return False
-            
-            for entry in nutrition:
-                required_nutrition_fields = ['date', 'calorieIntake', 'caloriesBurned', 'calorieGoal', 'meals']
-                if not all(key in entry for key in required_nutrition_fields):
-                    print(f"错误: 营养记录缺少必要字段: {required_nutrition_fields}")
-                    return False
-                
-                for field in ['calorieIntake', 'caloriesBurned', 'calorieGoal']:
-                    if not isinstance(entry[field], (int, float)):
-                        print(f"错误: {field}值必须是数字")
-                        return False
-                
-                if not isinstance(entry['meals'], list):
-                    print("错误: meals必须是列表")
-                    return False
-                
-                for meal in entry['meals']:
-                    required_meal_fields = ['name', 'foods', 'calories']
-                    if not all(key in meal for key in required_meal_fields):
-                        print(f"错误: meal记录缺少必要字段: {required_meal_fields}")
-                        return False
-                    if not isinstance(meal['foods'], list):
-                        print("错误: foods必须是列表")
-                        return False
-                    if not isinstance(meal['calories'], (int, float)):
-                        print("错误: calories值必须是数字")
-                        return False
-            
-            # 验证用户设置
-            user_settings = data['userSettings']
-            if not isinstance(user_settings, dict):
-                print("错误: userSettings必须是字典")
+            errors = compile_schema(fail_fast=True).validate(export_data) or check_export_semantics(export_data)
+            if errors:
+                for error in errors:
+                    print(error)
                 return False
             
             print("✓ 数据验证通过")
@@ -343,17 +446,12 @@ class FitnessDataGenerator:
             print(f"验证过程中出错: {e}")
             return False
     
-    def generate_demo_data(self) -> Dict[str, Any]:
-        """生成完整的演示数据"""
-        # 生成各类数据
-        weights = self.generate_weight_data()
-        body_fat = self.generate_body_fat_data()
-        workouts = self.generate_workout_data()
-        nutrition = self.generate_nutrition_data()
-        
-        # 用户设置（基本信息）
-        if self.english_names:
-            user_settings = {
+    def _build_user_settings(self) -> Dict[str, Any]:
+        """用户设置（基本信息）"""
+        if self.user_settings is not None:
+            return dict(self.user_settings)
+        elif self.english_names:
+            return {
                 "name": "Demo User",
                 "age": 25,
                 "height": 175,
@@ -362,7 +460,7 @@ class FitnessDataGenerator:
                 "fitnessGoal": "lose_weight"
             }
         else:
-            user_settings = {
+            return {
                 "name": "演示用户",
                 "age": 25,
                 "height": 175,
@@ -370,6 +468,23 @@ class FitnessDataGenerator:
                 "activityLevel": "moderate",
                 "fitnessGoal": "lose_weight"
             }
+    
+    def generate_demo_data(self) -> Dict[str, Any]:
+        """生成完整的演示数据"""
+        # 生成各类数据(所有部分共用同一张数据表)
+        table = self.build_day_table()
+        metrics = self.metrics
+        with timed(metrics, 'weights'):
+            weights = table.weight_records()
+        with timed(metrics, 'bodyFat'):
+            body_fat = table.body_fat_records()
+        with timed(metrics, 'workouts'):
+            workouts = table.workout_map()
+        with timed(metrics, 'nutrition'):
+            nutrition = table.nutrition_records()
+        
+        # 用户设置（基本信息）
+        user_settings = self._build_user_settings()
         
         # 组装完整的导出数据结构
         export_data = {
@@ -385,17 +500,315 @@ class FitnessDataGenerator:
         }
         
         return export_data
+    
+    def generate_records(self) -> ExportRecords:
+        """
+        生成完整的演示数据，记录保存为record_types中的紧凑记录对象
+        
+        与generate_demo_data()内容相同，但每条记录不再是独立的字典，模板字符串和日期在记录间共享，
+        在内存中保留大量天数的数据时占用小得多；ExportRecords.write()直接从记录对象写出，
+        indent=2时与json.dump(generate_demo_data(), f, indent=2, ensure_ascii=False)逐字节一致。
+        """
+        table = self.build_day_table()
+        with timed(self.metrics, 'records'):
+            return ExportRecords.from_table(table, "1.0", datetime.datetime.now().isoformat(),
+                                            self._build_user_settings())
+
+def _format_day_range(task: tuple) -> List[tuple]:
+    """进程池任务：生成并序列化一段日期区间的记录"""
+    generator, start, stop, indent = task
+    table = generator.build_day_table(start, stop)
+    return list(table.format_items(RecordFormatter(indent)))
+
+def _generate_streaming(generator: FitnessDataGenerator, args: argparse.Namespace) -> int:
+    """流式模式：逐天生成并增量写出，不在内存中保留完整数据"""
+    with open_output(args.output, 'w', level=args.compress_level, threads=args.compress_threads) as f:
+        stats = generator.write_demo_data(f, workers=args.workers)
+    
+    metrics = generator.metrics
+    if metrics is not None:
+        counts = stats['counts']
+        metrics.records += counts['weights'] + counts['bodyFat'] + stats['workoutItems'] + counts['nutrition']
+        metrics.bytes_written += os.path.getsize(args.output)
+    
+    print(f"✓ 数据已保存到 {args.output}")
+    
+    counts = stats['counts']
+    print(f"\n数据统计:")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
+    if stats['firstDate']:
+        print(f"- 数据日期范围: {stats['firstDate']} 到 {stats['lastDate']}")
+    
+    # 流式模式下内存中没有完整数据，直接验证写出的文件
+    if args.validate:
+        from validate_data_format import validate_flutter_import_format_streaming
+        print(f"\n正在验证数据格式...")
+        with timed(metrics, 'validation'):
+            valid = validate_flutter_import_format_streaming(args.output)
+        if valid:
+            print("✓ 数据格式验证通过，可以导入应用")
+        else:
+            print("✗ 数据格式验证失败")
+            return 1
+    
+    print(f"\n演示数据生成完成！")
+    print(f"可以使用 '{args.output}' 文件在应用中测试数据导入功能。")
+    
+    return 0
+
+def _generate_compact(generator: FitnessDataGenerator, args: argparse.Namespace) -> int:
+    """紧凑格式：逐天生成并写出NDJSON、二进制或列式文件"""
+    from export_formats import load_export, open_export_writer
+    
+    metrics = generator.metrics
+    # 写入器分别统计编码(serialization)和写出(write)的耗时
+    writer, f = open_export_writer(args.output, args.format, compress_level=args.compress_level,
+                                   compress_threads=args.compress_threads, metrics=metrics)
+    try:
+        for day in generator.iter_days():
+            writer.add_day(day)
+        counts = writer.close(generator._build_user_settings())
+    finally:
+        if f is not None:
+            with timed(metrics, 'write'):
+                f.close()
+    
+    if metrics is not None:
+        # 与JSON和流式模式一致，训练按训练项目计数
+        metrics.records += counts['weights'] + counts['bodyFat'] + writer.workout_items + counts['nutrition']
+        metrics.bytes_written += _path_bytes(args.output)
+    
+    print(f"✓ 数据已保存到 {args.output} ({args.format}格式)")
+    
+    print(f"\n数据统计:")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
+    
+    # 用对应格式的加载函数还原后验证
+    if args.validate:
+        print(f"\n正在验证数据格式...")
+        with timed(metrics, 'validation'):
+            valid = generator.validate_export_data(load_export(args.output, args.format))
+        if valid:
+            print("✓ 数据格式验证通过，可以导入应用")
+        else:
+            print("✗ 数据格式验证失败")
+            return 1
+    
+    print(f"\n演示数据生成完成！")
+    
+    return 0
+
+def _append_to_export(args: argparse.Namespace, metrics: Optional[RunMetrics] = None) -> int:
+    """追加模式：从已有导出文件的末尾状态接续生成args.days天，并写入该文件"""
+    from export_append import append_days
+    from export_formats import load_export
+    
+    print(f"正在向 {args.append_to} 追加 {args.days} 天的数据...")
+    size_before = _path_bytes(args.append_to)
+    try:
+        stats = append_days(
+            args.append_to,
+            args.days,
+            seed=args.seed,
+            english_names=args.english,
+            backend=args.backend,
+            initial_weight=args.initial_weight,
+            initial_body_fat=args.initial_body_fat,
+            metrics=metrics
+        )
+    except ValueError as e:
+        print(f"✗ 追加失败: {e}")
+        return 1
+    
+    counts = stats['counts']
+    if metrics is not None:
+        metrics.records += sum(counts.values())
+        metrics.bytes_written += _path_bytes(args.append_to) - size_before
+    print(f"✓ 已追加 {stats['firstDate']} 到 {stats['lastDate']} 的数据 (原最后日期: {stats['previousLastDate']})")
+    print(f"\n新增记录:")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
+    
+    # 验证需要读取整个文件，耗时与文件大小有关
+    if args.validate:
+        print(f"\n正在验证数据格式...")
+        with timed(metrics, 'validation'):
+            errors = compile_schema().validate(load_export(args.append_to))
+        if errors:
+            for error in errors:
+                print(error)
+            print("✗ 数据格式验证失败")
+            return 1
+        print("✓ 数据格式验证通过，可以导入应用")
+    
+    return 0
+
+def _path_bytes(path: str) -> int:
+    """文件或列式目录的大小"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def _run_mode(args: argparse.Namespace) -> str:
+    if args.append_to:
+        return 'append'
+    if args.users > 1:
+        return 'fleet'
+    if args.format != 'json':
+        return args.format
+    return 'stream' if args.stream else 'json'
 
 def main():
     parser = argparse.ArgumentParser(description='生成健身应用演示数据')
-    parser.add_argument('--days', type=int, default=90, help='生成数据的天数 (默认: 90)')
-    parser.add_argument('--output', type=str, default='fitness_demo_data.json', help='输出文件名 (默认: fitness_demo_data.json)')
+    parser.add_argument('--days', type=int, default=None,
+                        help='生成数据的天数 (默认: 90，或压力测试配置指定的天数)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='输出文件名 (默认: fitness_demo_data.json，其他格式使用对应的扩展名)')
     parser.add_argument('--initial-weight', type=float, default=70.0, help='初始体重 (kg, 默认: 70.0)')
-    parser.add_argument('--initial-body-fat', type=float, default=18.0, help='初始体脂率 (%, 默认: 18.0)')
+    parser.add_argument('--initial-body-fat', type=float, default=18.0, help='初始体脂率 (%%, 默认: 18.0)')
     parser.add_argument('--validate', action='store_true', help='验证生成的数据格式')
     parser.add_argument('--english', action='store_true', help='使用英文名称生成数据')
+    parser.add_argument('--start-date', type=str, default=None,
+                        help='开始日期 YYYY-MM-DD (默认: 使数据截止到今天)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='随机种子，指定后结果可复现；任意一天的数据只由种子和日期决定')
+    parser.add_argument('--users', type=int, default=1, help='批量生成的用户数量，大于1时启用批量模式 (默认: 1)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='批量模式的进程数 (默认: CPU核心数)；流式模式下按日期区间并行生成 (默认: 不并行)')
+    parser.add_argument('--output-dir', type=str, default='fleet_output', help='批量模式的输出目录 (默认: fleet_output)')
+    parser.add_argument('--shard-by', choices=['user', 'worker'], default='worker',
+                        help='批量模式的分片方式: 每个用户一个JSON文件，或每个进程一个JSON Lines文件 (默认: worker)')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式生成并写出，内存占用与天数无关（输出格式不变）')
+    parser.add_argument('--backend', choices=['auto', 'numpy', 'python'], default='auto',
+                        help='随机游走计算后端 (默认: auto，有NumPy时使用向量化实现)')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'binary', 'columnar'], default='json',
+                        help='输出格式: 缩进JSON、按行分隔的JSON、字典编码的二进制文件或列式目录 (默认: json)')
+    parser.add_argument('--compress', choices=COMPRESSIONS, default=None,
+                        help='压缩输出文件并添加对应的扩展名；--output以.gz/.xz/.bz2结尾时也会自动压缩')
+    parser.add_argument('--compress-level', type=int, default=None,
+                        help='压缩级别 (默认: gzip 6, xz 6, bz2 9)')
+    parser.add_argument('--compress-threads', type=int, default=None,
+                        help='并行压缩的线程数，数据按4MB分块独立压缩 (默认: CPU核心数)')
+    parser.add_argument('--append-to', type=str, default=None,
+                        help='向已有的JSON或NDJSON导出文件追加--days天的数据，从文件末尾的体重和体脂率接续')
+    parser.add_argument('--stress-profile', choices=list(STRESS_PROFILES), default=None,
+                        help='压力测试配置: ' + '; '.join(f"{name} - {resolve_profile(name)['description']}"
+                                                         for name in STRESS_PROFILES))
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--target-bytes', type=parse_size, default=None,
+                        help='按输出大小确定天数，支持K/M/G后缀 (按未压缩的缩进JSON计算，如 500M)')
+    target.add_argument('--target-records', type=int, default=None,
+                        help='按记录数(体重、体脂、营养记录和训练项目)确定天数')
+    parser.add_argument('--metrics-out', type=str, default=None,
+                        help='把各阶段耗时、吞吐量、写出字节数和峰值内存保存为JSON文件')
+    parser.add_argument('--profile', action='store_true',
+                        help='记录各阶段耗时，并在cProfile下运行，输出自身耗时最多的函数')
+    parser.add_argument('--profile-out', type=str, default=None,
+                        help='保存cProfile统计数据的文件，可用pstats或snakeviz查看')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_PROFILE_TOP,
+                        help=f'输出的最耗时函数个数 (默认: {DEFAULT_PROFILE_TOP})')
     
     args = parser.parse_args()
+    if args.days is None:
+        args.days = resolve_profile(args.stress_profile)["days"] or 90
+    if not (args.profile or args.metrics_out):
+        return _run(args)
+    
+    metrics = RunMetrics()
+    hotspots = None
+    if args.profile:
+        code, hotspots = profile_call(lambda: _run(args, metrics), args.profile_out, args.profile_top)
+    else:
+        code = _run(args, metrics)
+    
+    summary = metrics.to_dict(
+        mode=_run_mode(args),
+        days=args.days,
+        users=args.users,
+        backend=args.backend,
+        exitCode=code
+    )
+    if hotspots is not None:
+        summary["profile"] = {"statsFile": args.profile_out, "hotspots": hotspots}
+    print_metrics(summary, hotspots)
+    if args.metrics_out:
+        with open(args.metrics_out, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"✓ 运行指标已保存到 {args.metrics_out}")
+    return code
+
+def _run(args: argparse.Namespace, metrics: Optional[RunMetrics] = None) -> int:
+    """按命令行参数执行生成；metrics不为None时记录各阶段耗时"""
+    targeted = args.target_bytes is not None or args.target_records is not None
+    if args.append_to:
+        if args.stress_profile or targeted:
+            print("✗ 追加模式不支持压力测试配置和目标大小")
+            return 1
+        return _append_to_export(args, metrics)
+    if targeted and args.users > 1:
+        print("✗ 批量模式不支持 --target-bytes/--target-records，请用 --days 指定天数")
+        return 1
+    if args.format != 'json' and args.users > 1:
+        print(f"✗ 批量模式不支持 --format {args.format}，分片为JSON Lines(按进程)或JSON(按用户)文件")
+        return 1
+    if args.output is None:
+        from export_formats import FORMAT_EXTENSIONS
+        args.output = 'fitness_demo_data' + FORMAT_EXTENSIONS[args.format]
+    if args.compress and not args.output.endswith(COMPRESSION_EXTENSIONS[args.compress]):
+        args.output += COMPRESSION_EXTENSIONS[args.compress]
+    if args.format == 'columnar' and compression_from_path(args.output):
+        print("✗ 列式格式输出为目录，不支持压缩")
+        return 1
+    start_date = datetime.datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+    
+    if args.users > 1:
+        from fleet_generation import generate_fleet
+        return generate_fleet(
+            users=args.users,
+            days=args.days,
+            output_dir=args.output_dir,
+            workers=args.workers,
+            seed=args.seed,
+            start_date=start_date,
+            shard_by=args.shard_by,
+            english_names=args.english,
+            backend=args.backend,
+            validate=args.validate,
+            metrics=metrics,
+            stress_profile=args.stress_profile,
+            compression=args.compress,
+            compress_level=args.compress_level
+        )
+    
+    if args.stress_profile:
+        print(f"压力测试配置: {args.stress_profile} ({resolve_profile(args.stress_profile)['description']})")
+    if targeted:
+        if args.seed is None:
+            # 估算和生成必须使用同一个种子
+            args.seed = random.randrange(2 ** 32)
+        
+        def make_generator(days: int, start: datetime.datetime) -> FitnessDataGenerator:
+            return FitnessDataGenerator(days=days, start_date=start, initial_weight=args.initial_weight,
+                                        initial_body_fat=args.initial_body_fat, english_names=args.english,
+                                        backend=args.backend, seed=args.seed, stress_profile=args.stress_profile)
+        
+        print("正在计算达到目标大小所需的天数...")
+        with timed(metrics, 'sizing'):
+            args.days, start_date, size, records = days_for_target(make_generator, start_date, args.target_bytes,
+                                                                   args.target_records)
+        reached = records >= args.target_records if args.target_records is not None else size >= args.target_bytes
+        volume = f"{records} 条记录" if size is None else f"{size} 字节(缩进JSON), {records} 条记录"
+        print(f"{'✓' if reached else '⚠ 在日期上限内无法达到目标，'} 从 {start_date:%Y-%m-%d} 开始生成 "
+              f"{args.days} 天: {volume}")
     
     language_info = "英文" if args.english else "中文"
     print(f"正在生成 {args.days} 天的健身演示数据（{language_info}版本）...")
@@ -405,37 +818,61 @@ def main():
     # 创建生成器并生成数据
     generator = FitnessDataGenerator(
         days=args.days,
+        start_date=start_date,
         initial_weight=args.initial_weight,
         initial_body_fat=args.initial_body_fat,
-        english_names=args.english
+        english_names=args.english,
+        backend=args.backend,
+        seed=args.seed,
+        metrics=metrics,
+        stress_profile=args.stress_profile
     )
+    print(f"计算后端: {'numpy' if generator.use_numpy else 'python'}")
     
-    demo_data = generator.generate_demo_data()
+    if args.format != 'json':
+        return _generate_compact(generator, args)
+    if args.stream:
+        return _generate_streaming(generator, args)
     
-    # 保存到文件
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(demo_data, f, indent=2, ensure_ascii=False)
+    records = generator.generate_records()
+    
+    # 保存到文件：直接从记录对象序列化，输出与json.dump一致
+    with open_output(args.output, 'w', level=args.compress_level, threads=args.compress_threads) as f:
+        if metrics is not None:
+            # 分别统计序列化和写出的耗时
+            writer = StreamingExportWriter(f, version=records.version, export_date=records.export_date)
+            with metrics.phase('serialization'):
+                items = list(records.format_items(writer.formatter))
+            with metrics.phase('write'):
+                for item in items:
+                    writer.add_formatted(*item)
+                writer.close(records.user_settings)
+            metrics.records += records.record_count()
+        else:
+            records.write(f)
+    if metrics is not None:
+        metrics.bytes_written += os.path.getsize(args.output)
     
     print(f"✓ 数据已保存到 {args.output}")
     
     # 数据统计
-    data = demo_data['data']
+    counts = records.counts()
     print(f"\n数据统计:")
-    print(f"- 体重记录: {len(data['weights'])} 条")
-    print(f"- 体脂记录: {len(data['bodyFat'])} 条")
-    print(f"- 训练记录: {len(data['workouts'])} 天")
-    print(f"- 营养记录: {len(data['nutrition'])} 天")
+    print(f"- 体重记录: {counts['weights']} 条")
+    print(f"- 体脂记录: {counts['bodyFat']} 条")
+    print(f"- 训练记录: {counts['workouts']} 天")
+    print(f"- 营养记录: {counts['nutrition']} 天")
     
     # 显示日期范围
-    if data['weights']:
-        dates = [w['date'] for w in data['weights']]
-        dates.sort()
+    if records.weights:
+        dates = sorted(r.date for r in records.weights)
         print(f"- 数据日期范围: {dates[0]} 到 {dates[-1]}")
     
     # 验证数据格式
     if args.validate:
         print(f"\n正在验证数据格式...")
-        is_valid = generator.validate_export_data(demo_data)
+        with timed(metrics, 'validation'):
+            is_valid = generator.validate_export_data(records.to_export_data())
         if is_valid:
             print("✓ 数据格式验证通过，可以导入应用")
         else:
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+导出文件的增量解析
+增量扫描导出JSON，逐条产出data各部分中的记录及其字节偏移，内存占用只与缓冲区和单条记录大小有关
+"""
+
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Sequence, Tuple
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# 以"键 -> 值"形式逐条产出的字典部分；其余字典部分整体解析
+STREAMED_OBJECT_SECTIONS = ('workouts',)
+
+_WHITESPACE = ' \t\r\n'
+_SCALAR_END = re.compile(r'[\s,\]}]')
+_DECODER = json.JSONDecoder()
+# 单个值超过该长度仍无法解析时视为文件损坏，避免把整个文件读入缓冲区
+MAX_VALUE_SIZE = 64 << 20
+
+
+class JsonStreamError(ValueError):
+    """导出文件不是合法的JSON或结构无法识别"""
+
+
+class ExportEvent:
+    """
+    扫描事件
+
+    kind 取值：
+        'field'         顶级字段(data以外)，key为字段名，value为解析后的值
+        'section_start' data中某个部分开始，section为部分名，value为'list'或'dict'
+        'item'          列表元素(key为序号)或流式字典成员(key为字典键)，value为解析后的记录
+        'section_end'   data中某个部分结束，value为元素个数
+        'section_value' data中整体解析的部分(如userSettings)，value为解析后的值
+
+    start/end为该值在文件中的字节偏移(end不含)。
+    """
+    __slots__ = ('kind', 'section', 'key', 'value', 'start', 'end')
+
+    def __init__(self, kind: str, section: Optional[str], key: Any, value: Any,
+                 start: int = -1, end: int = -1):
+        self.kind = kind
+        self.section = section
+        self.key = key
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"ExportEvent({self.kind!r}, {self.section!r}, {self.key!r}, start={self.start}, end={self.end})"
+
+
+class ExportScanner:
+    """
+    带缓冲的增量扫描器
+
+    缓冲区保存解码后的文本，记录交给json.JSONDecoder.raw_decode解析(C实现)，
+    同时维护当前位置在文件中的绝对字节偏移。
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.offset = offset  # buf[pos]在文件中的绝对字节偏移
+        self.eof = False
+        self._ascii = True  # 缓冲区是否全为ASCII(此时字符数等于字节数)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def _fill(self) -> bool:
+        """读入下一块数据，返回是否读到了新数据"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        text = self._decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+            if not text:
+                return False
+        # 丢弃已消费的部分，保持缓冲区有界
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        self._ascii = self.buf.isascii()
+        return True
+
+    def _advance(self, end: int) -> None:
+        """把当前位置移动到end，并更新字节偏移"""
+        if self._ascii:
+            self.offset += end - self.pos
+        else:
+            self.offset += len(self.buf[self.pos:end].encode('utf-8'))
+        self.pos = end
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符(文件结束时返回'')"""
+        while True:
+            buf, pos, n = self.buf, self.pos, len(self.buf)
+            while pos < n and buf[pos] in _WHITESPACE:
+                pos += 1
+            # 空白都是ASCII字符
+            self.offset += pos - self.pos
+            self.pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        actual = self.peek()
+        if actual != char:
+            raise JsonStreamError(f"偏移{self.offset}处应为{char}，实际为{actual or '文件结尾'}")
+        self._advance(self.pos + 1)
+
+    def read_value(self) -> Tuple[Any, int, int]:
+        """读取并解析一个完整的JSON值，返回(值, 起始字节偏移, 结束字节偏移)"""
+        first = self.peek()
+        if not first:
+            raise JsonStreamError(f"偏移{self.offset}处应为JSON值，实际为文件结尾")
+        start = self.offset
+        if first not in '{["':
+            # 数字等标量可能被缓冲区截断(如"69."），读到其后的分隔符或文件结尾才算完整
+            while _SCALAR_END.search(self.buf, self.pos) is None and self._fill():
+                pass
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                self._advance(end)
+                return value, start, self.offset
+            except json.JSONDecodeError as e:
+                # 值可能跨越了缓冲区边界，读入更多数据后重试
+                if self.eof or len(self.buf) - self.pos > MAX_VALUE_SIZE:
+                    raise JsonStreamError(f"偏移{start}处的值不是合法的JSON: {e.msg}")
+            self._fill()
+
+    def read_string(self) -> str:
+        """读取一个JSON字符串"""
+        if self.peek() != '"':
+            raise JsonStreamError(f"偏移{self.offset}处应为字符串")
+        return self.read_value()[0]
+
+    def next_member(self, closing: str, first: bool) -> bool:
+        """在数组/对象内部前进到下一个成员，返回是否还有成员"""
+        char = self.peek()
+        if char == closing:
+            self._advance(self.pos + 1)
+            return False
+        if not first:
+            if char != ',':
+                raise JsonStreamError(f"偏移{self.offset}处应为,或{closing}")
+            self._advance(self.pos + 1)
+        return True
+
+
+def iter_export(f: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[ExportEvent]:
+    """
+    增量扫描导出文件，产出ExportEvent
+
+    data下的列表部分逐个元素产出，STREAMED_OBJECT_SECTIONS中的字典部分逐个成员产出，
+    其余部分整体解析。
+    """
+    scanner = ExportScanner(f, chunk_size)
+    scanner.expect('{')
+    first = True
+    while scanner.next_member('}', first):
+        first = False
+        key = scanner.read_string()
+        scanner.expect(':')
+        if key != 'data':
+            value, start, end = scanner.read_value()
+            yield ExportEvent('field', None, key, value, start, end)
+            continue
+        if scanner.peek() != '{':
+            raise JsonStreamError("data字段必须是字典")
+        yield from _iter_data_section(scanner)
+    if scanner.peek():
+        raise JsonStreamError(f"偏移{scanner.offset}处存在多余内容")
+
+
+def _iter_data_section(scanner: ExportScanner) -> Iterator[ExportEvent]:
+    scanner.expect('{')
+    first = True
+    while scanner.next_member('}', first):
+        first = False
+        section = scanner.read_string()
+        scanner.expect(':')
+        opening = scanner.peek()
+        if opening == '[':
+            kind, closing = 'list', ']'
+        elif opening == '{' and section in STREAMED_OBJECT_SECTIONS:
+            kind, closing = 'dict', '}'
+        else:
+            value, start, end = scanner.read_value()
+            yield ExportEvent('section_value', section, None, value, start, end)
+            continue
+
+        yield ExportEvent('section_start', section, None, kind, scanner.offset)
+        scanner.expect(opening)
+        count = 0
+        while scanner.next_member(closing, count == 0):
+            if kind == 'list':
+                key = count
+            else:
+                key = scanner.read_string()
+                scanner.expect(':')
+            value, start, end = scanner.read_value()
+            yield ExportEvent('item', section, key, value, start, end)
+            count += 1
+        yield ExportEvent('section_end', section, None, count, scanner.offset)
+
+
+def detect_indent(head: bytes) -> Optional[int]:
+    """由文件开头(根对象的左括号和第一个键之间的空白)判断缩进空格数，紧凑格式为None"""
+    head = bytes(head[1:256])
+    return len(head) - 1 - len(head[1:].lstrip(b' ')) if head[:1] == b'\n' else None
+
+
+def locate_sections(buf: Any, sections: Sequence[str]) -> Tuple[Optional[int], int, Dict[str, Tuple[int, int]]]:
+    """
+    按字节定位data中各部分的值，不解析记录
+
+    只适用于StreamingExportWriter或json.dump(indent=...)写出的文件：data是最后一个顶级字段，
+    sections为data中按顺序排列的全部键。带缩进时第2层的键只会出现在这些位置，
+    因此从文件末尾向前依次查找即可，每次只在上一个部分之前查找。
+
+    Args:
+        buf: 文件内容(bytes或mmap)
+
+    Returns:
+        (缩进空格数，紧凑格式为None;
+         data键之前的位置，buf[:该位置] + b'}' 是由其余顶级字段组成的对象;
+         部分名 -> 值在文件中的[起, 止)字节偏移，包含两端的括号)
+
+    Raises:
+        JsonStreamError: 文件不是这种布局
+    """
+    if buf[:1] != b'{':
+        raise JsonStreamError("文件不是以{开头的JSON对象")
+    indent = detect_indent(buf[:256])
+
+    def newline(depth: int) -> bytes:
+        return b'' if indent is None else b'\n' + b' ' * (indent * depth)
+
+    def key(name: str) -> bytes:
+        return json.dumps(name, ensure_ascii=False).encode('utf-8') + (b':' if indent is None else b': ')
+
+    end = len(buf)
+    while end and buf[end - 1:end] in (b' ', b'\t', b'\r', b'\n'):
+        end -= 1
+    closing = newline(1) + b'}' + newline(0) + b'}'
+    if buf[end - len(closing):end] != closing:
+        raise JsonStreamError("文件末尾不是data和根对象的右括号")
+
+    following = end - len(closing)
+    spans = {}
+    for index in range(len(sections) - 1, -1, -1):
+        section = sections[index]
+        if index:
+            marker = b',' + newline(2) + key(section)
+            pos = buf.rfind(marker, 0, following)
+        else:
+            marker = newline(2) + key(section)
+            pos = buf.find(marker, 0, following)
+        start = pos + len(marker)
+        if pos < 0 or buf[start:start + 1] + buf[following - 1:following] not in (b'[]', b'{}'):
+            raise JsonStreamError(f"找不到data中的{section}部分")
+        spans[section] = (start, following)
+        following = pos
+
+    data_marker = b',' + newline(1) + key('data') + b'{'
+    if buf[following - len(data_marker):following] != data_marker:
+        raise JsonStreamError("data之后的第一个键不是" + sections[0])
+    return indent, following - len(data_marker), spans
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+紧凑的记录类型
+体重、体脂、训练项目和餐食记录使用__slots__类代替字典，重复的模板字符串(训练名称、餐食名称和食物)
+与日期只保存一份，在内存中保留完整数据集时内存占用远小于字典；
+记录可以直接序列化，结果与对等价字典调用json.dump逐字节一致
+"""
+
+import sys
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from export_writer import RecordFormatter, StreamingExportWriter
+
+
+class WeightRecord:
+    __slots__ = ('date', 'weight')
+
+    def __init__(self, date: str, weight: float):
+        self.date = date
+        self.weight = weight
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"date": self.date, "weight": self.weight}
+
+    def format(self, fmt: RecordFormatter, depth: int) -> str:
+        return fmt.format_object([('date', fmt.dumps_str(self.date)), ('weight', repr(self.weight))], depth)
+
+
+class BodyFatRecord:
+    __slots__ = ('date', 'body_fat_percentage')
+
+    def __init__(self, date: str, body_fat_percentage: float):
+        self.date = date
+        self.body_fat_percentage = body_fat_percentage
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"date": self.date, "bodyFatPercentage": self.body_fat_percentage}
+
+    def format(self, fmt: RecordFormatter, depth: int) -> str:
+        return fmt.format_object([('date', fmt.dumps_str(self.date)),
+                                  ('bodyFatPercentage', repr(self.body_fat_percentage))], depth)
+
+
+class WorkoutEntry:
+    __slots__ = ('date', 'name', 'sets', 'is_completed')
+
+    def __init__(self, date: str, name: str, sets: int, is_completed: bool):
+        self.date = date
+        self.name = name
+        self.sets = sets
+        self.is_completed = is_completed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"date": self.date, "name": self.name, "sets": self.sets, "isCompleted": self.is_completed}
+
+    def format(self, fmt: RecordFormatter, depth: int) -> str:
+        return fmt.format_object([
+            ('date', fmt.dumps_str(self.date)),
+            ('name', fmt.dumps_str(self.name)),
+            ('sets', str(self.sets)),
+            ('isCompleted', 'true' if self.is_completed else 'false')
+        ], depth)
+
+
+class MealEntry:
+    """一餐中的一个食物，对应Flutter中的MealEntry；foods为共享的元组"""
+    __slots__ = ('name', 'foods', 'calories')
+
+    def __init__(self, name: str, foods: Tuple[str, ...], calories: int):
+        self.name = name
+        self.foods = foods
+        self.calories = calories
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "foods": list(self.foods), "calories": self.calories}
+
+    def format(self, fmt: RecordFormatter, depth: int) -> str:
+        return fmt.format_object([
+            ('name', fmt.dumps_str(self.name)),
+            ('foods', fmt.format_array([fmt.dumps_str(food) for food in self.foods], depth + 1)),
+            ('calories', str(self.calories))
+        ], depth)
+
+
+class NutritionRecord:
+    __slots__ = ('date', 'calorie_intake', 'calories_burned', 'calorie_goal', 'meals')
+
+    def __init__(self, date: str, calorie_intake: int, calories_burned: int, calorie_goal: int,
+                 meals: Tuple[MealEntry, ...]):
+        self.date = date
+        self.calorie_intake = calorie_intake
+        self.calories_burned = calories_burned
+        self.calorie_goal = calorie_goal
+        self.meals = meals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "date": self.date,
+            "calorieIntake": self.calorie_intake,
+            "caloriesBurned": self.calories_burned,
+            "calorieGoal": self.calorie_goal,
+            "meals": [meal.to_dict() for meal in self.meals]
+        }
+
+    def format(self, fmt: RecordFormatter, depth: int) -> str:
+        return fmt.format_object([
+            ('date', fmt.dumps_str(self.date)),
+            ('calorieIntake', str(self.calorie_intake)),
+            ('caloriesBurned', str(self.calories_burned)),
+            ('calorieGoal', str(self.calorie_goal)),
+            ('meals', fmt.format_array([meal.format(fmt, depth + 2) for meal in self.meals], depth + 1))
+        ], depth)
+
+
+class _Interner:
+    """字符串和食物元组的共享表：相同内容只保留一个对象"""
+
+    def __init__(self):
+        self._foods: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    @staticmethod
+    def text(value: str) -> str:
+        return sys.intern(value)
+
+    def foods(self, foods: Any) -> Tuple[str, ...]:
+        key = tuple(sys.intern(food) for food in foods)
+        return self._foods.setdefault(key, key)
+
+
+class ExportRecords:
+    """
+    由记录对象组成的完整导出数据
+
+    workouts为 日期 -> 当天训练项目的元组。to_export_data()还原为Flutter导入格式的字典，
+    write()直接从记录对象流式写出，indent=2时与json.dump(to_export_data(), indent=2)逐字节一致。
+    """
+    __slots__ = ('version', 'export_date', 'weights', 'body_fat', 'workouts', 'nutrition', 'user_settings')
+
+    def __init__(self, version: str, export_date: str, weights: List[WeightRecord], body_fat: List[BodyFatRecord],
+                 workouts: Dict[str, Tuple[WorkoutEntry, ...]], nutrition: List[NutritionRecord],
+                 user_settings: Dict[str, Any]):
+        self.version = version
+        self.export_date = export_date
+        self.weights = weights
+        self.body_fat = body_fat
+        self.workouts = workouts
+        self.nutrition = nutrition
+        self.user_settings = user_settings
+
+    @classmethod
+    def from_table(cls, table, version: str, export_date: str, user_settings: Dict[str, Any]) -> 'ExportRecords':
+        """从DayTable的列数据构造记录对象；模板字符串和食物元组在所有记录间共享"""
+        dates = table.dates
+        weights = [WeightRecord(dates[k], table.weight[k] / 10) for k in range(table.count) if table.has_weight[k]]
+        body_fat = [BodyFatRecord(dates[k], table.body_fat[k] / 10)
+                    for k in range(table.count) if table.has_body_fat[k]]
+
+        workout_templates = [(sys.intern(t["name"]), t["sets"]) for t in table.workout_templates]
+        workouts = {}
+        offsets = table.workout_offsets
+        for k in range(table.count):
+            start, end = offsets[k], offsets[k + 1]
+            if end > start:
+                date_time = dates[k] + table.time_suffix
+                workouts[dates[k]] = tuple(
+                    WorkoutEntry(date_time, *workout_templates[table.workout_template[row]],
+                                 bool(table.workout_completed[row]))
+                    for row in range(start, end))
+
+        meal_names = [sys.intern(t["name"]) for t in table.meal_templates]
+        meal_foods = [[(sys.intern(food),) for food in t["foods"]] for t in table.meal_templates]
+        nutrition = []
+        offsets = table.meal_offsets
+        for k in range(table.count):
+            if not table.has_nutrition[k]:
+                continue
+            meals = tuple(
+                MealEntry(meal_names[table.meal_template[row]],
+                          meal_foods[table.meal_template[row]][table.meal_food[row]],
+                          table.meal_calories[row])
+                for row in range(offsets[k], offsets[k + 1]))
+            nutrition.append(NutritionRecord(dates[k], table.calorie_intake[k], table.calories_burned[k],
+                                             table.calorie_goal[k], meals))
+        return cls(version, export_date, weights, body_fat, workouts, nutrition, user_settings)
+
+    @classmethod
+    def from_export_data(cls, export_data: Dict[str, Any]) -> 'ExportRecords':
+        """把导出数据(如json.load的结果)转换为记录对象，日期、名称和食物字符串只保留一份"""
+        interner = _Interner()
+        text = interner.text
+        data = export_data['data']
+        weights = [WeightRecord(text(r['date']), r['weight']) for r in data['weights']]
+        body_fat = [BodyFatRecord(text(r['date']), r['bodyFatPercentage']) for r in data['bodyFat']]
+        workouts = {
+            text(date): tuple(WorkoutEntry(text(w['date']), text(w['name']), w['sets'], w['isCompleted'])
+                              for w in daily)
+            for date, daily in data['workouts'].items()
+        }
+        nutrition = [
+            NutritionRecord(text(r['date']), r['calorieIntake'], r['caloriesBurned'], r['calorieGoal'],
+                            tuple(MealEntry(text(m['name']), interner.foods(m['foods']), m['calories'])
+                                  for m in r['meals']))
+            for r in data['nutrition']
+        ]
+        return cls(export_data['version'], export_data['exportDate'], weights, body_fat, workouts, nutrition,
+                   data['userSettings'])
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "weights": len(self.weights),
+            "bodyFat": len(self.body_fat),
+            "workouts": len(self.workouts),
+            "nutrition": len(self.nutrition)
+        }
+
+    def record_count(self) -> int:
+        """体重、体脂、训练项目和营养记录的总数"""
+        return (len(self.weights) + len(self.body_fat) + len(self.nutrition)
+                + sum(len(daily) for daily in self.workouts.values()))
+
+    def to_export_data(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "exportDate": self.export_date,
+            "data": {
+                "weights": [r.to_dict() for r in self.weights],
+                "bodyFat": [r.to_dict() for r in self.body_fat],
+                "workouts": {date: [w.to_dict() for w in daily] for date, daily in self.workouts.items()},
+                "nutrition": [r.to_dict() for r in self.nutrition],
+                "userSettings": self.user_settings
+            }
+        }
+
+    def format_items(self, fmt: RecordFormatter) -> Iterator[Tuple[str, str, str, int]]:
+        """按部分产出(部分名, 序列化后的元素, 日期, 子项目数)，可直接传给StreamingExportWriter.add_formatted"""
+        for r in self.weights:
+            yield 'weights', r.format(fmt, 3), r.date, 0
+        for r in self.body_fat:
+            yield 'bodyFat', r.format(fmt, 3), r.date, 0
+        for date, daily in self.workouts.items():
+            yield ('workouts', fmt.key(date) + fmt.format_array([w.format(fmt, 4) for w in daily], 3),
+                   date, len(daily))
+        for r in self.nutrition:
+            yield 'nutrition', r.format(fmt, 3), r.date, len(r.meals)
+
+    def write(self, f, indent: Optional[int] = 2) -> Dict[str, Any]:
+        """直接从记录对象写出导出文件，返回StreamingExportWriter的统计信息"""
+        writer = StreamingExportWriter(f, indent=indent, version=self.version, export_date=self.export_date)
+        for item in self.format_items(writer.formatter):
+            writer.add_formatted(*item)
+        return writer.close(self.user_settings)
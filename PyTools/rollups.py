@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+图表数据预聚合
+把导出文件(或直接由FitnessDataGenerator生成的数据)中的逐日记录按日、周、月汇总为图表序列：
+体重和体脂率的均值/最小值/最大值，摄入减消耗与热量目标的对比，训练完成数与总数。
+结果保存为紧凑的旁路JSON文件，应用可以直接加载，不必在导入时扫描全部记录
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Any, Optional, Sequence
+
+from compressed_io import open_output, strip_compression_extension
+from export_formats import iter_file_records
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时使用纯Python实现
+    np = None
+
+PERIODS = ('daily', 'weekly', 'monthly')
+# 预聚合文件的扩展名；批量验证时跳过这类文件
+ROLLUP_SUFFIX = '.rollups.json'
+ROLLUP_FORMAT_VERSION = "1.0"
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# 汇总前数值按千分之一取整并以整数累加，求和与顺序无关，两种实现的结果逐位相同
+_SCALE = 1000
+
+
+def _ordinal(date: str) -> int:
+    return datetime.date.fromisoformat(date[:10]).toordinal()
+
+
+class RollupColumns:
+    """
+    预聚合的输入列
+
+    每个部分按记录存为平行的数组(日期序数和数值)，不保留记录字典；
+    同一天有多条记录时在按日汇总中合并。
+    """
+
+    def __init__(self):
+        self.weight_day = array('l')
+        self.weight = array('d')
+        self.body_fat_day = array('l')
+        self.body_fat = array('d')
+        self.nutrition_day = array('l')
+        self.intake = array('d')
+        self.burned = array('d')
+        self.goal = array('d')
+        self.workout_day = array('l')
+        self.workout_total = array('l')
+        self.workout_completed = array('l')
+
+    def add_record(self, section: str, key: Optional[str], value: Any) -> None:
+        """加入一条导出记录(export_formats.iter_records的产出)"""
+        if section == 'weights':
+            self.weight_day.append(_ordinal(value['date']))
+            self.weight.append(value['weight'])
+        elif section == 'bodyFat':
+            self.body_fat_day.append(_ordinal(value['date']))
+            self.body_fat.append(value['bodyFatPercentage'])
+        elif section == 'nutrition':
+            self.nutrition_day.append(_ordinal(value['date']))
+            self.intake.append(value['calorieIntake'])
+            self.burned.append(value['caloriesBurned'])
+            self.goal.append(value['calorieGoal'])
+        elif section == 'workouts' and value:
+            self.workout_day.append(_ordinal(key))
+            self.workout_total.append(len(value))
+            self.workout_completed.append(sum(1 for workout in value if workout.get('isCompleted')))
+
+    def add_table(self, table) -> None:
+        """直接从DayTable的列数据加入一段日期，不物化记录字典"""
+        first = datetime.date.fromisoformat(table.dates[0]).toordinal() if table.count else 0
+        days = range(table.count)
+        for k in days:
+            if table.has_weight[k]:
+                self.weight_day.append(first + k)
+                self.weight.append(table.weight[k] / 10)
+            if table.has_body_fat[k]:
+                self.body_fat_day.append(first + k)
+                self.body_fat.append(table.body_fat[k] / 10)
+            if table.has_nutrition[k]:
+                self.nutrition_day.append(first + k)
+                self.intake.append(table.calorie_intake[k])
+                self.burned.append(table.calories_burned[k])
+                self.goal.append(table.calorie_goal[k])
+        offsets = table.workout_offsets
+        completed = list(accumulate(table.workout_completed, initial=0))
+        for k in days:
+            if offsets[k + 1] > offsets[k]:
+                self.workout_day.append(first + k)
+                self.workout_total.append(offsets[k + 1] - offsets[k])
+                self.workout_completed.append(completed[offsets[k + 1]] - completed[offsets[k]])
+
+    @property
+    def first_date(self) -> Optional[str]:
+        days = [min(column) for column in (self.weight_day, self.body_fat_day, self.nutrition_day,
+                                           self.workout_day) if column]
+        return datetime.date.fromordinal(min(days)).isoformat() if days else None
+
+    @property
+    def last_date(self) -> Optional[str]:
+        days = [max(column) for column in (self.weight_day, self.body_fat_day, self.nutrition_day,
+                                           self.workout_day) if column]
+        return datetime.date.fromordinal(max(days)).isoformat() if days else None
+
+
+def columns_from_file(path: str) -> RollupColumns:
+    """逐条读取导出文件(任意格式，JSON流式扫描)"""
+    columns = RollupColumns()
+    records, _ = iter_file_records(path)
+    for record in records:
+        columns.add_record(*record)
+    return columns
+
+
+def columns_from_generator(generator) -> RollupColumns:
+    """直接从生成器的列式数据表读取，不构造导出数据"""
+    columns = RollupColumns()
+    for table in generator.iter_tables():
+        columns.add_table(table)
+    return columns
+
+
+# === 分组 ===
+
+def _period_start(ordinal: int, period: str) -> int:
+    """日期所在周期的第一天(序数)；周从星期一开始"""
+    if period == 'daily':
+        return ordinal
+    if period == 'weekly':
+        return ordinal - datetime.date.fromordinal(ordinal).weekday()
+    date = datetime.date.fromordinal(ordinal)
+    return datetime.date(date.year, date.month, 1).toordinal()
+
+
+def _period_starts_numpy(days: "np.ndarray", period: str) -> "np.ndarray":
+    if period == 'daily':
+        return days
+    epoch_days = days - _EPOCH_ORDINAL
+    if period == 'weekly':
+        # 1970-01-01是星期四
+        return days - (epoch_days + 3) % 7
+    months = epoch_days.astype('datetime64[D]').astype('datetime64[M]')
+    return months.astype('datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL
+
+
+def _group_numpy(days: Sequence[int], values: Dict[str, Sequence[float]], period: str,
+                 reducers: Sequence[str]) -> Dict[str, list]:
+    """
+    按周期分组汇总(NumPy实现)
+
+    排序后用reduceat对每组一次性求和/最小/最大值，没有逐条的Python循环。
+    """
+    keys = _period_starts_numpy(np.asarray(days, dtype=np.int64), period)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    result = {"period": keys[starts].tolist(), "count": np.diff(np.r_[starts, len(keys)]).tolist()}
+    for name, column in values.items():
+        column = np.rint(np.asarray(column, dtype=np.float64) * _SCALE).astype(np.int64)[order]
+        for reducer in reducers:
+            if not len(starts):
+                result[f"{name}.{reducer}"] = []
+                continue
+            ufunc = {"sum": np.add, "min": np.minimum, "max": np.maximum}[reducer]
+            result[f"{name}.{reducer}"] = (ufunc.reduceat(column, starts) / _SCALE).tolist()
+    return result
+
+
+def _group_python(days: Sequence[int], values: Dict[str, Sequence[float]], period: str,
+                  reducers: Sequence[str]) -> Dict[str, list]:
+    """按周期分组汇总(纯Python实现，结果与NumPy实现一致)"""
+    cache: Dict[int, int] = {}
+    groups: Dict[int, List[int]] = {}
+    for i, day in enumerate(days):
+        key = cache.get(day)
+        if key is None:
+            key = cache[day] = _period_start(day, period)
+        groups.setdefault(key, []).append(i)
+    keys = sorted(groups)
+    result = {"period": keys, "count": [len(groups[key]) for key in keys]}
+    for name, column in values.items():
+        scaled = [round(value * _SCALE) for value in column]
+        for reducer in reducers:
+            func = {"sum": sum, "min": min, "max": max}[reducer]
+            result[f"{name}.{reducer}"] = [func(scaled[i] for i in groups[key]) / _SCALE for key in keys]
+    return result
+
+
+def _dates(ordinals: Sequence[int]) -> List[str]:
+    return [datetime.date.fromordinal(ordinal).isoformat() for ordinal in ordinals]
+
+
+def _round(values: Sequence[float], digits: int) -> List[float]:
+    return [round(value, digits) for value in values]
+
+
+def rollup(columns: RollupColumns, period: str, use_numpy: bool = True) -> Dict[str, Any]:
+    """
+    按一个周期汇总全部图表序列
+
+    每个序列有自己的period(周期第一天)列，只包含有记录的周期；其他列与period一一对应：
+        weight/bodyFat: mean、min、max、count(记录数)
+        calories: days(有营养记录的天数)，intake、burned、net(摄入-消耗)、goal为每日均值，
+                  netVsGoal为(摄入-消耗-目标)的每日均值，daysOverGoal为摄入-消耗超过目标的天数
+        workouts: days(有训练的天数)、completed、total、completionRate
+    """
+    if period not in PERIODS:
+        raise ValueError(f"不支持的汇总周期: {period}")
+    group = _group_numpy if use_numpy and np is not None else _group_python
+    series = {}
+
+    for name, days, values in (('weight', columns.weight_day, columns.weight),
+                               ('bodyFat', columns.body_fat_day, columns.body_fat)):
+        g = group(days, {"value": values}, period, ("sum", "min", "max"))
+        series[name] = {
+            "period": _dates(g["period"]),
+            "mean": _round([total / count for total, count in zip(g["value.sum"], g["count"])], 2),
+            "min": _round(g["value.min"], 1),
+            "max": _round(g["value.max"], 1),
+            "count": g["count"]
+        }
+
+    net = [intake - burned for intake, burned in zip(columns.intake, columns.burned)]
+    over = [1.0 if value > goal else 0.0 for value, goal in zip(net, columns.goal)]
+    g = group(columns.nutrition_day, {"intake": columns.intake, "burned": columns.burned, "net": net,
+                                      "goal": columns.goal, "over": over}, period, ("sum",))
+    counts = g["count"]
+
+    def mean(name: str) -> List[float]:
+        return _round([total / count for total, count in zip(g[f"{name}.sum"], counts)], 1)
+
+    series["calories"] = {
+        "period": _dates(g["period"]),
+        "days": counts,
+        "intake": mean("intake"),
+        "burned": mean("burned"),
+        "net": mean("net"),
+        "goal": mean("goal"),
+        "netVsGoal": _round([(n - goal) / count for n, goal, count in zip(g["net.sum"], g["goal.sum"], counts)], 1),
+        "daysOverGoal": [int(value) for value in g["over.sum"]]
+    }
+
+    g = group(columns.workout_day, {"completed": columns.workout_completed, "total": columns.workout_total},
+              period, ("sum",))
+    series["workouts"] = {
+        "period": _dates(g["period"]),
+        "days": g["count"],
+        "completed": [int(value) for value in g["completed.sum"]],
+        "total": [int(value) for value in g["total.sum"]],
+        "completionRate": _round([done / total if total else 0.0
+                                  for done, total in zip(g["completed.sum"], g["total.sum"])], 4)
+    }
+    return series
+
+
+def build_rollups(columns: RollupColumns, periods: Sequence[str] = PERIODS, source: Optional[str] = None,
+                  use_numpy: bool = True) -> Dict[str, Any]:
+    """汇总所有周期，返回预聚合文件的内容"""
+    return {
+        "version": ROLLUP_FORMAT_VERSION,
+        "createdAt": datetime.datetime.now().isoformat(timespec='seconds'),
+        "source": source,
+        "firstDate": columns.first_date,
+        "lastDate": columns.last_date,
+        "rollups": {period: rollup(columns, period, use_numpy) for period in periods}
+    }
+
+
+def write_rollups(rollups: Dict[str, Any], path: str) -> None:
+    """以紧凑格式写出(.gz/.xz/.bz2扩展名时压缩)"""
+    with open_output(path, 'w') as f:
+        json.dump(rollups, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def default_output_path(input_path: str) -> str:
+    base = strip_compression_extension(input_path)
+    if os.path.isdir(base):
+        return base.rstrip(os.sep) + ROLLUP_SUFFIX
+    return os.path.splitext(base)[0] + ROLLUP_SUFFIX
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把导出数据按日、周、月预聚合为图表序列')
+    parser.add_argument('input', nargs='?', default=None,
+                        help='导出文件(任意格式，可压缩)；省略时按--days等参数直接生成数据并汇总')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'预聚合文件 (默认: 输入文件名加{ROLLUP_SUFFIX}，直接生成时为fitness_demo_data{ROLLUP_SUFFIX})')
+    parser.add_argument('--periods', type=str, default=','.join(PERIODS),
+                        help=f'逗号分隔的汇总周期 (默认: {",".join(PERIODS)})')
+    parser.add_argument('--backend', choices=['auto', 'numpy', 'python'], default='auto',
+                        help='分组汇总的计算后端 (默认: auto，有NumPy时使用向量化实现)')
+    parser.add_argument('--days', type=int, default=90, help='直接生成时的天数 (默认: 90)')
+    parser.add_argument('--seed', type=int, default=None, help='直接生成时的随机种子')
+    parser.add_argument('--start-date', type=str, default=None, help='直接生成时的开始日期 YYYY-MM-DD')
+    args = parser.parse_args()
+
+    periods = [period.strip() for period in args.periods.split(',') if period.strip()]
+    unknown = [period for period in periods if period not in PERIODS]
+    if unknown:
+        print(f"✗ 不支持的汇总周期: {', '.join(unknown)} (可选: {', '.join(PERIODS)})")
+        return 1
+    use_numpy = args.backend != 'python'
+    if args.backend == 'numpy' and np is None:
+        print("✗ 未安装NumPy，无法使用numpy后端")
+        return 1
+
+    start_time = time.perf_counter()
+    try:
+        if args.input is not None:
+            columns = columns_from_file(args.input)
+            source = args.input
+            output = args.output or default_output_path(args.input)
+        else:
+            from generate_demo_data_final import FitnessDataGenerator
+            start_date = datetime.datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+            generator = FitnessDataGenerator(days=args.days, start_date=start_date, seed=args.seed)
+            columns = columns_from_generator(generator)
+            source = "generator"
+            output = args.output or 'fitness_demo_data' + ROLLUP_SUFFIX
+        read_seconds = time.perf_counter() - start_time
+        rollups = build_rollups(columns, periods, source, use_numpy)
+        write_rollups(rollups, output)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"✗ 预聚合失败: {e}")
+        return 1
+    elapsed = time.perf_counter() - start_time
+
+    print(f"✓ 预聚合结果已保存到 {output} ({os.path.getsize(output)} 字节)")
+    print(f"- 日期范围: {rollups['firstDate']} 到 {rollups['lastDate']}")
+    for period, series in rollups["rollups"].items():
+        print(f"- {period}: " + ", ".join(f"{name} {len(values['period'])}" for name, values in series.items()))
+    print(f"- 耗时: {elapsed:.2f} 秒 (读取 {read_seconds:.2f} 秒, "
+          f"后端: {'numpy' if use_numpy and np is not None else 'python'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+运行指标与性能分析
+按阶段累计耗时，记录吞吐量、写出字节数和峰值内存(RSS)，可选用cProfile找出最耗时的函数
+"""
+
+import contextlib
+import cProfile
+import io
+import pstats
+import sys
+import time
+from typing import Dict, List, Any, Callable, Optional
+
+# resource只在类Unix系统上可用，没有时不记录峰值内存
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 阶段的输出顺序；未列出的阶段排在后面
+PHASE_ORDER = ['sizing', 'weights', 'bodyFat', 'workouts', 'nutrition', 'records', 'serialization', 'write', 'validation']
+DEFAULT_PROFILE_TOP = 25
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class RunMetrics:
+    """
+    一次运行的指标
+
+    phase()按名称累计耗时和调用次数，可以嵌套在任意代码中；to_dict()只包含可序列化为JSON的数据，
+    可以在进程池任务中创建后返回主进程，再用merge()合并。
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.records = 0
+        self.bytes_written = 0
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += time.perf_counter() - start
+            entry["calls"] += 1
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """合并其他进程返回的to_dict()结果(各阶段耗时相加)"""
+        for name, entry in other["phases"].items():
+            target = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            target["seconds"] += entry["seconds"]
+            target["calls"] += entry["calls"]
+
+    def to_dict(self, **extra: Any) -> Dict[str, Any]:
+        """
+        汇总为JSON可序列化的字典
+
+        各阶段的share为占总耗时的比例；进程池中各进程的阶段耗时相加，share可能超过1。
+        """
+        total = time.perf_counter() - self._start
+        order = {name: i for i, name in enumerate(PHASE_ORDER)}
+        phases = {}
+        for name in sorted(self.phases, key=lambda n: (order.get(n, len(order)), n)):
+            entry = self.phases[name]
+            phases[name] = {
+                "seconds": round(entry["seconds"], 4),
+                "calls": entry["calls"],
+                "share": round(entry["seconds"] / total, 4) if total > 0 else 0.0
+            }
+        result = dict(extra)
+        result.update({
+            "totalSeconds": round(total, 4),
+            "phases": phases,
+            "records": self.records,
+            "recordsPerSecond": round(self.records / max(total, 1e-9), 1),
+            "bytesWritten": self.bytes_written,
+            "bytesPerSecond": round(self.bytes_written / max(total, 1e-9), 1),
+            "peakRssBytes": peak_rss_bytes(),
+            "childrenPeakRssBytes": peak_rss_bytes(children=True)
+        })
+        return result
+
+
+def timed(metrics: Optional[RunMetrics], name: str):
+    """metrics为None时不计时的phase()"""
+    return metrics.phase(name) if metrics is not None else _NULL_PHASE
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """当前进程(或已结束的子进程中)的峰值常驻内存，无法获取时为None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux上ru_maxrss以KB为单位，macOS上以字节为单位
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def profile_call(func: Callable[[], Any], stats_path: Optional[str] = None,
+                 top: int = DEFAULT_PROFILE_TOP) -> tuple:
+    """
+    在cProfile下执行func
+
+    Returns:
+        (func的返回值, 最耗时的top个函数[{function, calls, totalSeconds, cumulativeSeconds}]，按自身耗时排序)
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        if stats_path:
+            profiler.dump_stats(stats_path)
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    hotspots = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]:
+        hotspots.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "totalSeconds": round(total, 4),
+            "cumulativeSeconds": round(cumulative, 4)
+        })
+    return result, hotspots
+
+
+def print_metrics(metrics: Dict[str, Any], hotspots: Optional[List[Dict[str, Any]]] = None) -> None:
+    """输出各阶段耗时和吞吐量"""
+    print(f"\n运行指标 (总耗时 {metrics['totalSeconds']:.3f} 秒):")
+    for name, entry in metrics["phases"].items():
+        print(f"- {name:<14} {entry['seconds']:>9.3f} 秒 ({entry['share']:>6.1%}, {entry['calls']} 次)")
+    print(f"- 记录数: {metrics['records']} ({metrics['recordsPerSecond']:,.0f} 条/秒)")
+    print(f"- 写出字节: {metrics['bytesWritten']} ({metrics['bytesPerSecond'] / 1e6:.1f} MB/秒)")
+    for key, label in (('peakRssBytes', '峰值内存'), ('childrenPeakRssBytes', '子进程峰值内存')):
+        if metrics.get(key):
+            print(f"- {label}: {metrics[key] / 1e6:.1f} MB")
+    if hotspots:
+        print(f"\n自身耗时最多的 {len(hotspots)} 个函数:")
+        for entry in hotspots:
+            print(f"  {entry['totalSeconds']:>9.3f} 秒  {entry['calls']:>10} 次  {entry['function']}")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+大文件的抽样快速检查
+在文件中随机定位字节位置，向前找到所在记录的起点(带缩进的JSON按记录的缩进层级，.jsonl分片按行)，
+只用export_schema的规则检查抽到的记录，估计各部分的缺陷率及其置信上限。
+耗时只与抽样数有关，与文件大小无关；无法随机定位的文件(压缩文件、紧凑格式等)须完整验证
+"""
+
+import json
+import math
+import mmap
+import random
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional, Tuple
+
+from compressed_io import detect_compression, strip_compression_extension
+from export_schema import compile_schema
+from export_writer import RecordFormatter, SECTIONS
+from json_stream import JsonStreamError, locate_sections
+
+DEFAULT_SAMPLE_CONFIDENCE = 0.95
+# 不超过该大小的部分(及.jsonl分片)直接全部检查，结果是精确的
+FULL_SECTION_BYTES = 4 << 20
+# 每个部分最多尝试的随机定位次数为抽样数的倍数(抽到重复记录时重新定位)
+MAX_ATTEMPTS_FACTOR = 20
+# 解析一条记录时首次读取的字节数，不够时加倍
+RECORD_WINDOW_BYTES = 1 << 16
+MAX_RECORD_BYTES = 64 << 20
+# 每个部分保留的错误信息条数
+MAX_SAMPLE_ERRORS = 5
+
+_decoder = json.JSONDecoder()
+
+
+class SamplingUnsupported(ValueError):
+    """文件无法随机定位记录，只能完整验证"""
+
+
+class SectionSample:
+    """
+    一个部分的抽样结果
+
+    随机定位抽到记录的概率与记录的字节长度成正比，因此每条记录按长度的倒数加权：
+    缺陷率为加权比例，置信上限按有效样本数(Kish)计算Wilson区间的单侧上限。
+    exact=True表示该部分已全部检查，缺陷率是精确值。
+    """
+
+    def __init__(self, section: str, span_bytes: int):
+        self.section = section
+        self.span_bytes = span_bytes
+        self.exact = False
+        self.sampled = 0
+        self.defective = 0
+        self.errors: List[str] = []
+        self._weight = 0.0
+        self._weight_sq = 0.0
+        self._defect_weight = 0.0
+
+    def add(self, length: int, errors: List[str]) -> None:
+        """加入一条抽到的记录；length为抽到它的字节区间长度"""
+        weight = 1.0 / max(length, 1)
+        self.sampled += 1
+        self._weight += weight
+        self._weight_sq += weight * weight
+        if errors:
+            self.defective += 1
+            self._defect_weight += weight
+            self.errors.extend(errors[:max(MAX_SAMPLE_ERRORS - len(self.errors), 0)])
+
+    def add_exact(self, errors: List[str]) -> None:
+        """全部检查时加入一条记录(等权)"""
+        self.exact = True
+        self.add(1, errors)
+
+    @property
+    def rate(self) -> float:
+        return self._defect_weight / self._weight if self._weight else 0.0
+
+    @property
+    def effective_size(self) -> float:
+        return self._weight * self._weight / self._weight_sq if self._weight_sq else 0.0
+
+    def upper_bound(self, confidence: float = DEFAULT_SAMPLE_CONFIDENCE) -> float:
+        """缺陷率的单侧置信上限"""
+        if self.exact or not self.sampled:
+            return self.rate
+        n, p = self.effective_size, self.rate
+        z = NormalDist().inv_cdf(confidence)
+        denominator = 1 + z * z / n
+        center = p + z * z / (2 * n)
+        spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+        return min(1.0, (center + spread) / denominator)
+
+    @property
+    def estimated_records(self) -> int:
+        """估计的记录总数：按长度加权抽样时，1/长度的均值乘以区间字节数"""
+        if self.exact:
+            return self.sampled
+        return round(self.span_bytes * self._weight / self.sampled) if self.sampled else 0
+
+    def to_dict(self, confidence: float = DEFAULT_SAMPLE_CONFIDENCE) -> Dict[str, Any]:
+        return {
+            "sampled": self.sampled,
+            "defective": self.defective,
+            "exact": self.exact,
+            "defectRate": round(self.rate, 6),
+            "upperBound": round(self.upper_bound(confidence), 6),
+            "estimatedRecords": self.estimated_records,
+            "errors": self.errors
+        }
+
+
+class SampleResult:
+    """一个文件的抽样结果：top_errors为顶级结构的错误，sections为部分名(.jsonl分片为'exports') -> SectionSample"""
+
+    def __init__(self, fmt: str, confidence: float, seed: int):
+        self.format = fmt
+        self.confidence = confidence
+        self.seed = seed
+        self.top_errors: List[str] = []
+        self.sections: Dict[str, SectionSample] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.top_errors and not any(sample.defective for sample in self.sections.values())
+
+    @property
+    def errors(self) -> List[str]:
+        errors = list(self.top_errors)
+        for sample in self.sections.values():
+            errors.extend(sample.errors)
+        return errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "confidence": self.confidence,
+            "seed": self.seed,
+            "topErrors": self.top_errors,
+            "sections": {section: sample.to_dict(self.confidence) for section, sample in self.sections.items()}
+        }
+
+
+def _decode_at(mm: mmap.mmap, start: int, end: int, keyed: bool) -> Tuple[Any, Any, int]:
+    """
+    解析从start开始的一条记录(keyed=True时先解析字典键)
+
+    Returns:
+        (键, 记录, 记录文本的字节长度)
+    """
+    window = RECORD_WINDOW_BYTES
+    while True:
+        stop = min(start + window, end)
+        text = mm[start:stop].decode('utf-8', 'ignore')
+        try:
+            key, pos = None, 0
+            if keyed:
+                key, pos = _decoder.raw_decode(text)
+                pos = text.index(':', pos) + 1
+                while text[pos] in ' \t\r\n':
+                    pos += 1
+            value, pos = _decoder.raw_decode(text, pos)
+            return key, value, len(text[:pos].encode('utf-8'))
+        except (ValueError, IndexError):
+            if stop >= end or window >= MAX_RECORD_BYTES:
+                raise
+            window *= 2
+
+
+def _record_start(mm: mmap.mmap, marker: bytes, start: int, position: int) -> Optional[int]:
+    """position所在记录的起点：之前最近的记录缩进(其后不是更深的缩进，也不是同一层级的右括号)"""
+    end = position
+    while True:
+        pos = mm.rfind(marker, start, end)
+        if pos < 0:
+            return None
+        if mm[pos + len(marker):pos + len(marker) + 1] not in (b' ', b'}', b']', b''):
+            return pos + len(marker)
+        end = pos + len(marker) - 1
+
+
+def _sample_json_section(mm: mmap.mmap, schema, section: str, start: int, end: int, count: int,
+                         rng: random.Random, marker: bytes) -> SectionSample:
+    sample = SectionSample(section, end - start)
+    keyed = schema.schema[section].kind == 'dict'
+    if end - start <= FULL_SECTION_BYTES:
+        value = json.loads(mm[start:end].decode('utf-8'))
+        type_error = schema.section_type_error(section, value)
+        if type_error:
+            sample.add_exact([type_error])
+            return sample
+        for key, record in (value.items() if keyed else enumerate(value)):
+            sample.add_exact(schema.check_record(section, key, record))
+        return sample
+
+    kind_error = schema.section_kind_error(section, 'list' if mm[start:start + 1] == b'[' else 'dict')
+    if kind_error:
+        sample.add_exact([kind_error])
+        return sample
+
+    seen = set()
+    separator = 1 + len(marker)
+    for _ in range(count * MAX_ATTEMPTS_FACTOR):
+        if sample.sampled >= count:
+            break
+        position = rng.randrange(start + 1, end - 1)
+        record_start = _record_start(mm, marker, start, position)
+        if record_start is None:
+            # 落在第一条记录之前的空白中，按第一条记录计
+            first = mm.find(marker, start, end)
+            if first < 0:
+                continue
+            record_start = first + len(marker)
+        if record_start in seen:
+            continue
+        seen.add(record_start)
+        try:
+            key, record, length = _decode_at(mm, record_start, end, keyed)
+        except (ValueError, IndexError):
+            following = mm.find(marker, record_start, end)
+            length = (following if following >= 0 else end) - record_start + len(marker)
+            sample.add(length, [f"✗ {section}中偏移{record_start}处的记录不是合法的JSON"])
+            continue
+        label = key if keyed else f"(偏移{record_start})"
+        sample.add(length + separator, schema.check_record(section, label, record))
+    return sample
+
+
+def _sample_json(mm: mmap.mmap, count: int, rng: random.Random, result: SampleResult) -> None:
+    try:
+        indent, data_pos, spans = locate_sections(mm, SECTIONS + ['userSettings'])
+    except JsonStreamError as e:
+        raise SamplingUnsupported(f"不是本工具或json.dump(indent=...)写出的JSON文件: {e}")
+    if indent is None:
+        raise SamplingUnsupported("紧凑格式的JSON没有可用于重新同步的记录边界")
+    schema = compile_schema(False)
+
+    header = json.loads(mm[:data_pos].decode('utf-8') + '}')
+    start, end = spans['userSettings']
+    user_settings = json.loads(mm[start:end].decode('utf-8'))
+    result.top_errors = schema.check_top_level(dict(header, data=dict.fromkeys(schema.schema, [])))
+    result.top_errors += schema.check_section('userSettings', user_settings)[0]
+
+    marker = RecordFormatter(indent).newline(3).encode('utf-8')
+    for section in SECTIONS:
+        start, end = spans[section]
+        result.sections[section] = _sample_json_section(mm, schema, section, start, end, count, rng, marker)
+
+
+def _check_line(schema, line: bytes, offset: int) -> List[str]:
+    try:
+        export_data = json.loads(line)
+    except ValueError:
+        return [f"✗ 偏移{offset}处的行不是合法的JSON"]
+    return [f"✗ 偏移{offset}处的行: {error[2:]}" for error in schema.validate(export_data)]
+
+
+def _sample_jsonl(mm: mmap.mmap, count: int, rng: random.Random, result: SampleResult) -> None:
+    """.jsonl分片：每行是一个用户的完整导出数据，按行抽样并检查整行"""
+    schema = compile_schema(False)
+    size = len(mm)
+    sample = result.sections['exports'] = SectionSample('exports', size)
+    if size <= FULL_SECTION_BYTES:
+        offset = 0
+        for line in mm[:].split(b'\n'):
+            if line.strip():
+                sample.add_exact(_check_line(schema, line, offset))
+            offset += len(line) + 1
+        return
+
+    seen = set()
+    for _ in range(count * MAX_ATTEMPTS_FACTOR):
+        if sample.sampled >= count:
+            break
+        position = rng.randrange(size)
+        line_start = mm.rfind(b'\n', 0, position) + 1
+        if line_start in seen:
+            continue
+        seen.add(line_start)
+        line_end = mm.find(b'\n', position)
+        line_end = size if line_end < 0 else line_end
+        line = mm[line_start:line_end]
+        if not line.strip():
+            continue
+        sample.add(line_end - line_start + 1, _check_line(schema, line, line_start))
+
+
+def sample_export_file(path: str, count: int, confidence: float = DEFAULT_SAMPLE_CONFIDENCE,
+                       seed: Optional[int] = None) -> SampleResult:
+    """
+    抽样检查导出文件：带缩进的JSON每个部分抽count条记录，.jsonl分片抽count行
+
+    顶级字段和userSettings总是完整检查；不超过FULL_SECTION_BYTES的部分全部检查。
+    seed为None时随机选择种子，结果中记录了使用的种子，可以复现。
+
+    Raises:
+        SamplingUnsupported: 压缩文件、其他格式或紧凑格式的JSON无法抽样
+    """
+    if count <= 0:
+        raise ValueError("抽样数必须大于0")
+    if not 0 < confidence < 1:
+        raise ValueError("置信度必须在0和1之间")
+    if detect_compression(path) is not None:
+        raise SamplingUnsupported("压缩文件无法随机定位")
+    seed = seed if seed is not None else random.randrange(1 << 32)
+    rng = random.Random(seed)
+    shard = strip_compression_extension(path).endswith('.jsonl')
+    result = SampleResult('jsonl' if shard else 'json', confidence, seed)
+
+    with open(path, 'rb') as f:
+        if f.read(1) != b'{':
+            raise SamplingUnsupported("不是JSON导出文件")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if shard:
+                _sample_jsonl(mm, count, rng, result)
+            else:
+                if mm[:64].startswith(b'{"format":"ndjson"'):
+                    raise SamplingUnsupported("NDJSON格式不支持抽样")
+                _sample_json(mm, count, rng, result)
+    return result
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+跨记录的语义检查
+在字段和类型检查之外，把每个部分的日期和数值读入数组后整体检查：日期唯一且递增、
+calorieIntake等于当天meals热量之和、workouts的键与记录日期一致、数值在生成器的取值范围内。
+每个不满足的日期都单独报告。安装了NumPy时向量化检查，否则逐条检查，结论相同
+"""
+
+import bisect
+import datetime
+from typing import Dict, List, Any, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时回退到纯Python实现
+    np = None
+
+# 生成器的取值范围(含两端)：体重和体脂率为限幅随机游走的上下限，训练组数为训练模板中的组数，
+# 每个MealEntry的热量为餐食模板热量的80%-120%按食物数平分(最后一个食物加上余数)
+VALUE_RANGES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    'weights': {'weight': (50, 100)},
+    'bodyFat': {'bodyFatPercentage': (5, 35)},
+    'workouts': {'sets': (3, 4)},
+    'nutrition': {'caloriesBurned': (300, 600), 'calorieGoal': (1800, 2200), 'meals.calories': (80, 261)},
+}
+
+# 热量之和为浮点数时允许的误差
+CALORIE_TOLERANCE = 1e-6
+
+_LABELS = {'weights': '体重记录', 'bodyFat': '体脂记录', 'workouts': '训练记录', 'nutrition': '营养记录'}
+# 做语义检查的部分(userSettings没有语义检查)
+SEMANTIC_SECTIONS = list(_LABELS)
+
+
+class SectionColumns:
+    """
+    一个部分中需要检查的列
+
+    记录须已通过export_schema的字段和类型检查。add()逐条追加(可用于流式扫描)，
+    check()对全部记录做语义检查并返回错误信息列表。
+    """
+
+    def __init__(self, section: str):
+        if section not in SEMANTIC_SECTIONS:
+            raise ValueError(f"没有语义检查的部分: {section}")
+        self.section = section
+        self.dates: List[str] = []
+        self.values: Dict[str, List[Any]] = {field: [] for field in VALUE_RANGES[section]}
+        # workouts中每条训练项目的日期及每天的项目数；nutrition中每天的calorieIntake和meals数
+        self.item_dates: List[str] = []
+        self.item_counts: List[int] = []
+        self.intake: List[Any] = []
+
+    def add(self, key: Any, record: Any) -> None:
+        """追加一条记录；key为列表部分中的序号或字典部分中的键"""
+        section = self.section
+        if section == 'workouts':
+            self.dates.append(key)
+            self.item_counts.append(len(record))
+            self.item_dates.extend(workout['date'][:10] for workout in record)
+            self.values['sets'].extend(workout['sets'] for workout in record)
+            return
+        self.dates.append(record['date'][:10])
+        if section == 'nutrition':
+            meals = record['meals']
+            self.intake.append(record['calorieIntake'])
+            self.item_counts.append(len(meals))
+            self.values['caloriesBurned'].append(record['caloriesBurned'])
+            self.values['calorieGoal'].append(record['calorieGoal'])
+            self.values['meals.calories'].extend(meal['calories'] for meal in meals)
+        else:
+            for field, values in self.values.items():
+                values.append(record[field])
+
+    def extend(self, value: Any) -> None:
+        """追加一个部分的全部记录(列表或字典)"""
+        section = self.section
+        if section == 'workouts':
+            self.dates.extend(value)
+            daily = list(value.values())
+            self.item_counts.extend(map(len, daily))
+            self.item_dates.extend(workout['date'][:10] for workouts in daily for workout in workouts)
+            self.values['sets'].extend(workout['sets'] for workouts in daily for workout in workouts)
+        elif section == 'nutrition':
+            self.dates.extend(record['date'][:10] for record in value)
+            self.intake.extend(record['calorieIntake'] for record in value)
+            self.item_counts.extend(len(record['meals']) for record in value)
+            self.values['caloriesBurned'].extend(record['caloriesBurned'] for record in value)
+            self.values['calorieGoal'].extend(record['calorieGoal'] for record in value)
+            self.values['meals.calories'].extend(meal['calories'] for record in value for meal in record['meals'])
+        else:
+            self.dates.extend(record['date'][:10] for record in value)
+            for field, values in self.values.items():
+                values.extend(record[field] for record in value)
+
+    # === 检查 ===
+
+    def check(self) -> List[str]:
+        errors = self._check_dates()
+        if self.section == 'workouts':
+            errors += self._check_workout_dates()
+        elif self.section == 'nutrition':
+            errors += self._check_intake()
+        errors += self._check_ranges()
+        return errors
+
+    def _record_dates(self, field: str, indexes: Sequence[int]) -> List[str]:
+        """值所在记录的日期；meals和workouts中的值按每天的项目数对应到日期"""
+        if field not in ('meals.calories', 'sets'):
+            return [self.dates[i] for i in indexes]
+        owners = _owners(self.item_counts, indexes)
+        return [self.dates[owner] for owner in owners]
+
+    def _check_dates(self) -> List[str]:
+        """日期格式有效、唯一且严格递增"""
+        label, dates = _LABELS[self.section], self.dates
+        ordinals, invalid = _date_ordinals(dates)
+        if invalid:
+            # 有无效日期时无法判断顺序
+            return [f"✗ {label}的日期格式无效: {dates[i]!r}" for i in invalid]
+        if np is not None:
+            steps = np.diff(ordinals)
+            duplicated = (np.flatnonzero(steps == 0) + 1).tolist()
+            backwards = (np.flatnonzero(steps < 0) + 1).tolist()
+        else:
+            duplicated = [i for i in range(1, len(ordinals)) if ordinals[i] == ordinals[i - 1]]
+            backwards = [i for i in range(1, len(ordinals)) if ordinals[i] < ordinals[i - 1]]
+        errors = [f"✗ {label}的日期重复: {dates[i]}" for i in duplicated]
+        errors += [f"✗ {label}的日期未按升序排列: {dates[i]} 在 {dates[i - 1]} 之后" for i in backwards]
+        return errors
+
+    def _check_workout_dates(self) -> List[str]:
+        """workouts中每条训练项目的日期与所在的键一致"""
+        if np is not None and self.item_dates:
+            expected = np.repeat(np.array(self.dates), self.item_counts)
+            mismatched = np.flatnonzero(np.array(self.item_dates) != expected).tolist()
+        else:
+            expected = [date for date, count in zip(self.dates, self.item_counts) for _ in range(count)]
+            mismatched = [i for i, date in enumerate(self.item_dates) if date != expected[i]]
+        owners = _owners(self.item_counts, mismatched)
+        offsets = _offsets(self.item_counts)
+        return [f"✗ {self.dates[owner]}的训练记录{i - offsets[owner]}的日期为{self.item_dates[i]}，与键不一致"
+                for i, owner in zip(mismatched, owners)]
+
+    def _check_intake(self) -> List[str]:
+        """calorieIntake等于当天meals热量之和"""
+        calories, counts = self.values['meals.calories'], self.item_counts
+        if np is not None:
+            cumulative = np.concatenate(([0], np.cumsum(np.asarray(calories, dtype=np.float64))))
+            offsets = np.concatenate(([0], np.cumsum(np.asarray(counts, dtype=np.int64))))
+            sums = cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+            wrong = np.flatnonzero(np.abs(sums - np.asarray(self.intake, dtype=np.float64))
+                                   > CALORIE_TOLERANCE).tolist()
+            sums = sums.tolist()
+        else:
+            offsets = _offsets(counts)
+            sums = [sum(calories[offsets[k]:offsets[k + 1]]) for k in range(len(counts))]
+            wrong = [k for k in range(len(counts)) if abs(sums[k] - self.intake[k]) > CALORIE_TOLERANCE]
+        return [f"✗ 营养记录{self.dates[k]}的calorieIntake({self.intake[k]})"
+                f"与meals的热量之和({_number(sums[k])})不一致" for k in wrong]
+
+    def _check_ranges(self) -> List[str]:
+        """数值在生成器的取值范围内"""
+        errors = []
+        label = _LABELS[self.section]
+        for field, (low, high) in VALUE_RANGES[self.section].items():
+            values = self.values[field]
+            if np is not None:
+                array = np.asarray(values, dtype=np.float64)
+                outside = np.flatnonzero(~((array >= low) & (array <= high))).tolist()
+            else:
+                outside = [i for i, value in enumerate(values) if not low <= value <= high]
+            name = field.replace('meals.', 'meals中的')
+            errors += [f"✗ {label}{date}的{name}={values[i]}超出范围[{low}, {high}]"
+                       for i, date in zip(outside, self._record_dates(field, outside))]
+        return errors
+
+
+def _number(value: float) -> Any:
+    return int(value) if float(value).is_integer() else value
+
+
+def _offsets(counts: Sequence[int]) -> List[int]:
+    offsets = [0]
+    for count in counts:
+        offsets.append(offsets[-1] + count)
+    return offsets
+
+
+def _owners(counts: Sequence[int], indexes: Sequence[int]) -> List[int]:
+    """按每天的项目数把展开后的序号对应到所在的天"""
+    if not indexes:
+        return []
+    if np is not None:
+        return np.searchsorted(np.cumsum(counts), indexes, side='right').tolist()
+    offsets = _offsets(counts)[1:]
+    return [bisect.bisect_right(offsets, i) for i in indexes]
+
+
+def _date_ordinals(dates: List[str]) -> Tuple[Any, List[int]]:
+    """日期序数(数组或列表)及格式无效的日期序号"""
+    if np is not None:
+        try:
+            # 只接受YYYY-MM-DD，NumPy也接受的YYYY-MM等形式按无效处理
+            if all(len(date) == 10 for date in dates):
+                return np.array(dates, dtype='datetime64[D]').astype(np.int64), []
+        except ValueError:
+            pass
+    ordinals, invalid = [], []
+    for i, date in enumerate(dates):
+        try:
+            ordinals.append(datetime.date.fromisoformat(date).toordinal() if len(date) == 10 else None)
+        except ValueError:
+            ordinals.append(None)
+        if ordinals[-1] is None:
+            invalid.append(i)
+    return ordinals, invalid
+
+
+def check_section_semantics(section: str, value: Any) -> List[str]:
+    """对一个部分(已通过字段和类型检查)做语义检查；没有语义检查的部分返回空列表"""
+    if section not in SEMANTIC_SECTIONS:
+        return []
+    columns = SectionColumns(section)
+    columns.extend(value)
+    return columns.check()
+
+
+def check_export_semantics(export_data: Dict[str, Any]) -> List[str]:
+    """对完整的导出数据(已通过字段和类型检查)做语义检查，返回全部错误信息"""
+    errors = []
+    for section in SEMANTIC_SECTIONS:
+        errors += check_section_semantics(section, export_data['data'][section])
+    return errors
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+SQLite批量导入
+把FitnessDataGenerator生成的数据或已有的导出文件直接写入与应用相同结构的SQLite数据库
+(表结构见lib/services/database_service.dart)，用于在大数据量下测试应用的数据库性能
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, List, Any, Optional
+
+# 与database_service.dart中onCreate创建的表结构一致
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        height REAL,
+        created_at TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS weights (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date TEXT NOT NULL,
+        value REAL NOT NULL,
+        created_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS workouts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date TEXT NOT NULL,
+        name TEXT NOT NULL,
+        sets INTEGER NOT NULL,
+        is_completed INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS nutrition (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date TEXT NOT NULL,
+        meal_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        calories INTEGER NOT NULL,
+        amount TEXT,
+        created_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS body_fat (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date TEXT NOT NULL,
+        percentage REAL NOT NULL,
+        created_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS user_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        setting_key TEXT NOT NULL,
+        setting_value TEXT NOT NULL,
+        updated_at TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id),
+        UNIQUE(user_id, setting_key)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS media (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        type TEXT NOT NULL,
+        path TEXT NOT NULL,
+        description TEXT,
+        created_at TEXT
+    )'''
+]
+
+# 导入完成后再创建的索引(应用按用户和日期查询记录)
+INDEXES = {
+    'idx_weights_user_date': 'weights(user_id, date)',
+    'idx_workouts_user_date': 'workouts(user_id, date)',
+    'idx_nutrition_user_date': 'nutrition(user_id, date)',
+    'idx_body_fat_user_date': 'body_fat(user_id, date)'
+}
+
+INSERT_SQL = {
+    'weights': 'INSERT INTO weights (user_id, date, value, created_at) VALUES (?, ?, ?, ?)',
+    'workouts': 'INSERT INTO workouts (user_id, date, name, sets, is_completed, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+    'nutrition': ('INSERT INTO nutrition (user_id, date, meal_type, name, calories, amount, created_at) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?)'),
+    'body_fat': 'INSERT INTO body_fat (user_id, date, percentage, created_at) VALUES (?, ?, ?, ?)'
+}
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# 与应用中的示例用户一致(data_manager.dart)
+DEMO_EMAIL = 'demo@fitlog.com'
+DEMO_PASSWORD = 'demo123'
+# 应用导入饮食记录时填充的份量
+DEFAULT_AMOUNT = '1份'
+
+
+def _dart_iso(date: datetime.datetime) -> str:
+    """与Dart的DateTime.toIso8601String()相同的格式(毫秒固定3位，有微秒时再加3位)"""
+    text = date.strftime('%Y-%m-%dT%H:%M:%S') + f".{date.microsecond // 1000:03d}"
+    if date.microsecond % 1000:
+        text += f"{date.microsecond % 1000:03d}"
+    return text
+
+
+@functools.lru_cache(maxsize=4096)
+def _app_datetime(value: str) -> str:
+    """导出文件中的日期字符串 -> 应用写入数据库的格式(DateTime.parse后toIso8601String)"""
+    return _dart_iso(datetime.datetime.fromisoformat(value))
+
+
+def _dart_round(x: float) -> int:
+    """Dart的num.round()：四舍五入，.5远离0"""
+    return int(math.floor(abs(x) + 0.5)) * (1 if x >= 0 else -1)
+
+
+class SqliteBulkLoader:
+    """
+    批量写入器
+
+    记录先按表缓存，累计chunk_rows行后在一个事务中用executemany写入；
+    数据库使用WAL模式，用户和日期索引在导入完成后创建。
+    """
+
+    def __init__(self, db_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.db_path = db_path
+        self.chunk_rows = chunk_rows
+        # 手动管理事务
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        # 索引会拖慢批量插入，先删除，导入完成后重建
+        for name in INDEXES:
+            self.conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+        self.created_at = _dart_iso(datetime.datetime.now())
+        self._pending: Dict[str, List[tuple]] = {table: [] for table in INSERT_SQL}
+        self._pending_rows = 0
+        self.rows = {table: 0 for table in ['users', 'user_settings', *INSERT_SQL]}
+        self.chunks = 0
+        self.load_seconds = 0.0
+        self.index_seconds = 0.0
+        self._start_time = time.perf_counter()
+
+    def add_user(self, user_settings: Dict[str, Any], email: Optional[str] = None,
+                 password: str = DEMO_PASSWORD) -> int:
+        """创建用户及其设置，返回用户id；未指定邮箱时第一个用户使用应用的示例账号"""
+        if email is None:
+            count = self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            email = DEMO_EMAIL if count == 0 else f"demo{count + 1}@fitlog.com"
+        cursor = self.conn.execute(
+            'INSERT INTO users (name, email, password, height, created_at) VALUES (?, ?, ?, ?, ?)',
+            (user_settings.get('name', ''), email, password, user_settings.get('height'), self.created_at))
+        self.rows['users'] += 1
+        self.set_user_settings(cursor.lastrowid, user_settings)
+        return cursor.lastrowid
+
+    def set_user_settings(self, user_id: int, user_settings: Dict[str, Any]) -> None:
+        """写入用户设置(非字符串的值以JSON保存)，并同步用户表中的姓名和身高"""
+        if not user_settings:
+            return
+        self.conn.execute('BEGIN')
+        self.conn.execute('UPDATE users SET name = ?, height = ? WHERE id = ?',
+                          (user_settings.get('name', ''), user_settings.get('height'), user_id))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO user_settings (user_id, setting_key, setting_value, updated_at) '
+            'VALUES (?, ?, ?, ?)',
+            [(user_id, key, value if isinstance(value, str) else json.dumps(value, ensure_ascii=False),
+              self.created_at) for key, value in user_settings.items()])
+        self.conn.execute('COMMIT')
+        self.rows['user_settings'] += len(user_settings)
+
+    def add_record(self, user_id: int, section: str, key: Optional[str], value: Any) -> None:
+        """按应用的导入逻辑(export_service.dart)把一条导出记录转换为数据库行"""
+        created_at = self.created_at
+        pending = self._pending
+        if section == 'weights':
+            pending['weights'].append((user_id, _app_datetime(value['date']), value['weight'], created_at))
+            added = 1
+        elif section == 'bodyFat':
+            pending['body_fat'].append((user_id, value['date'][:10], value['bodyFatPercentage'], created_at))
+            added = 1
+        elif section == 'workouts':
+            rows = pending['workouts']
+            for workout in value:
+                rows.append((user_id, _app_datetime(workout['date']), workout['name'], workout['sets'],
+                             1 if workout['isCompleted'] else 0, created_at))
+            added = len(value)
+        elif section == 'nutrition':
+            date = _app_datetime(value['date'])
+            rows = pending['nutrition']
+            before = len(rows)
+            for meal in value['meals']:
+                foods = meal['foods']
+                if foods:
+                    # 每个食物一条记录，热量平均分配
+                    calories = _dart_round(meal['calories'] / len(foods))
+                    for food in foods:
+                        rows.append((user_id, date, meal['name'], str(food), calories, DEFAULT_AMOUNT, created_at))
+                elif meal['calories'] > 0:
+                    rows.append((user_id, date, meal['name'], f"{meal['name']}餐", meal['calories'],
+                                 DEFAULT_AMOUNT, created_at))
+            added = len(rows) - before
+        else:
+            raise ValueError(f"未知的数据部分: {section}")
+
+        self._pending_rows += added
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """在一个事务中写入缓存的行"""
+        if not self._pending_rows:
+            return
+        start = time.perf_counter()
+        self.conn.execute('BEGIN')
+        for table, rows in self._pending.items():
+            if rows:
+                self.conn.executemany(INSERT_SQL[table], rows)
+                self.rows[table] += len(rows)
+                rows.clear()
+        self.conn.execute('COMMIT')
+        self._pending_rows = 0
+        self.chunks += 1
+        self.load_seconds += time.perf_counter() - start
+
+    def remove_user(self, user_id: int) -> None:
+        """删除一个用户及其已写入和尚未写入的全部行(导入失败时使用)"""
+        for table, rows in self._pending.items():
+            kept = [row for row in rows if row[0] != user_id]
+            self._pending_rows -= len(rows) - len(kept)
+            rows[:] = kept
+        self.conn.execute('BEGIN')
+        for table in [*INSERT_SQL, 'user_settings']:
+            deleted = self.conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,)).rowcount
+            self.rows[table] -= deleted
+        self.rows['users'] -= self.conn.execute('DELETE FROM users WHERE id = ?', (user_id,)).rowcount
+        self.conn.execute('COMMIT')
+
+    def close(self) -> Dict[str, Any]:
+        """写入剩余的行、创建索引并关闭数据库，返回统计信息"""
+        self.flush()
+        start = time.perf_counter()
+        for name, target in INDEXES.items():
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+        self.conn.execute('ANALYZE')
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.index_seconds = time.perf_counter() - start
+        self.conn.close()
+
+        elapsed = time.perf_counter() - self._start_time
+        total = sum(self.rows.values())
+        return {
+            "rows": dict(self.rows),
+            "totalRows": total,
+            "chunks": self.chunks,
+            "insertSeconds": round(self.load_seconds, 3),
+            "indexSeconds": round(self.index_seconds, 3),
+            "elapsedSeconds": round(elapsed, 3),
+            "rowsPerSecond": round(total / max(elapsed, 1e-9), 1)
+        }
+
+
+def load_export_file(loader: SqliteBulkLoader, path: str) -> int:
+    """导入一个导出文件(任意格式)，返回用户id；文件中途出错时删除该用户已导入的行"""
+    from export_formats import iter_file_records
+
+    records, user_settings = iter_file_records(path)
+    # 用户设置可能位于文件末尾，先创建用户再补写设置
+    user_id = loader.add_user({})
+    try:
+        for record in records:
+            loader.add_record(user_id, *record)
+        loader.set_user_settings(user_id, user_settings)
+    except BaseException:
+        if loader.conn.in_transaction:
+            loader.conn.execute('ROLLBACK')
+        loader.remove_user(user_id)
+        raise
+    return user_id
+
+
+def load_generator(loader: SqliteBulkLoader, generator) -> int:
+    """逐天生成并导入一个FitnessDataGenerator的数据，返回用户id"""
+    from export_formats import iter_day_records
+
+    user_id = loader.add_user(generator._build_user_settings())
+    for day in generator.iter_days():
+        for record in iter_day_records(day):
+            loader.add_record(user_id, *record)
+    return user_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把演示数据批量导入与应用结构相同的SQLite数据库')
+    parser.add_argument('inputs', nargs='*', help='要导入的导出文件(任意格式)，每个文件作为一个用户；省略时直接生成数据')
+    parser.add_argument('--db', type=str, default='fitness_app.db', help='SQLite数据库文件 (默认: fitness_app.db)')
+    parser.add_argument('--days', type=int, default=365, help='直接生成时的天数 (默认: 365)')
+    parser.add_argument('--users', type=int, default=1, help='直接生成时的用户数量 (默认: 1)')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子')
+    parser.add_argument('--start-date', type=str, default=None, help='开始日期 YYYY-MM-DD (默认: 使数据截止到今天)')
+    parser.add_argument('--english', action='store_true', help='使用英文名称生成数据')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'每个事务写入的行数 (默认: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--replace', action='store_true', help='导入前删除已有的数据库文件')
+    args = parser.parse_args()
+
+    if args.replace:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    loader = SqliteBulkLoader(args.db, chunk_rows=args.chunk_rows)
+    try:
+        if args.inputs:
+            for path in args.inputs:
+                print(f"正在导入 {path} ...")
+                try:
+                    load_export_file(loader, path)
+                except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+                    # 该文件的数据已全部删除，之前导入的文件保留
+                    raise ValueError(f"{path}: {e}，该文件已导入的数据已删除") from e
+        else:
+            from fleet_generation import _build_generator
+            from generate_demo_data_final import FitnessDataGenerator
+
+            start_date = datetime.datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+            print(f"正在为 {args.users} 个用户生成 {args.days} 天的数据并导入 {args.db} ...")
+            for user_index in range(args.users):
+                if args.users == 1:
+                    generator = FitnessDataGenerator(days=args.days, start_date=start_date,
+                                                     english_names=args.english, seed=args.seed)
+                else:
+                    # 多个用户时使用与批量生成相同的用户画像
+                    if start_date is None:
+                        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+                        start_date = today - datetime.timedelta(days=args.days - 1)
+                    seed = args.seed if args.seed is not None else 0
+                    generator = _build_generator(seed, user_index, args.days, start_date, args.english, 'auto')
+                load_generator(loader, generator)
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"✗ 导入失败: {e}")
+        return 1
+    finally:
+        stats = loader.close()
+
+    print(f"✓ 数据已导入 {args.db}")
+    print(f"\n导入统计:")
+    for table, count in stats['rows'].items():
+        print(f"- {table}: {count} 行")
+    print(f"- 事务数: {stats['chunks']}")
+    print(f"- 插入耗时: {stats['insertSeconds']:.2f} 秒, 建索引耗时: {stats['indexSeconds']:.2f} 秒")
+    print(f"- 总耗时: {stats['elapsedSeconds']:.2f} 秒 ({stats['rowsPerSecond']:.0f} 行/秒)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+压力测试数据配置
+命名的生成配置(超长历史、每天数百餐、稀疏断续、活跃度偏斜、海量训练日期键)，
+以及按目标字节数或记录数确定生成天数，用于寻找应用导入功能的规模上限
+"""
+
+import datetime
+import io
+import math
+import re
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from export_writer import SECTIONS, RecordFormatter, StreamingExportWriter
+
+# 默认配置：与原有生成规则一致(每天都有体重、体脂、1-4个训练项目和1-4餐)
+DEFAULT_STRESS_PROFILE = {
+    "description": "默认的均匀数据",
+    # 未指定--days时的天数(None表示使用命令行的默认值)
+    "days": None,
+    # 各部分每天有记录的概率
+    "presence": {"weights": 1.0, "bodyFat": 1.0, "workouts": 1.0, "nutrition": 1.0},
+    # 星期一到星期日的训练概率系数(None表示不区分)
+    "weekday_activity": None,
+    # 每天训练项目数的范围(不超过训练模板数)
+    "workouts_per_day": (1, 4),
+    # 每天餐数的范围(None表示1到餐食模板数)；超过模板数时重复使用模板
+    "meals_per_day": None,
+    # 暴食日的概率及当天的餐数范围
+    "burst_rate": 0.0,
+    "burst_meals": None,
+    # 整周完全没有记录的概率
+    "inactive_week_rate": 0.0,
+}
+
+STRESS_PROFILES = {
+    "uniform": {},
+    "long-history": {
+        "description": "100年的完整历史",
+        "days": 36500,
+    },
+    "meal-heavy": {
+        "description": "每天100-300餐(300-900个MealEntry)",
+        "days": 365,
+        "meals_per_day": (100, 300),
+    },
+    "sparse": {
+        "description": "稀疏断续的记录，约四分之一的周完全空白",
+        "days": 3650,
+        "presence": {"weights": 0.35, "bodyFat": 0.15, "workouts": 0.2, "nutrition": 0.4},
+        "inactive_week_rate": 0.25,
+    },
+    "skewed": {
+        "description": "集中在周末的训练和偶尔出现的暴食日",
+        "days": 3650,
+        "weekday_activity": (0.1, 0.05, 0.1, 0.05, 0.2, 1.0, 1.0),
+        "workouts_per_day": (1, 13),
+        "meals_per_day": (1, 2),
+        "burst_rate": 0.03,
+        "burst_meals": (40, 120),
+    },
+    "workout-keys": {
+        "description": "10万天每天都有训练，workouts字典有10万个日期键",
+        "days": 100000,
+        "presence": {"weights": 0.0, "bodyFat": 0.0, "workouts": 1.0, "nutrition": 0.0},
+    },
+}
+
+# 按目标大小确定天数时，估算每天平均大小的抽样天数
+TARGET_SAMPLE_DAYS = 366
+# 按精确天数移动开始日期、使数据截止到今天的最大轮数
+TARGET_REFINE_ROUNDS = 4
+# 按目标大小生成的最大天数
+TARGET_MAX_DAYS = 1000000
+
+_SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def resolve_profile(profile: Optional[Any]) -> Dict[str, Any]:
+    """把配置名称或部分配置补全为完整配置(None表示默认配置)"""
+    if profile is None:
+        return dict(DEFAULT_STRESS_PROFILE)
+    if isinstance(profile, str):
+        if profile not in STRESS_PROFILES:
+            raise ValueError(f"未知的压力测试配置: {profile}，可选: {', '.join(STRESS_PROFILES)}")
+        profile = STRESS_PROFILES[profile]
+    resolved = dict(DEFAULT_STRESS_PROFILE)
+    resolved.update(profile)
+    resolved["presence"] = {**DEFAULT_STRESS_PROFILE["presence"], **profile.get("presence", {})}
+    return resolved
+
+
+def parse_size(text: str) -> int:
+    """解析字节数，支持K/M/G/T后缀(1024进制)，如 500M、1.5G"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"无法解析的大小: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def _empty_export_bytes(generator) -> int:
+    """没有任何记录时导出文件的字节数(文件头、空的各部分和userSettings)"""
+    buffer = io.StringIO()
+    StreamingExportWriter(buffer).close(generator._build_user_settings())
+    return len(buffer.getvalue().encode('utf-8'))
+
+
+def measure_days(generator, target_bytes: Optional[int] = None,
+                 target_records: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    从第0天开始逐块生成，求输出达到目标所需的最少天数
+
+    字节数按缩进为2的JSON导出文件(与json.dump(indent=2)一致)精确计算，只按记录数时不序列化；
+    记录数为体重、体脂、营养记录和训练项目的总数。在generator.days天内达不到目标时返回generator.days。
+
+    Returns:
+        (天数, 该天数下的字节数(只按记录数时为None), 该天数下的记录数)
+    """
+    fmt = RecordFormatter(2)
+    # 每个元素前有换行缩进，除每部分第一个元素外还有逗号；非空部分在结束括号前多一个换行缩进
+    item_overhead = len(fmt.newline(3))
+    closing_overhead = len(fmt.newline(2))
+    total_bytes = _empty_export_bytes(generator)
+    records = 0
+    counts = dict.fromkeys(SECTIONS, 0)
+
+    for table in generator.iter_tables():
+        day_bytes = [0] * table.count
+        day_records = [table.has_weight[k] + table.has_body_fat[k] + table.has_nutrition[k]
+                       + table.workout_offsets[k + 1] - table.workout_offsets[k] for k in range(table.count)]
+        if target_bytes is not None:
+            k = 0
+            for section, item, date, _ in table.format_items(fmt):
+                while table.dates[k] != date:
+                    k += 1
+                day_bytes[k] += (len(item.encode('utf-8')) + item_overhead
+                                 + (1 if counts[section] else closing_overhead))
+                counts[section] += 1
+        for k in range(table.count):
+            total_bytes += day_bytes[k]
+            records += day_records[k]
+            if (records >= target_records) if target_records is not None else (total_bytes >= target_bytes):
+                return table.first_day + k + 1, total_bytes if target_bytes is not None else None, records
+    return generator.days, total_bytes if target_bytes is not None else None, records
+
+
+def days_for_target(make_generator: Callable[[int, datetime.datetime], Any],
+                    start_date: Optional[datetime.datetime] = None, target_bytes: Optional[int] = None,
+                    target_records: Optional[int] = None) -> Tuple[int, datetime.datetime, int, int]:
+    """
+    确定达到目标字节数或记录数所需的天数
+
+    make_generator(天数, 开始日期)返回生成器，种子等其他参数须固定。每天的数据只由种子和日期决定，
+    所以未指定开始日期时，先按抽样估算的天数把开始日期设在数据截止到今天附近，再从该日期精确计算；
+    精确计算的结束日期与今天不同时，按精确的天数移动开始日期后重新计算，最多TARGET_REFINE_ROUNDS轮。
+    仍未收敛时(移动后天数又有变化)选择结束日期不晚于今天且最接近今天的一轮，都晚于今天时选择最早结束的一轮。
+
+    Returns:
+        (天数, 开始日期, 字节数(只按记录数时为None), 记录数)
+    """
+    if (target_bytes is None) == (target_records is None):
+        raise ValueError("必须且只能指定目标字节数或目标记录数之一")
+    target = target_bytes if target_bytes is not None else target_records
+    if target <= 0:
+        raise ValueError("目标大小必须大于0")
+
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    if start_date is None:
+        sample_start = today - datetime.timedelta(days=TARGET_SAMPLE_DAYS - 1)
+        sample = make_generator(TARGET_SAMPLE_DAYS, sample_start)
+        if target_bytes is not None:
+            empty_bytes = _empty_export_bytes(sample)
+            sample_bytes = measure_days(sample, target_bytes=1 << 62)[1]
+            per_day, target = (sample_bytes - empty_bytes) / TARGET_SAMPLE_DAYS, target - empty_bytes
+        else:
+            per_day = measure_days(sample, target_records=1 << 62)[2] / TARGET_SAMPLE_DAYS
+        estimate = min(max(math.ceil(target / per_day), 1), TARGET_MAX_DAYS) if per_day > 0 else TARGET_MAX_DAYS
+        candidates = []
+        for _ in range(TARGET_REFINE_ROUNDS):
+            start_date = datetime.datetime.fromordinal(max(today.toordinal() - estimate + 1, 1))
+            result = _measure_from(make_generator, start_date, target_bytes, target_records)
+            candidates.append((start_date, result))
+            if result[0] == estimate or start_date.toordinal() == 1:
+                break
+            estimate = result[0]
+        # 结束日期不晚于今天的优先，其中最接近今天的；都晚于今天时选择结束最早的
+        start_date, result = max(candidates, key=lambda candidate: (
+            candidate[0] + datetime.timedelta(days=candidate[1][0] - 1) <= today,
+            -abs((candidate[0] + datetime.timedelta(days=candidate[1][0] - 1) - today).days)))
+        return result[0], start_date, result[1], result[2]
+
+    days, total_bytes, records = _measure_from(make_generator, start_date, target_bytes, target_records)
+    return days, start_date, total_bytes, records
+
+
+def _measure_from(make_generator: Callable[[int, datetime.datetime], Any], start_date: datetime.datetime,
+                  target_bytes: Optional[int], target_records: Optional[int]) -> Tuple[int, int, int]:
+    # 日期不能超过9999-12-31
+    limit = min(TARGET_MAX_DAYS, (datetime.datetime(9999, 12, 31) - start_date).days + 1)
+    return measure_days(make_generator(limit, start_date), target_bytes, target_records)
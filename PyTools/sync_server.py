@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+本地模拟同步服务器
+基于asyncio的HTTP服务，按用户序号和日期范围即时生成演示数据，以分块传输编码流式返回导出文件，
+用于对应用的导入/同步流程做压力测试。生成和序列化在进程池中执行，不阻塞事件循环；
+较小的响应按LRU策略缓存在内存中，缓存总大小有上限。
+
+接口:
+    GET /users/<用户序号>/export?start=YYYY-MM-DD&end=YYYY-MM-DD&lang=cn|en
+    GET /stats
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from export_writer import SECTIONS, RecordFormatter
+from fleet_generation import _build_generator, make_user_profile
+
+DEFAULT_PORT = 8765
+# 用户数据时间轴的默认起点；同一用户任意日期范围的数据都是这条时间轴的一部分，范围重叠时内容一致
+DEFAULT_ORIGIN = '2020-01-01'
+# 每个进程池任务生成的天数
+DEFAULT_CHUNK_DAYS = 1024
+# 单个响应同时在进程池中排队的任务数
+PIPELINE_DEPTH = 4
+# 请求头的最大字节数
+MAX_HEADER_BYTES = 16 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class ResponseCache:
+    """按总字节数限制大小的LRU响应缓存；超过max_entry_bytes的响应不缓存"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'collections.OrderedDict[Tuple, bytes]' = collections.OrderedDict()
+
+    def peek(self, key: Tuple) -> Optional[bytes]:
+        """查找缓存但不计入命中/未命中次数"""
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        body = self.peek(key)
+        self.record(body is not None)
+        return body
+
+    def put(self, key: Tuple, body: bytes) -> bool:
+        if len(body) > self.max_entry_bytes:
+            return False
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+# === 进程池任务(参数只包含基本类型，便于序列化) ===
+
+def _walk_states(params: Tuple, boundaries: List[int]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """进程池任务：计算各分块开始前一天的(体重, 体脂)游走状态"""
+    generator = _build_generator(*params)
+    last = max(boundaries, default=0)
+    walks = [generator._random_walk(walk, 0, last) for walk in ('weight', 'bodyFat')]
+    return [(walks[0][b - 1], walks[1][b - 1]) if b > 0 else (None, None) for b in boundaries]
+
+
+def _format_section_chunk(task: Tuple) -> Tuple[str, int]:
+    """
+    进程池任务：生成并序列化一个分块中某个部分的记录
+
+    Returns:
+        (以逗号连接、每个元素前带换行缩进的文本, 元素个数)
+    """
+    params, section, start, stop, walk_states = task
+    generator = _build_generator(*params)
+    table = generator.build_day_table(start, stop, sections=(section,), walk_states=walk_states)
+    fmt = RecordFormatter(2)
+    prefix = fmt.newline(3)
+    items = [prefix + item for item_section, item, _, _ in table.format_items(fmt) if item_section == section]
+    return ','.join(items), len(items)
+
+
+class ExportRequest:
+    """一次导出请求：用户、日期范围和语言对应的生成参数"""
+
+    def __init__(self, user: int, start: datetime.date, end: datetime.date, english: bool,
+                 origin: datetime.date, seed: int, backend: str):
+        self.user = user
+        self.start = start
+        self.end = end
+        self.english = english
+        self.first_day = (start - origin).days
+        self.stop_day = (end - origin).days + 1
+        origin_time = datetime.datetime.combine(origin, datetime.time())
+        # 与fleet_generation._build_generator的参数顺序一致
+        self.params = (seed, user, self.stop_day, origin_time, english, backend)
+        self.user_settings = make_user_profile(seed, user, english)["user_settings"]
+
+    @property
+    def cache_key(self) -> Tuple:
+        return self.user, self.start, self.end, self.english
+
+    def chunks(self, chunk_days: int) -> List[Tuple[int, int]]:
+        return [(b, min(b + chunk_days, self.stop_day)) for b in range(self.first_day, self.stop_day, chunk_days)]
+
+
+class SyncServer:
+    """模拟同步服务器：解析HTTP请求，把生成任务交给进程池，并以分块传输编码写回"""
+
+    def __init__(self, executor: ProcessPoolExecutor, cache: ResponseCache, origin: datetime.date,
+                 seed: int, english: bool = False, backend: str = 'auto', max_days: int = 36500,
+                 chunk_days: int = DEFAULT_CHUNK_DAYS):
+        self.executor = executor
+        self.cache = cache
+        self.origin = origin
+        self.seed = seed
+        self.english = english
+        self.backend = backend
+        self.max_days = max_days
+        self.chunk_days = chunk_days
+        self.started = time.time()
+        self.requests = 0
+        self.active = 0
+        self.bytes_sent = 0
+        self.shared = 0
+        # 正在生成的响应：同一请求并发到达时等待第一个请求的结果，而不是重复生成
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    # === HTTP ===
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个连接上的请求(支持HTTP/1.1长连接)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, 400, "请求头过长", keep_alive=False)
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split(' ')
+                if len(parts) != 3:
+                    await self._send_error(writer, 400, "无法解析请求行", keep_alive=False)
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                self.requests += 1
+                self.active += 1
+                try:
+                    await self._dispatch(method, target, writer, keep_alive)
+                finally:
+                    self.active -= 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, method: str, target: str, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        url = urlsplit(target)
+        path = url.path.rstrip('/').split('/')
+        if method != 'GET':
+            await self._send_error(writer, 405, f"不支持的请求方法: {method}", keep_alive)
+        elif url.path == '/stats':
+            await self._send_body(writer, 200, json.dumps(self.stats(), ensure_ascii=False).encode('utf-8'),
+                                  keep_alive)
+        elif len(path) == 4 and path[1] == 'users' and path[3] == 'export':
+            try:
+                request = self._parse_export(path[2], parse_qs(url.query))
+            except ValueError as e:
+                await self._send_error(writer, 400, str(e), keep_alive)
+                return
+            await self._send_export(writer, request, keep_alive)
+        else:
+            await self._send_error(writer, 404, f"未知的路径: {url.path}", keep_alive)
+
+    def _parse_export(self, user: str, query: Dict[str, List[str]]) -> ExportRequest:
+        if not user.isdigit():
+            raise ValueError(f"无效的用户序号: {user}")
+
+        def date_param(name: str, default: datetime.date) -> datetime.date:
+            if name not in query:
+                return default
+            try:
+                return datetime.datetime.strptime(query[name][0], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f"无效的日期 {name}={query[name][0]}，应为 YYYY-MM-DD")
+
+        end = date_param('end', datetime.date.today())
+        start = date_param('start', end - datetime.timedelta(days=364))
+        if start < self.origin:
+            raise ValueError(f"开始日期 {start} 早于数据时间轴的起点 {self.origin}")
+        if start > end:
+            raise ValueError(f"开始日期 {start} 晚于结束日期 {end}")
+        if (end - self.origin).days >= self.max_days:
+            raise ValueError(f"结束日期 {end} 超出数据时间轴的范围(起点之后 {self.max_days} 天)")
+        lang = query.get('lang', ['en' if self.english else 'cn'])[0]
+        if lang not in ('cn', 'en'):
+            raise ValueError(f"未知的语言: {lang}")
+        return ExportRequest(int(user), start, end, lang == 'en', self.origin, self.seed, self.backend)
+
+    @staticmethod
+    def _head(status: int, headers: List[Tuple[str, str]], keep_alive: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_body(self, writer: asyncio.StreamWriter, status: int, body: bytes, keep_alive: bool,
+                         extra_headers: Tuple[Tuple[str, str], ...] = ()) -> None:
+        headers = [('Content-Type', 'application/json; charset=utf-8'), ('Content-Length', str(len(body)))]
+        writer.write(self._head(status, headers + list(extra_headers), keep_alive) + body)
+        self.bytes_sent += len(body)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: int, message: str, keep_alive: bool) -> None:
+        await self._send_body(writer, status, json.dumps({"error": message}, ensure_ascii=False).encode('utf-8'),
+                              keep_alive)
+
+    # === 导出数据 ===
+
+    async def _send_export(self, writer: asyncio.StreamWriter, request: ExportRequest, keep_alive: bool) -> None:
+        key = request.cache_key
+        shared = False
+        while True:
+            body = self.cache.peek(key)
+            pending = self._inflight.get(key)
+            if body is not None or pending is None:
+                break
+            # 响应超过缓存单项上限或生成它的客户端断开时结果为None，重新检查：
+            # 其他等待者可能已经开始生成，否则由自己生成
+            body = await asyncio.shield(pending)
+            if body is not None:
+                shared = True
+                break
+        # 每个请求只计数一次：共享进行中的响应、缓存命中或由自己生成(未命中)
+        if shared:
+            self.shared += 1
+        else:
+            self.cache.record(body is not None)
+        if body is not None:
+            await self._send_body(writer, 200, body, keep_alive, (('X-Cache', 'HIT'),))
+            return
+
+        done = self._inflight[key] = asyncio.get_running_loop().create_future()
+        body = None
+        try:
+            body = await self._stream_export(writer, request, keep_alive)
+        finally:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            done.set_result(body)
+        if body is not None:
+            self.cache.put(key, body)
+
+    async def _stream_export(self, writer: asyncio.StreamWriter, request: ExportRequest,
+                             keep_alive: bool) -> Optional[bytes]:
+        """以分块传输编码写出导出数据，返回可缓存的完整响应(超过单项上限时为None)"""
+        headers = [('Content-Type', 'application/json; charset=utf-8'), ('Transfer-Encoding', 'chunked'),
+                   ('X-Cache', 'MISS')]
+        writer.write(self._head(200, headers, keep_alive))
+        # 累积不超过单项上限的响应，完成后放入缓存
+        parts: Optional[List[bytes]] = []
+        size = 0
+        stream = self._iter_export(request)
+        try:
+            async for text in stream:
+                data = text.encode('utf-8')
+                writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.bytes_sent += len(data)
+                await writer.drain()
+                if parts is not None:
+                    size += len(data)
+                    parts = parts if size <= self.cache.max_entry_bytes else None
+                    if parts is not None:
+                        parts.append(data)
+        finally:
+            # 客户端断开时取消尚未开始的生成任务
+            await stream.aclose()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return b''.join(parts) if parts is not None else None
+
+    async def _iter_export(self, request: ExportRequest):
+        """
+        按顺序产出导出文件的文本片段
+
+        拼接结果与对同一日期范围的数据调用json.dump(indent=2, ensure_ascii=False)一致(exportDate为请求时间)。
+        每个部分按分块提交到进程池，最多PIPELINE_DEPTH个任务同时排队，片段按提交顺序写出。
+        """
+        loop = asyncio.get_running_loop()
+        fmt = RecordFormatter(2)
+        chunks = request.chunks(self.chunk_days)
+        states = await loop.run_in_executor(self.executor, _walk_states, request.params,
+                                            [start for start, _ in chunks])
+        tasks = [(request.params, section, start, stop, state)
+                 for section in SECTIONS for (start, stop), state in zip(chunks, states)]
+
+        yield ('{' + fmt.newline(1) + fmt.key('version') + '"1.0",'
+               + fmt.newline(1) + fmt.key('exportDate') + fmt.dumps_str(datetime.datetime.now().isoformat()) + ','
+               + fmt.newline(1) + fmt.key('data') + '{')
+        pending = collections.deque()
+        counts = dict.fromkeys(SECTIONS, 0)
+        current = None
+        submitted = 0
+        try:
+            while submitted < len(tasks) or pending:
+                while submitted < len(tasks) and len(pending) < PIPELINE_DEPTH:
+                    task = tasks[submitted]
+                    pending.append((task[1], loop.run_in_executor(self.executor, _format_section_chunk, task)))
+                    submitted += 1
+                section, future = pending.popleft()
+                text, count = await future
+                pieces = []
+                if section != current:
+                    # 每个部分至少有一个分块，各部分按SECTIONS的顺序依次出现
+                    if current is not None:
+                        pieces.append(self._close_section(fmt, current, counts[current]) + ',')
+                    pieces.append(fmt.newline(2) + fmt.key(section) + ('{' if section == 'workouts' else '['))
+                    current = section
+                if count:
+                    pieces.append((',' if counts[section] else '') + text)
+                    counts[section] += count
+                if pieces:
+                    yield ''.join(pieces)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+        yield (self._close_section(fmt, current, counts[current])
+               + ',' + fmt.newline(2) + fmt.key('userSettings') + fmt.dumps(request.user_settings, 2)
+               + fmt.newline(1) + '}' + fmt.newline(0) + '}')
+
+    @staticmethod
+    def _close_section(fmt: RecordFormatter, section: str, count: int) -> str:
+        return (fmt.newline(2) if count else '') + ('}' if section == 'workouts' else ']')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptimeSeconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "activeRequests": self.active,
+            "bytesSent": self.bytes_sent,
+            "sharedResponses": self.shared,
+            "cache": self.cache.stats()
+        }
+
+
+def _worker_ready(delay: float) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+def start_workers(executor: ProcessPoolExecutor, workers: int) -> None:
+    """
+    在监听端口之前启动进程池的全部工作进程
+
+    进程池按需fork工作进程，在服务器运行中创建的进程会继承监听套接字和客户端连接：
+    连接关闭后客户端仍收不到EOF，服务器被强制结束后残留的工作进程继续占用端口。
+    同时提交的任务在执行期间都不空闲，进程池因此为每个任务创建一个工作进程。
+    """
+    for future in [executor.submit(_worker_ready, 0.05) for _ in range(workers)]:
+        future.result()
+
+
+async def serve(host: str, port: int, server: SyncServer) -> None:
+    """启动服务器并一直运行"""
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=1024)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟同步服务器：按用户和日期范围即时生成并流式返回导出数据')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口 (默认: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='生成数据的进程数 (默认: CPU核心数)')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子，与用户序号一起决定数据 (默认: 42)')
+    parser.add_argument('--origin', type=str, default=DEFAULT_ORIGIN,
+                        help=f'用户数据时间轴的起点 YYYY-MM-DD (默认: {DEFAULT_ORIGIN})')
+    parser.add_argument('--max-days', type=int, default=36500, help='时间轴的最大天数 (默认: 36500)')
+    parser.add_argument('--english', action='store_true', help='默认使用英文名称(请求中可用lang参数指定)')
+    parser.add_argument('--backend', choices=['auto', 'numpy', 'python'], default='auto',
+                        help='随机游走计算后端 (默认: auto)')
+    parser.add_argument('--chunk-days', type=int, default=DEFAULT_CHUNK_DAYS,
+                        help=f'每个生成任务的天数 (默认: {DEFAULT_CHUNK_DAYS})')
+    parser.add_argument('--cache-mb', type=float, default=64, help='响应缓存的总大小(MB) (默认: 64)')
+    parser.add_argument('--cache-entry-mb', type=float, default=8,
+                        help='可缓存的单个响应的最大大小(MB) (默认: 8)')
+    args = parser.parse_args()
+
+    try:
+        origin = datetime.datetime.strptime(args.origin, '%Y-%m-%d').date()
+    except ValueError:
+        print(f"✗ 无效的起点日期: {args.origin}")
+        return 1
+    if args.workers < 1 or args.chunk_days < 1:
+        print("✗ --workers 和 --chunk-days 必须大于0")
+        return 1
+
+    cache = ResponseCache(int(args.cache_mb * 1024 * 1024), int(args.cache_entry_mb * 1024 * 1024))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        start_workers(executor, args.workers)
+        server = SyncServer(executor, cache, origin, args.seed, english=args.english, backend=args.backend,
+                            max_days=args.max_days, chunk_days=args.chunk_days)
+        print(f"✓ 模拟同步服务器已启动: http://{args.host}:{args.port}")
+        print(f"- 导出接口: /users/<用户序号>/export?start=YYYY-MM-DD&end=YYYY-MM-DD&lang=cn|en")
+        print(f"- 运行统计: /stats")
+        print(f"- 生成进程: {args.workers}, 响应缓存: {args.cache_mb:g} MB")
+        try:
+            asyncio.run(serve(args.host, args.port, server))
+        except KeyboardInterrupt:
+            print("\n服务器已停止")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,207 +4,618 @@
 验证生成的JSON数据是否完全符合Flutter应用的导入要求
 """
 
+import argparse
+import glob
 import json
+import os
 import sys
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
 
-def validate_flutter_import_format(file_path: str) -> bool:
-    """验证JSON文件是否符合Flutter导入格式要求"""
+from compressed_io import COMPRESSION_EXTENSIONS, open_input, strip_compression_extension
+from export_formats import COLUMNAR_META, detect_format, load_export
+from export_schema import EXPORT_SCHEMA, compile_schema
+from json_stream import iter_export
+from sample_validation import DEFAULT_SAMPLE_CONFIDENCE, SampleResult, SamplingUnsupported, sample_export_file
+from semantic_checks import SEMANTIC_SECTIONS, SectionColumns, check_section_semantics
+
+# 按验证和输出顺序排列的data各部分
+SCHEMA_SECTIONS = list(EXPORT_SCHEMA)
+
+# 错误较多时只输出前面的部分
+MAX_PRINTED_ERRORS = 50
+
+# 批量模式下目录中会被验证的文件(.jsonl为批量生成的分片，每行一个用户的导出数据)，
+# 以及它们的gzip/xz/bz2压缩版本
+BATCH_EXTENSIONS = tuple(extension + suffix
+                         for extension in ('.json', '.ndjson', '.fdb', '.jsonl')
+                         for suffix in ('',) + tuple(COMPRESSION_EXTENSIONS.values()))
+# 批量生成的清单文件、预聚合文件(rollups.py)和降采样文件(downsample.py)不是导出数据
+BATCH_SKIPPED_FILES = ('manifest.json',)
+BATCH_SKIPPED_SUFFIXES = ('.rollups.json', '.lttb.json')
+DEFAULT_REPORT = 'validation_report.json'
+# 抽样检查输出中各部分的名称(.jsonl分片按行抽样)
+SAMPLE_SECTION_NAMES = {'weights': '体重数据', 'bodyFat': '体脂数据', 'workouts': '训练数据',
+                        'nutrition': '营养数据', 'exports': '导出数据行'}
+
+class ValidationResult:
+    """
+    一个导出文件的验证结果
+
+    top_errors为顶级结构的错误(None表示还未检查)，section_errors为各部分的错误，
+    counts为各部分的[记录数(天数), 子项目数]。
+    """
+
+    def __init__(self):
+        self.top_errors: Optional[List[str]] = None
+        self.section_errors: Dict[str, List[str]] = {}
+        self.counts: Dict[str, List[int]] = {section: [0, 0] for section in SCHEMA_SECTIONS}
+
+    def add_errors(self, section: str, errors: List[str]) -> None:
+        self.section_errors.setdefault(section, []).extend(errors)
+
+    @property
+    def errors(self) -> List[str]:
+        errors = list(self.top_errors or [])
+        for section in SCHEMA_SECTIONS:
+            errors.extend(self.section_errors.get(section, []))
+        return errors
+
+    @property
+    def ok(self) -> bool:
+        return self.top_errors == [] and not self.section_errors
+
+def check_export_data(data: Dict[str, Any], fail_fast: bool = True, semantic: bool = False) -> ValidationResult:
+    """
+    检查内存中的导出数据，不输出任何信息
+
+    semantic=True时，通过字段和类型检查的部分再做跨记录的语义检查(semantic_checks)。
+    """
+    schema = compile_schema(fail_fast)
+    result = ValidationResult()
+    result.top_errors = schema.check_top_level(data)
+    if result.top_errors:
+        return result
+
+    for section in SCHEMA_SECTIONS:
+        errors, records, items = schema.check_section(section, data['data'][section])
+        result.counts[section] = [records, items]
+        if not errors and semantic:
+            errors = check_section_semantics(section, data['data'][section])
+        if errors:
+            result.add_errors(section, errors)
+            if fail_fast:
+                break
+    return result
+
+def check_export_file_streaming(file_path: str, fail_fast: bool = True,
+                                semantic: bool = False) -> ValidationResult:
+    """
+    逐条扫描并检查JSON导出文件(可以是压缩文件)，内存占用与文件大小无关，不输出任何信息
+
+    semantic=True时边扫描边把各部分的日期和数值收集到列中，部分结束时做语义检查；
+    列只保存少量基本类型的值，内存占用仍远小于完整加载。
+    fail_fast时发现错误后不再检查记录，只扫描剩余的顶级字段和部分名以确定顶级结构，
+    结果与完整加载时相同。
+    """
+    schema = compile_schema(fail_fast)
+    result = ValidationResult()
+    top_level = {}
+    data_section = {}
+    columns: Optional[SectionColumns] = None
+    stopped = False
+
+    def finish_section() -> bool:
+        """结束当前部分的语义检查；全部记录都通过字段和类型检查时才检查，发现错误时返回True"""
+        nonlocal columns
+        finished, columns = columns, None
+        if finished is None or finished.section in result.section_errors:
+            return False
+        errors = finished.check()
+        if errors:
+            result.add_errors(finished.section, errors)
+        return bool(errors)
+
+    with open_input(file_path, 'rb') as f:
+        for event in iter_export(f):
+            if event.kind == 'field':
+                top_level[event.key] = event.value
+                continue
+
+            section = event.section
+            if section not in schema.schema:
+                continue
+            if columns is not None and columns.section != section and finish_section() and fail_fast:
+                stopped = True
+            if stopped:
+                if event.kind in ('section_start', 'section_value'):
+                    data_section[section] = None
+                continue
+            if event.kind == 'section_value':
+                # 合法的记录部分都会被逐条产出，整体解析的只可能是userSettings或类型错误的部分
+                data_section[section] = event.value
+                errors, records, items = schema.check_section(section, event.value)
+                result.counts[section] = [records, items]
+            elif event.kind == 'section_start':
+                data_section[section] = None
+                error = schema.section_kind_error(section, event.value)
+                errors = [error] if error else []
+                if semantic and not error and section in SEMANTIC_SECTIONS:
+                    columns = SectionColumns(section)
+            elif event.kind == 'item':
+                errors = schema.check_record(section, event.key, event.value)
+                counts = result.counts[section]
+                counts[0] += 1
+                if not errors:
+                    counts[1] += schema.item_count(section, event.value)
+                    if columns is not None:
+                        columns.add(event.key, event.value)
+            else:
+                continue
+
+            if errors:
+                result.add_errors(section, errors)
+                if fail_fast:
+                    columns = None
+                    stopped = True
+
+    if not stopped:
+        finish_section()
+
+    # 顶级结构在整个文件扫描完后才能确定
+    top_level['data'] = data_section
+    result.top_errors = schema.check_top_level(top_level)
+    if result.top_errors:
+        # 与完整加载一致：顶级结构有错误时只报告顶级结构
+        result.section_errors = {}
+    return result
+
+def validate_flutter_import_format(file_path: str, fail_fast: bool = True, cache=None,
+                                   semantic: bool = False) -> bool:
+    """
+    验证导出文件是否符合Flutter导入格式要求(也支持export_formats中的紧凑格式)
+
+    fail_fast=False时检查全部记录并报告所有错误，否则在第一个错误处停止。
+    cache为validation_cache.ValidationCache时，未修改的文件和部分直接使用缓存的结论。
+    semantic=True时还检查日期顺序、热量之和、训练日期和取值范围(semantic_checks)。
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
+        if cache is not None:
+            return _validate_cached(file_path, fail_fast, cache, stream=False, semantic=semantic)
+        data = load_export(file_path)
+
         print(f"验证文件: {file_path}")
         print("=" * 50)
-        
-        # 1. 验证顶级结构
-        if not _validate_top_level_structure(data):
-            return False
-        
-        # 2. 验证体重数据格式
-        if not _validate_weight_data(data['data']['weights']):
-            return False
-        
-        # 3. 验证体脂数据格式  
-        if not _validate_body_fat_data(data['data']['bodyFat']):
-            return False
-        
-        # 4. 验证训练数据格式
-        if not _validate_workout_data(data['data']['workouts']):
-            return False
-        
-        # 5. 验证营养数据格式 (重点)
-        if not _validate_nutrition_data(data['data']['nutrition']):
-            return False
-        
-        # 6. 验证用户设置
-        if not _validate_user_settings(data['data']['userSettings']):
-            return False
-        
-        print("\n✓ 所有验证通过！数据格式完全符合Flutter应用导入要求")
-        return True
-        
+
+        return _print_result(check_export_data(data, fail_fast, semantic), fail_fast)
+
     except Exception as e:
         print(f"✗ 验证过程中出错: {e}")
         return False
 
-def _validate_top_level_structure(data: Dict[str, Any]) -> bool:
-    """验证顶级数据结构"""
-    required_fields = ['version', 'exportDate', 'data']
-    for field in required_fields:
-        if field not in data:
-            print(f"✗ 缺少顶级字段: {field}")
-            return False
-    
-    data_section = data['data']
-    required_data_fields = ['weights', 'bodyFat', 'workouts', 'nutrition', 'userSettings']
-    for field in required_data_fields:
-        if field not in data_section:
-            print(f"✗ 缺少数据字段: {field}")
-            return False
-    
-    print("✓ 顶级结构验证通过")
-    return True
+def validate_flutter_import_format_streaming(file_path: str, fail_fast: bool = True, cache=None,
+                                             semantic: bool = False) -> bool:
+    """
+    以流式方式验证JSON文件是否符合Flutter导入格式要求
 
-def _validate_weight_data(weights: List[Dict[str, Any]]) -> bool:
-    """验证体重数据格式"""
-    if not isinstance(weights, list):
-        print("✗ weights必须是列表")
-        return False
-    
-    for i, weight in enumerate(weights):
-        if not all(field in weight for field in ['date', 'weight']):
-            print(f"✗ 体重记录{i}缺少必要字段")
-            return False
-        
-        if not isinstance(weight['weight'], (int, float)):
-            print(f"✗ 体重记录{i}的weight值不是数字")
-            return False
-    
-    print(f"✓ 体重数据验证通过 ({len(weights)}条记录)")
-    return True
+    逐条解析并验证weights、bodyFat、workouts和nutrition中的记录，内存占用与文件大小无关；
+    错误信息和记录序号与validate_flutter_import_format一致。
+    """
+    try:
+        if cache is not None:
+            return _validate_cached(file_path, fail_fast, cache, stream=True, semantic=semantic)
+        print(f"验证文件: {file_path}")
+        print("=" * 50)
 
-def _validate_body_fat_data(body_fat: List[Dict[str, Any]]) -> bool:
-    """验证体脂数据格式"""
-    if not isinstance(body_fat, list):
-        print("✗ bodyFat必须是列表")
+        return _print_result(check_export_file_streaming(file_path, fail_fast, semantic), fail_fast)
+
+    except Exception as e:
+        print(f"✗ 验证过程中出错: {e}")
         return False
-    
-    for i, bf in enumerate(body_fat):
-        if not all(field in bf for field in ['date', 'bodyFatPercentage']):
-            print(f"✗ 体脂记录{i}缺少必要字段")
-            return False
-        
-        if not isinstance(bf['bodyFatPercentage'], (int, float)):
-            print(f"✗ 体脂记录{i}的bodyFatPercentage值不是数字")
+
+def _validate_cached(file_path: str, fail_fast: bool, cache, stream: bool, semantic: bool = False) -> bool:
+    """使用验证缓存验证文件并输出结果"""
+    from validation_cache import describe_status
+
+    result, status = cache.check_file(file_path, fail_fast, stream, semantic)
+    print(f"验证文件: {file_path}")
+    print("=" * 50)
+    print(describe_status(status))
+    return _print_result(result, fail_fast)
+
+def validate_flutter_import_format_sampled(file_path: str, count: int,
+                                           confidence: float = DEFAULT_SAMPLE_CONFIDENCE,
+                                           seed: Optional[int] = None, full: bool = False,
+                                           fail_fast: bool = True, stream: bool = False) -> bool:
+    """
+    抽样快速检查：每个部分随机抽count条记录检查，输出估计的缺陷率及其置信上限(sample_validation)
+
+    无法抽样的文件(压缩文件、紧凑格式等)改为完整验证；full=True时抽样发现缺陷也改为完整验证，
+    报告全部(或第一个)错误的准确位置。完整验证按stream选择流式或一次加载。
+    """
+    try:
+        print(f"验证文件: {file_path}")
+        print("=" * 50)
+        start = time.perf_counter()
+        try:
+            result = sample_export_file(file_path, count, confidence, seed)
+        except SamplingUnsupported as e:
+            print(f"无法抽样({e})，改为完整验证")
+            return _print_result(_check_full(file_path, fail_fast, stream), fail_fast)
+
+        _print_sample_result(result)
+        print(f"\n抽样耗时: {time.perf_counter() - start:.2f} 秒 (种子: {result.seed}，可用--sample-seed复现)")
+        if result.ok:
+            print("\n✓ 抽样检查通过！未发现缺陷，缺陷率不超过上述置信上限")
+            return True
+        if not full:
+            print("\n✗ 抽样检查发现缺陷 (使用--full完整验证以列出全部错误)")
             return False
-    
-    print(f"✓ 体脂数据验证通过 ({len(body_fat)}条记录)")
-    return True
+        print("\n抽样发现缺陷，改为完整验证")
+        print("=" * 50)
+        return _print_result(_check_full(file_path, fail_fast, stream), fail_fast)
 
-def _validate_workout_data(workouts: Dict[str, Any]) -> bool:
-    """验证训练数据格式"""
-    if not isinstance(workouts, dict):
-        print("✗ workouts必须是字典")
+    except Exception as e:
+        print(f"✗ 验证过程中出错: {e}")
         return False
-    
-    total_workouts = 0
-    for date_key, daily_workouts in workouts.items():
-        if not isinstance(daily_workouts, list):
-            print(f"✗ {date_key}的训练记录必须是列表")
-            return False
-        
-        for workout in daily_workouts:
-            required_fields = ['date', 'name', 'sets', 'isCompleted']
-            if not all(field in workout for field in required_fields):
-                print(f"✗ 训练记录缺少必要字段: {required_fields}")
-                return False
-            
-            if not isinstance(workout['sets'], int):
-                print("✗ sets值必须是整数")
-                return False
-            
-            if not isinstance(workout['isCompleted'], bool):
-                print("✗ isCompleted值必须是布尔值")
-                return False
-            
-            total_workouts += 1
-    
-    print(f"✓ 训练数据验证通过 ({len(workouts)}天, {total_workouts}个训练项目)")
-    return True
 
-def _validate_nutrition_data(nutrition: List[Dict[str, Any]]) -> bool:
-    """验证营养数据格式 - 关键验证点"""
-    if not isinstance(nutrition, list):
-        print("✗ nutrition必须是列表")
+def _check_full(file_path: str, fail_fast: bool, stream: bool) -> ValidationResult:
+    if stream and detect_format(file_path) == 'json':
+        return check_export_file_streaming(file_path, fail_fast)
+    return check_export_data(load_export(file_path), fail_fast)
+
+def _print_sample_result(result: SampleResult) -> None:
+    """输出抽样结果：顶级结构和userSettings的检查结论，各部分的缺陷率估计"""
+    _print_errors(result.top_errors)
+    if result.format == 'json' and not result.top_errors:
+        print("✓ 顶级结构和用户设置验证通过")
+    level = f"{result.confidence:.0%}"
+    for section, sample in result.sections.items():
+        mark = "✗" if sample.defective else "✓"
+        name = SAMPLE_SECTION_NAMES.get(section, section)
+        if sample.exact:
+            print(f"{mark} {name}: 全部检查 {sample.sampled}条, 缺陷 {sample.defective}条")
+        else:
+            print(f"{mark} {name}: 抽样 {sample.sampled}条, 缺陷 {sample.defective}条, "
+                  f"估计缺陷率 {sample.rate:.2%} ({level}置信上限 {sample.upper_bound(result.confidence):.2%}), "
+                  f"约 {sample.estimated_records}条")
+        for error in sample.errors:
+            print(f"  {error}")
+
+def _print_result(result: ValidationResult, fail_fast: bool) -> bool:
+    """按顶级结构、各部分的顺序输出验证结果"""
+    printed = 0
+    if result.top_errors:
+        _print_errors(result.top_errors)
         return False
-    
-    total_meals = 0
-    for i, entry in enumerate(nutrition):
-        # 验证每日营养记录的必要字段
-        required_fields = ['date', 'calorieIntake', 'caloriesBurned', 'calorieGoal', 'meals']
-        if not all(field in entry for field in required_fields):
-            print(f"✗ 营养记录{i}缺少必要字段: {required_fields}")
-            return False
-        
-        # 验证热量字段
-        for field in ['calorieIntake', 'caloriesBurned', 'calorieGoal']:
-            if not isinstance(entry[field], (int, float)):
-                print(f"✗ 营养记录{i}的{field}值必须是数字")
-                return False
-        
-        # 验证meals数据结构 - 这是关键部分
-        meals = entry['meals']
-        if not isinstance(meals, list):
-            print(f"✗ 营养记录{i}的meals必须是列表")
-            return False
-        
-        for j, meal in enumerate(meals):
-            # 验证每个meal的结构
-            required_meal_fields = ['name', 'foods', 'calories']
-            if not all(field in meal for field in required_meal_fields):
-                print(f"✗ 营养记录{i}的meal{j}缺少必要字段: {required_meal_fields}")
-                return False
-            
-            # 验证foods是列表且只包含一个食物项目
-            if not isinstance(meal['foods'], list):
-                print(f"✗ meal{j}的foods必须是列表")
-                return False
-            
-            if len(meal['foods']) != 1:
-                print(f"✗ meal{j}的foods必须只包含一个食物项目，实际包含{len(meal['foods'])}个")
-                return False
-            
-            # 验证calories是数字
-            if not isinstance(meal['calories'], (int, float)):
-                print(f"✗ meal{j}的calories值必须是数字")
-                return False
-            
-            total_meals += 1
-    
-    print(f"✓ 营养数据验证通过 ({len(nutrition)}天, {total_meals}个餐食记录)")
-    print("  - 每个meal包含正确的name、foods（单个食物）、calories字段")
-    print("  - 完全符合Flutter MealEntry导入要求")
-    return True
+    if result.top_errors is not None:
+        print("✓ 顶级结构验证通过")
+
+    for section in SCHEMA_SECTIONS:
+        errors = result.section_errors.get(section)
+        if errors:
+            _print_errors(errors, printed)
+            printed += len(errors)
+            if fail_fast:
+                break
+        elif result.top_errors is not None:
+            _print_section_summary(section, *result.counts[section])
+
+    if result.ok:
+        print("\n✓ 所有验证通过！数据格式完全符合Flutter应用导入要求")
+        return True
+    if not fail_fast:
+        print(f"\n✗ 共发现 {printed} 个错误")
+    return False
+
+def _print_errors(errors: List[str], printed: int = 0) -> None:
+    """输出错误信息(累计超过MAX_PRINTED_ERRORS条后只输出数量)"""
+    for error in errors[:max(MAX_PRINTED_ERRORS - printed, 0)]:
+        print(error)
+    if printed <= MAX_PRINTED_ERRORS < printed + len(errors):
+        print(f"  ... 更多错误不再逐条显示")
+
+def _print_section_summary(section: str, records: int, items: int = 0) -> None:
+    """输出某个部分验证通过的信息"""
+    if section == 'weights':
+        print(f"✓ 体重数据验证通过 ({records}条记录)")
+    elif section == 'bodyFat':
+        print(f"✓ 体脂数据验证通过 ({records}条记录)")
+    elif section == 'workouts':
+        print(f"✓ 训练数据验证通过 ({records}天, {items}个训练项目)")
+    elif section == 'nutrition':
+        print(f"✓ 营养数据验证通过 ({records}天, {items}个餐食记录)")
+        print("  - 每个meal包含正确的name、foods（单个食物）、calories字段")
+        print("  - 完全符合Flutter MealEntry导入要求")
+    elif section == 'userSettings':
+        print("✓ 用户设置验证通过")
+
+# === 批量验证 ===
+
+def _is_skipped(name: str) -> bool:
+    return name in BATCH_SKIPPED_FILES or strip_compression_extension(name).endswith(BATCH_SKIPPED_SUFFIXES)
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """展开通配符和目录，返回要验证的文件(及列式目录)列表，保持输入顺序并去重"""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            # 通配符同样跳过清单文件和列式目录内部的文件
+            matches = [path for path in sorted(glob.glob(pattern, recursive=True))
+                       if not _is_skipped(os.path.basename(path))
+                       and not os.path.exists(os.path.join(os.path.dirname(path), COLUMNAR_META))]
+        else:
+            matches = [pattern]
+        for path in matches:
+            if os.path.isdir(path) and not os.path.exists(os.path.join(path, COLUMNAR_META)):
+                for root, dirs, files in os.walk(path):
+                    # 列式导出目录作为一个整体验证，不再深入
+                    columnar = [name for name in dirs if os.path.exists(os.path.join(root, name, COLUMNAR_META))]
+                    dirs[:] = sorted(name for name in dirs if name not in columnar)
+                    entries = columnar + [name for name in files if name.endswith(BATCH_EXTENSIONS)
+                                          and not _is_skipped(name)]
+                    paths.extend(os.path.join(root, name) for name in sorted(entries))
+            else:
+                paths.append(path)
+    return list(dict.fromkeys(paths))
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def _validate_file_task(task: tuple) -> Dict[str, Any]:
+    """进程池任务：验证一个文件，返回可序列化为JSON的结果"""
+    path, fail_fast, stream, max_errors, cache_path, cache_max_entries, semantic, sample = task
+    start = time.perf_counter()
+    report = {"file": path, "format": None, "status": "error", "exports": 0, "bytes": 0,
+              "counts": {}, "errorCount": 0, "errors": [], "cache": None, "sample": None, "sampleFallback": None}
+    results = []
+    try:
+        report["bytes"] = _path_size(path)
+        if sample is not None and _sample_file_task(path, sample, max_errors, report):
+            report["seconds"] = round(time.perf_counter() - start, 4)
+            return report
+        if strip_compression_extension(path).endswith('.jsonl'):
+            # 批量生成的分片：每行是一个用户的完整导出数据
+            report["format"] = 'jsonl'
+            with open_input(path, 'r') as f:
+                for line_number, line in enumerate(f, 1):
+                    if line.strip():
+                        result = check_export_data(json.loads(line), fail_fast, semantic)
+                        results.append((f"第{line_number}行: ", result))
+        else:
+            report["format"] = detect_format(path)
+            if cache_path is not None:
+                from validation_cache import ValidationCache
+                cache = ValidationCache(cache_path, cache_max_entries)
+                try:
+                    result, status = cache.check_file(path, fail_fast, stream, semantic)
+                finally:
+                    cache.close()
+                report["cache"] = status["cache"]
+                results.append(("", result))
+            elif stream and report["format"] == 'json':
+                results.append(("", check_export_file_streaming(path, fail_fast, semantic)))
+            else:
+                results.append(("", check_export_data(load_export(path), fail_fast, semantic)))
+    except Exception as e:
+        report["errors"] = [f"✗ 验证过程中出错: {e}"]
+        report["errorCount"] = 1
+        report["seconds"] = round(time.perf_counter() - start, 4)
+        return report
+
+    counts = {section: {"records": 0, "items": 0} for section in SCHEMA_SECTIONS}
+    errors = []
+    for prefix, result in results:
+        for section, (records, items) in result.counts.items():
+            counts[section]["records"] += records
+            counts[section]["items"] += items
+        errors.extend(prefix + error for error in result.errors)
+    report.update({
+        "status": "passed" if not errors else "failed",
+        "exports": len(results),
+        "counts": counts,
+        "errorCount": len(errors),
+        "errors": errors[:max_errors],
+        "seconds": round(time.perf_counter() - start, 4)
+    })
+    return report
 
-def _validate_user_settings(settings: Dict[str, Any]) -> bool:
-    """验证用户设置格式"""
-    if not isinstance(settings, dict):
-        print("✗ userSettings必须是字典")
+def _sample_file_task(path: str, sample: tuple, max_errors: int, report: Dict[str, Any]) -> bool:
+    """
+    抽样检查一个文件并填写报告，返回True；无法抽样或(full=True时)发现缺陷时记录原因并返回False，
+    由调用者完整验证
+    """
+    count, confidence, seed, full = sample
+    try:
+        result = sample_export_file(path, count, confidence, seed)
+    except SamplingUnsupported as e:
+        report["sampleFallback"] = f"unsupported: {e}"
+        return False
+    report["sample"] = result.to_dict()
+    if not result.ok and full:
+        report["sampleFallback"] = "defects"
         return False
-    
-    print("✓ 用户设置验证通过")
+
+    errors = result.errors
+    report.update({
+        "format": result.format,
+        "status": "passed" if result.ok else "failed",
+        "exports": result.sections['exports'].estimated_records if result.format == 'jsonl' else 1,
+        "counts": {section: {"records": sample.estimated_records, "items": 0}
+                   for section, sample in result.sections.items() if section in SCHEMA_SECTIONS},
+        "errorCount": len(errors),
+        "errors": errors[:max_errors]
+    })
     return True
 
+def validate_files(patterns: List[str], workers: Optional[int] = None, fail_fast: bool = True,
+                   stream: bool = False, max_errors: int = 5, cache_path: Optional[str] = None,
+                   cache_max_entries: Optional[int] = None, semantic: bool = False,
+                   sample: Optional[tuple] = None) -> Dict[str, Any]:
+    """
+    在进程池中并行验证多个导出文件，返回汇总报告
+
+    patterns可以是文件、目录(递归查找导出文件)或通配符；每个文件只保留前max_errors条错误。
+    cache_path为验证缓存文件时，各进程共用该缓存(.jsonl分片不使用缓存)；semantic=True时同时做语义检查。
+    sample为(抽样数, 置信度, 种子, full)时做抽样快速检查，报告的counts为估计的记录数；
+    无法抽样或full=True且发现缺陷的文件完整验证，原因记录在sampleFallback中。
+    """
+    paths = expand_paths(patterns)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    tasks = [(path, fail_fast, stream, max_errors, cache_path, cache_max_entries, semantic, sample)
+             for path in paths]
+
+    start = time.perf_counter()
+    if workers == 1:
+        reports = [_validate_file_task(task) for task in tasks]
+    else:
+        # 先提交大文件以均衡各进程的负载，结果按输入顺序排列
+        order = sorted(range(len(tasks)), key=lambda i: -_safe_size(paths[i]))
+        reports = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, report in zip(order, executor.map(_validate_file_task, [tasks[i] for i in order])):
+                reports[i] = report
+    elapsed = time.perf_counter() - start
+
+    totals = {section: {"records": 0, "items": 0} for section in SCHEMA_SECTIONS}
+    for report in reports:
+        for section, counts in report["counts"].items():
+            totals[section]["records"] += counts["records"]
+            totals[section]["items"] += counts["items"]
+    total_bytes = sum(report["bytes"] for report in reports)
+
+    return {
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": len(reports),
+        "passed": sum(report["status"] == "passed" for report in reports),
+        "failed": sum(report["status"] != "passed" for report in reports),
+        "workers": workers,
+        "mode": "fail_fast" if fail_fast else "all_errors",
+        "sampled": sum(report["sample"] is not None and report["sampleFallback"] is None for report in reports),
+        "elapsedSeconds": round(elapsed, 3),
+        "filesPerSecond": round(len(reports) / max(elapsed, 1e-9), 2),
+        "megabytesPerSecond": round(total_bytes / 1e6 / max(elapsed, 1e-9), 2),
+        "bytes": total_bytes,
+        "totals": totals,
+        "results": reports
+    }
+
+def _safe_size(path: str) -> int:
+    try:
+        return _path_size(path)
+    except OSError:
+        return 0
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """批量模式：并行验证并写出汇总报告"""
+    summary = validate_files(args.paths, workers=args.workers, fail_fast=not args.all_errors,
+                             stream=args.stream, max_errors=args.max_errors,
+                             cache_path=args.cache, cache_max_entries=args.cache_max_entries,
+                             semantic=args.semantic, sample=_sample_options(args))
+
+    for report in summary["results"]:
+        cached = " (缓存)" if report["cache"] == "file" else ""
+        if report["sample"] is not None and report["sampleFallback"] is None:
+            cached = " (抽样)"
+        elif report["sampleFallback"] is not None:
+            cached = " (完整验证)"
+        if report["status"] == "passed":
+            print(f"✓ {report['file']}{cached}")
+        else:
+            print(f"✗ {report['file']}: {report['errors'][0] if report['errors'] else report['status']}")
+
+    report_path = args.report or DEFAULT_REPORT
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"\n批量验证完成: {summary['files']} 个文件, 通过 {summary['passed']} 个, 失败 {summary['failed']} 个")
+    print(f"进程数: {summary['workers']}, 耗时: {summary['elapsedSeconds']:.2f} 秒 "
+          f"({summary['filesPerSecond']:.1f} 文件/秒, {summary['megabytesPerSecond']:.1f} MB/秒)")
+    print(f"汇总报告已保存到 {report_path}")
+
+    if summary["files"] == 0:
+        print("✗ 没有找到要验证的文件")
+        return 1
+    return 0 if summary["failed"] == 0 else 1
+
+def _sample_options(args: argparse.Namespace) -> Optional[tuple]:
+    if args.sample is None:
+        return None
+    return (args.sample, args.sample_confidence, args.sample_seed, args.full)
+
 def main():
-    if len(sys.argv) != 2:
-        print("用法: python validate_data_format.py <json_file_path>")
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    success = validate_flutter_import_format(file_path)
-    
-    if success:
+    parser = argparse.ArgumentParser(description='验证JSON数据是否符合Flutter应用的导入格式')
+    parser.add_argument('paths', nargs='+', metavar='file_path',
+                        help='要验证的导出文件路径 (JSON、NDJSON、二进制文件或列式目录)；'
+                             '多个路径、目录或通配符时进入批量模式')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式验证：逐条解析记录，内存占用与文件大小无关')
+    parser.add_argument('--all-errors', action='store_true',
+                        help='检查全部记录并报告所有错误 (默认: 在第一个错误处停止)')
+    parser.add_argument('--semantic', action='store_true',
+                        help='语义检查：日期唯一且递增、calorieIntake等于meals热量之和、'
+                             'workouts的键与记录日期一致、数值在生成器的取值范围内，报告每个不满足的日期')
+    parser.add_argument('--workers', type=int, default=None, help='批量模式的进程数 (默认: CPU核心数)')
+    parser.add_argument('--report', type=str, default=None,
+                        help=f'批量模式的汇总报告文件 (默认: {DEFAULT_REPORT})；指定后单个文件也按批量模式验证')
+    parser.add_argument('--max-errors', type=int, default=5, help='汇总报告中每个文件保留的错误数 (默认: 5)')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='CACHE_FILE',
+                        help='使用持久化验证缓存，未修改的文件和部分直接返回缓存的结论 '
+                             '(默认位置: ~/.cache/fitness_validation_cache.sqlite)')
+    parser.add_argument('--cache-max-entries', type=int, default=None,
+                        help='验证缓存的最大条目数，超出时淘汰最久未使用的条目 (默认: 10000)')
+    parser.add_argument('--sample', type=int, default=None, metavar='N',
+                        help='抽样快速检查：随机定位到文件中的字节位置，每个部分检查N条记录，'
+                             '报告估计的缺陷率及其置信上限 (压缩文件和紧凑格式无法抽样，改为完整验证)')
+    parser.add_argument('--sample-confidence', type=float, default=DEFAULT_SAMPLE_CONFIDENCE,
+                        help=f'缺陷率置信上限的置信度 (默认: {DEFAULT_SAMPLE_CONFIDENCE})')
+    parser.add_argument('--sample-seed', type=int, default=None, help='抽样的随机种子 (默认: 随机，输出中会给出)')
+    parser.add_argument('--full', action='store_true', help='抽样发现缺陷时改为完整验证，报告准确的错误位置')
+
+    args = parser.parse_args()
+    if args.sample is not None:
+        if args.sample <= 0:
+            parser.error("--sample 必须大于0")
+        if not 0 < args.sample_confidence < 1:
+            parser.error("--sample-confidence 必须在0和1之间")
+        if args.semantic or args.cache is not None:
+            parser.error("--sample 不能与 --semantic 或 --cache 同时使用：语义检查和缓存的结论都需要完整扫描")
+    elif args.full or args.sample_seed is not None:
+        parser.error("--full 和 --sample-seed 需要与 --sample 同时使用")
+    cache = None
+    if args.cache is not None:
+        from validation_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, ValidationCache
+        args.cache = args.cache or DEFAULT_CACHE_PATH
+        args.cache_max_entries = args.cache_max_entries or DEFAULT_MAX_ENTRIES
+
+    single = args.paths[0]
+    if (len(args.paths) > 1 or args.report or glob.has_magic(single)
+            or (os.path.isdir(single) and not os.path.exists(os.path.join(single, COLUMNAR_META)))):
+        sys.exit(_run_batch(args))
+
+    fail_fast = not args.all_errors
+    if args.cache is not None:
+        cache = ValidationCache(args.cache, args.cache_max_entries)
+    try:
+        if args.sample is not None:
+            success = validate_flutter_import_format_sampled(single, args.sample, args.sample_confidence,
+                                                             args.sample_seed, args.full, fail_fast, args.stream)
+        elif args.stream:
+            success = validate_flutter_import_format_streaming(single, fail_fast, cache, args.semantic)
+        else:
+            success = validate_flutter_import_format(single, fail_fast, cache, args.semantic)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if success and args.sample is not None:
+        # 抽样通过只说明缺陷率很低(无法抽样的文件已完整验证)
+        print("\n🎉 数据格式验证通过！")
+        sys.exit(0)
+    elif success:
         print("\n🎉 数据格式验证完全通过！")
         print("该JSON文件可以成功导入到Flutter应用中。")
         sys.exit(0)
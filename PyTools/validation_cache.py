@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+验证结果缓存
+以文件内容和data各部分内容的哈希为键，把验证结论和记录数保存在SQLite数据库中(按最近使用淘汰)。
+未修改的文件直接返回缓存的结论；修改过的文件只重新检查内容变化的部分
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from compressed_io import detect_compression
+from export_formats import detect_format, load_export
+from export_schema import compile_schema
+from json_stream import JsonStreamError, locate_sections
+from semantic_checks import check_section_semantics
+import export_schema
+import semantic_checks
+import validate_data_format
+from validate_data_format import (SCHEMA_SECTIONS, ValidationResult, check_export_data,
+                                  check_export_file_streaming)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'fitness_validation_cache.sqlite')
+DEFAULT_MAX_ENTRIES = 10000
+# 缓存内容的格式版本，结果的结构变化时递增
+CACHE_FORMAT_VERSION = 1
+# 计算整个文件哈希时每次读取的字节数
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def _schema_fingerprint() -> str:
+    """验证规则的指纹：结构定义或验证脚本修改后，之前的缓存结论全部失效"""
+    digest = hashlib.blake2b(str(CACHE_FORMAT_VERSION).encode(), digest_size=16)
+    for module in (export_schema, semantic_checks, validate_data_format):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _result_to_dict(result: ValidationResult) -> Dict[str, Any]:
+    return {"top": result.top_errors, "sections": result.section_errors, "counts": result.counts}
+
+
+def _result_from_dict(value: Dict[str, Any]) -> ValidationResult:
+    result = ValidationResult()
+    result.top_errors = value["top"]
+    result.section_errors = value["sections"]
+    result.counts.update(value["counts"])
+    return result
+
+
+def _hash_path(path: str) -> str:
+    """整个文件(列式目录为其中全部文件)内容的哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    files = [path]
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    for file_path in files:
+        digest.update(os.path.basename(file_path).encode('utf-8') + b'\0')
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_signature(path: str) -> str:
+    """文件的路径、大小和修改时间；三者都不变时不再计算内容哈希"""
+    paths = [path]
+    if os.path.isdir(path):
+        paths += [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    parts = []
+    for p in paths:
+        stat = os.stat(p)
+        parts.append(f"{os.path.abspath(p)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ValidationCache:
+    """
+    验证结果的持久化缓存
+
+    条目有三种：文件签名(路径、大小、修改时间) -> 内容哈希，文件内容哈希 -> 完整验证结果，
+    部分内容哈希 -> 该部分的验证结果。所有条目共享max_entries的容量上限，超出时淘汰最久未使用的条目。
+    键中包含验证规则的指纹和验证模式(遇错即停或收集全部错误)。
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        # 批量验证时多个进程共用同一个缓存文件
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        self.conn.commit()
+        self.fingerprint = _schema_fingerprint()
+
+    def get(self, key: str) -> Any:
+        row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO entries (key, value, last_used) VALUES (?, ?, ?)",
+                          (key, json.dumps(value, ensure_ascii=False), time.time_ns()))
+
+    def commit(self) -> None:
+        """淘汰超出容量的条目并提交"""
+        excess = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY last_used LIMIT ?
+                )
+            """, (excess,))
+        self.conn.commit()
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM entries")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _key(self, kind: str, *parts: str) -> str:
+        return ':'.join((kind, self.fingerprint) + parts)
+
+    def check_file(self, path: str, fail_fast: bool = True, stream: bool = False,
+                   semantic: bool = False) -> Tuple[ValidationResult, Dict[str, Any]]:
+        """
+        验证一个导出文件，尽量使用缓存的结论；semantic=True时的结论与不做语义检查时分别缓存
+
+        Returns:
+            (验证结果, 缓存状态)。缓存状态为{"cache": "file"(整个文件命中)、"sections"(按部分验证，
+            部分或全部命中)或"miss"(全部重新检查), "checked": 重新检查的部分}
+        """
+        mode = ('fail_fast' if fail_fast else 'all_errors') + ('+semantic' if semantic else '')
+        stat_key = self._key('stat', _stat_signature(path))
+        digest = self.get(stat_key)
+        if digest is not None:
+            cached = self.get(self._key('file', mode, digest))
+            if cached is not None:
+                self.commit()
+                return _result_from_dict(cached), {"cache": "file", "checked": []}
+
+        fmt = detect_format(path)
+        # 压缩文件无法按字节定位各部分，整体计算哈希
+        if fmt == 'json' and not os.path.isdir(path) and detect_compression(path) is None:
+            result, digest, status = self._check_json_sections(path, fail_fast, mode, semantic)
+        else:
+            result, digest, status = None, None, None
+        if result is None:
+            digest = _hash_path(path)
+            cached = self.get(self._key('file', mode, digest))
+            if cached is not None:
+                result, status = _result_from_dict(cached), {"cache": "file", "checked": []}
+            else:
+                if stream and fmt == 'json':
+                    result = check_export_file_streaming(path, fail_fast, semantic)
+                else:
+                    result = check_export_data(load_export(path), fail_fast, semantic)
+                status = {"cache": "miss", "checked": list(SCHEMA_SECTIONS)}
+
+        self.put(stat_key, digest)
+        self.put(self._key('file', mode, digest), _result_to_dict(result))
+        self.commit()
+        return result, status
+
+    def _check_json_sections(self, path: str, fail_fast: bool, mode: str,
+                             semantic: bool = False) -> Tuple[Optional[ValidationResult], Optional[str], Optional[Dict[str, Any]]]:
+        """
+        按部分验证生成器写出的JSON文件：各部分按字节定位并分别计算哈希，只解析和检查哈希未命中的部分
+
+        文件不是这种布局时返回(None, None, None)，由调用方整体验证。
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None, None, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                try:
+                    _, head_end, spans = locate_sections(mm, SCHEMA_SECTIONS)
+                    header = json.loads(bytes(mm[:head_end]) + b'}')
+                except (JsonStreamError, ValueError):
+                    return None, None, None
+
+                view = memoryview(mm)
+                try:
+                    section_digests = {section: hashlib.blake2b(view[start:end], digest_size=20).hexdigest()
+                                       for section, (start, end) in spans.items()}
+                    # 各部分之间的分隔符由缩进决定，文件头和各部分的哈希共同确定整个文件的内容
+                    file_digest = hashlib.blake2b(bytes(mm[:head_end]), digest_size=20)
+                    for section in SCHEMA_SECTIONS:
+                        file_digest.update(section_digests[section].encode())
+                    digest = 'sections-' + file_digest.hexdigest()
+
+                    cached = self.get(self._key('file', mode, digest))
+                    if cached is not None:
+                        return _result_from_dict(cached), digest, {"cache": "file", "checked": []}
+
+                    schema = compile_schema(fail_fast)
+                    result = ValidationResult()
+                    header['data'] = dict.fromkeys(SCHEMA_SECTIONS)
+                    result.top_errors = schema.check_top_level(header)
+                    checked = []
+                    if not result.top_errors:
+                        for section in SCHEMA_SECTIONS:
+                            key = self._key('section', mode, section, section_digests[section])
+                            cached = self.get(key)
+                            if cached is None:
+                                start, end = spans[section]
+                                value = json.loads(mm[start:end])
+                                errors, records, items = schema.check_section(section, value)
+                                if not errors and semantic:
+                                    # 语义检查都在部分内部，可以与字段检查一起按部分缓存
+                                    errors = check_section_semantics(section, value)
+                                cached = {"errors": errors, "records": records, "items": items}
+                                self.put(key, cached)
+                                checked.append(section)
+                            result.counts[section] = [cached["records"], cached["items"]]
+                            if cached["errors"]:
+                                result.add_errors(section, cached["errors"])
+                                if fail_fast:
+                                    break
+                finally:
+                    view.release()
+
+        return result, digest, {"cache": "sections" if len(checked) < len(SCHEMA_SECTIONS) else "miss",
+                                "checked": checked}
+
+
+def describe_status(status: Dict[str, Any]) -> str:
+    """缓存状态的说明文字"""
+    if status["cache"] == "file":
+        return "✓ 验证缓存命中：文件未修改，使用缓存的结论"
+    if status["cache"] == "sections":
+        checked = ', '.join(status["checked"]) or '无'
+        return f"✓ 验证缓存部分命中：只重新检查了 {len(status['checked'])} 个部分 ({checked})"
+    return "验证缓存未命中：已检查全部内容"